@@ -0,0 +1,62 @@
+#
+# analyzer_factory.py: Customization of Face Tracker Result Analyzers
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Implements the single extension point used to customize result analyzers of face tracking pipelines.
+# `FaceTracker` creates face detector analyzers by its `_create_analyzers(config, face_map)` factory when
+# a pipeline starts; `add_analyzer_transform()` wraps this factory once per face tracker, and registered
+# transforms are applied to the created analyzer list in the order of registration.
+#
+
+from typing import Any, Callable, List
+
+import degirum_face
+from degirum_face.face_data import FaceMap
+
+# analyzer transform: (analyzers, configuration, face map) -> new analyzer list
+AnalyzerTransform = Callable[[list, Any, FaceMap], list]
+
+
+def add_analyzer_transform(
+    face_tracker: degirum_face.FaceTracker, transform: AnalyzerTransform
+):
+    """
+    Register transform of result analyzers created for face tracker pipelines.
+    Call it before starting any pipeline of the face tracker.
+
+    Args:
+        face_tracker (FaceTracker): Face tracker to customize.
+        transform (AnalyzerTransform): Function taking the list of analyzers created by the library
+            (with transforms registered earlier applied), face tracking configuration, and face map
+            of the pipeline, and returning the new list of analyzers.
+    """
+    transforms = analyzer_transforms(face_tracker)
+    if not transforms:
+        create_analyzers = face_tracker._create_analyzers
+
+        def create_transformed_analyzers(config, face_map) -> list:
+            analyzers = create_analyzers(config, face_map)
+            for t in transforms:
+                analyzers = t(analyzers, config, face_map)
+            return analyzers
+
+        face_tracker._create_analyzers = create_transformed_analyzers  # type: ignore[method-assign]
+        face_tracker._analyzer_transforms = transforms  # type: ignore[attr-defined]
+    transforms.append(transform)
+
+
+def analyzer_transforms(
+    face_tracker: degirum_face.FaceTracker,
+) -> List[AnalyzerTransform]:
+    """
+    Get analyzer transforms registered for the face tracker.
+
+    Args:
+        face_tracker (FaceTracker): Face tracker.
+
+    Returns:
+        List[AnalyzerTransform]: Transforms in the order of application; do not modify it.
+    """
+    return getattr(face_tracker, "_analyzer_transforms", [])
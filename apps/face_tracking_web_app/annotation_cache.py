@@ -0,0 +1,238 @@
+#
+# annotation_cache.py: Clip Annotation Results Cache
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Implements persistent cache of video clip annotation results for the face tracking web application.
+# Results of `FaceTracker.find_faces_in_clip()` (complete `FaceStatus` of each track: embeddings, face crops,
+# attributes, frame ranges, best bbox, face properties, and any other state attached to it, e.g. keypoints)
+# are stored in compressed NPZ sidecar files keyed by clip ETag, model names, and face filter settings
+# (including face filter zones and liveness detection settings of the application),
+# so repeated annotation of the same clip does not run inference again.
+# Sidecar file names start with the hash of the clip name, so outdated sidecars of the clip
+# (left by older clip versions or older settings) are collected when the clip is saved again or removed.
+#
+
+import os, glob, json, hashlib, dataclasses, tempfile
+from typing import Any, Dict, Optional
+
+import numpy as np
+import degirum_face
+from degirum_face import face_data
+from degirum_face.face_data import FaceStatus
+
+
+class AnnotationCache:
+    """
+    On-disk cache of clip annotation results.
+    """
+
+    format_version = 2  # increment when sidecar file layout changes
+
+    def __init__(
+        self,
+        cache_dir: str,
+        config: degirum_face.FaceTrackerConfig,
+        analysis_settings: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Constructor.
+
+        Args:
+            cache_dir (str): Local directory to store sidecar files in.
+            config (FaceTrackerConfig): Face tracking configuration; model names and face filter
+                settings are included into the cache key.
+            analysis_settings (Optional[Dict[str, Any]]): Other settings affecting annotation results,
+                e.g. face filter zones and liveness detection settings; included into the cache key.
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+        settings = {
+            "format_version": self.format_version,
+            # face status layout may change with the library version
+            "degirum_face": degirum_face.__version__,
+            "face_detector": config.face_detection_model_spec.model_name,
+            "face_embedder": config.face_embedding_model_spec.model_name,
+            "face_filters": dataclasses.asdict(config.face_filters),
+            "analysis": analysis_settings or {},
+        }
+        self._settings_hash = hashlib.sha1(
+            json.dumps(settings, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def load(self, clip: Any) -> Optional[Dict[int, FaceStatus]]:
+        """
+        Load cached annotation results for the clip.
+
+        Args:
+            clip (minio.datatypes.Object): Original video clip file object as returned by `FaceClipManager.list_clips()`.
+
+        Returns:
+            Optional[Dict[int, FaceStatus]]: The dictionary of face track IDs to face objects, the same as returned
+                by `FaceTracker.find_faces_in_clip()`, or None if there are no valid cached results for this clip.
+        """
+        path = self._sidecar_path(clip)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                ret: Dict[int, FaceStatus] = {}
+                for track in json.loads(str(data["tracks"])):
+                    track_id = track["id"]
+                    state = dict(track["state"])
+                    for name, kind in track["arrays"].items():
+                        key = f"{name}_{track_id}"
+                        if kind == "array":
+                            state[name] = data[key]
+                        elif kind == "stacked":
+                            state[name] = list(data[key])
+                        else:  # list items, None where the item is not an array
+                            state[name] = [
+                                data[f"{key}_{i}"] if present else None
+                                for i, present in enumerate(kind)
+                            ]
+                    for name, value in track["dataclasses"].items():
+                        state[name] = getattr(face_data, value["type"])(
+                            **value["fields"]
+                        )
+                    ret[track_id] = _make_object(
+                        getattr(face_data, track["type"]), state
+                    )
+                return ret
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # corrupted or incompatible sidecar: treat as cache miss
+            return None
+
+    def save(self, clip: Any, face_map: Dict[int, Any]):
+        """
+        Save annotation results for the clip.
+
+        Args:
+            clip (minio.datatypes.Object): Original video clip file object as returned by `FaceClipManager.list_clips()`.
+            face_map (Dict[int, FaceStatus]): The dictionary of face track IDs to face objects
+                as returned by `FaceTracker.find_faces_in_clip()`.
+        """
+
+        tracks = []
+        arrays: Dict[str, Any] = {}
+        for track_id, face in face_map.items():
+            track: Dict[str, Any] = {
+                "id": track_id,
+                "type": type(face).__name__,
+                "state": {},
+                "arrays": {},
+                "dataclasses": {},
+            }
+            for name, value in vars(face).items():
+                key = f"{name}_{track_id}"
+                if isinstance(value, np.ndarray):
+                    arrays[key] = value
+                    track["arrays"][name] = "array"
+                elif isinstance(value, list) and any(
+                    isinstance(v, np.ndarray) for v in value
+                ):
+                    # embeddings and face crops: stacked into one array when all of them are of the same shape
+                    if all(
+                        isinstance(v, np.ndarray)
+                        and v.shape == value[0].shape
+                        and v.dtype == value[0].dtype
+                        for v in value
+                    ):
+                        arrays[key] = np.stack(value)
+                        track["arrays"][name] = "stacked"
+                    else:
+                        for i, v in enumerate(value):
+                            if v is not None:
+                                arrays[f"{key}_{i}"] = np.asarray(v)
+                        track["arrays"][name] = [v is not None for v in value]
+                elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+                    track["dataclasses"][name] = {
+                        "type": type(value).__name__,
+                        "fields": dataclasses.asdict(value),
+                    }
+                else:
+                    track["state"][name] = value
+            tracks.append(track)
+
+        arrays["tracks"] = np.array(json.dumps(tracks, default=_json_default))
+
+        # write to temporary file first, so readers never see partially written sidecar
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, **arrays)
+            path = self._sidecar_path(clip)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+        # sidecars of older clip versions or older settings are never valid again
+        self._remove_sidecars(clip, keep=path)
+
+    def remove(self, clip: Any):
+        """
+        Remove all cached annotation results for the clip (if any), whatever clip version
+        or settings they were obtained with.
+
+        Args:
+            clip (minio.datatypes.Object): Original video clip file object as returned by `FaceClipManager.list_clips()`.
+        """
+        self._remove_sidecars(clip)
+
+    def _remove_sidecars(self, clip: Any, keep: Optional[str] = None):
+        """
+        Remove sidecar files of the clip except `keep`.
+        """
+        for path in glob.glob(
+            os.path.join(self.cache_dir, self._clip_hash(clip) + "_*.npz")
+        ):
+            if path != keep:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass  # removed concurrently
+
+    @staticmethod
+    def _clip_hash(clip: Any) -> str:
+        """
+        Get hash of the clip name: the prefix of all sidecar file names of the clip.
+        """
+        return hashlib.sha1(clip.object_name.encode()).hexdigest()
+
+    def _sidecar_path(self, clip: Any) -> str:
+        """
+        Get sidecar file path for the clip.
+        Local storage does not provide ETags, so modification time and size are used instead.
+        """
+        etag = getattr(clip, "etag", None) or f"{clip.last_modified}:{clip.size}"
+        key = f"{etag}|{self._settings_hash}"
+        return os.path.join(
+            self.cache_dir,
+            f"{self._clip_hash(clip)}_{hashlib.sha1(key.encode()).hexdigest()}.npz",
+        )
+
+
+def _make_object(cls: type, state: Dict[str, Any]) -> Any:
+    """
+    Make face object of the dataclass from its saved instance attributes: dataclass fields are passed
+    to the constructor, other attributes are set afterwards.
+    """
+    init_fields = {f.name for f in dataclasses.fields(cls) if f.init}
+    ret = cls(**{name: v for name, v in state.items() if name in init_fields})
+    for name, value in state.items():
+        if name not in init_fields:
+            setattr(ret, name, value)
+    return ret
+
+
+def _json_default(value: Any) -> Any:
+    """
+    Convert values which JSON does not support: NumPy scalars and arrays become numbers and lists.
+    """
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    return str(value)
@@ -0,0 +1,316 @@
+#
+# async_face.py: Asyncio Wrappers of Face Recognition APIs
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Implements asyncio-native counterparts of `FaceRecognizer`, `FaceTracker`, and `ReID_Database` APIs
+# for async web services. Blocking calls run in a shared worker thread pool of bounded size, so many
+# concurrent requests are served on one event loop without a thread per request: requests beyond
+# the pool size wait in the queue. Async batch iterators are long-lived, so each one runs in its own thread
+# instead of occupying a pool worker; the number of running iterators is bounded separately.
+#
+# Cancellation: cancelled calls which did not start yet are removed from the queue; calls already running
+# in a worker thread complete in background and their results are discarded. Async batch iterators stop
+# feeding new frames to the pipeline and shut it down when the consumer stops iterating or is cancelled.
+#
+
+import asyncio, concurrent.futures, contextlib, functools, threading
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, List, Optional
+
+import degirum_face
+from degirum_tools.streams import SinkGizmo, tag_inference
+
+
+class AsyncRunner:
+    """
+    Bounded worker thread pool running blocking calls for coroutines.
+    One runner is usually shared by all async wrappers of the application.
+    """
+
+    def __init__(
+        self, *, max_concurrency: int = 4, max_iterators: int = 4, queue_size: int = 8
+    ):
+        """
+        Constructor.
+
+        Args:
+            max_concurrency (int): Maximum number of blocking calls running at the same time.
+            max_iterators (int): Maximum number of async batch iterators running at the same time;
+                other iterators wait until one of them finishes.
+            queue_size (int): Maximum number of results buffered by async batch iterators;
+                when the consumer is slower, the pipeline is paused.
+        """
+        self.queue_size = queue_size
+        self.max_iterators = max_iterators
+        # created on first use, so it belongs to the event loop of the application
+        self._iterator_slots: Optional[asyncio.Semaphore] = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="AsyncRunner"
+        )
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run blocking function in a worker thread.
+
+        Args:
+            func (Callable): Function to run.
+            *args: Positional arguments of the function.
+            **kwargs: Keyword arguments of the function.
+
+        Returns:
+            Any: Function result.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def iterate(
+        self, func: Callable[[Iterator], Iterator], inputs: Iterable
+    ) -> AsyncIterator:
+        """
+        Run blocking batch function in a dedicated thread and iterate over its results asynchronously.
+        When the consumer stops iterating, the result iterator of the function is closed: generator-based
+        batch functions shut down their pipelines in `finally` blocks.
+
+        Args:
+            func (Callable[[Iterator], Iterator]): Batch function: takes input iterator, returns result iterator.
+            inputs (Iterable): Inputs of the batch function.
+
+        Returns:
+            AsyncIterator: Async iterator over function results.
+        """
+        if self._iterator_slots is None:
+            self._iterator_slots = asyncio.Semaphore(self.max_iterators)
+        iterator_slots = self._iterator_slots
+        await iterator_slots.acquire()
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        # free queue slots: limit the number of results buffered for slow consumer
+        slots = threading.Semaphore(self.queue_size)
+        stop = threading.Event()
+        done = object()
+
+        def put(item) -> bool:
+            # wait for free queue slot, giving up when the consumer is gone
+            while not slots.acquire(timeout=0.1):
+                if stop.is_set():
+                    return False
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                return False  # event loop is closed
+            return True
+
+        def source():
+            for item in inputs:
+                if stop.is_set():
+                    return
+                yield item
+
+        def produce():
+            results = None
+            try:
+                results = func(source())
+                for result in results:
+                    if not put(result):
+                        break
+                put(done)
+            except Exception as e:
+                put(_Error(e))
+            finally:
+                try:
+                    close = getattr(results, "close", None)
+                    if close is not None:
+                        close()  # shuts down the pipeline of generator-based batch functions
+                finally:
+                    # iterator slot is freed only when the pipeline is down
+                    with contextlib.suppress(RuntimeError):
+                        loop.call_soon_threadsafe(iterator_slots.release)
+
+        try:
+            threading.Thread(
+                target=produce, name="AsyncRunnerIterator", daemon=True
+            ).start()
+        except Exception:
+            iterator_slots.release()
+            raise
+        try:
+            while True:
+                item = await queue.get()
+                slots.release()
+                if item is done:
+                    break
+                if isinstance(item, _Error):
+                    raise item.exception
+                yield item
+        finally:
+            stop.set()
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop worker threads.
+
+        Args:
+            wait (bool): Whether to wait for running calls to complete.
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class _Error:
+    """
+    Exception raised by a batch function, passed to the consumer of async batch iterator.
+    """
+
+    def __init__(self, exception: Exception):
+        self.exception = exception
+
+
+class AsyncReID_Database:
+    """
+    Async wrapper of `ReID_Database`: every database method is available as a coroutine with the same name
+    and arguments, e.g. `await db.list_objects()`.
+    """
+
+    def __init__(self, db: degirum_face.ReID_Database, runner: AsyncRunner):
+        """
+        Constructor.
+
+        Args:
+            db (ReID_Database): Database to wrap.
+            runner (AsyncRunner): Runner of blocking calls.
+        """
+        self.db = db
+        self._runner = runner
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        method = getattr(self.db, name)
+
+        async def call(*args, **kwargs):
+            return await self._runner.run(method, *args, **kwargs)
+
+        return call
+
+
+class AsyncFaceRecognizer:
+    """
+    Async wrapper of `FaceRecognizer`.
+
+    Usage:
+        runner = AsyncRunner(max_concurrency=4)
+        recognizer = AsyncFaceRecognizer(degirum_face.FaceRecognizer(config), runner)
+        result = await recognizer.predict_async("photo.jpg")
+        async for result in recognizer.predict_batch_async(photos):
+            ...
+    """
+
+    def __init__(self, recognizer: degirum_face.FaceRecognizer, runner: AsyncRunner):
+        """
+        Constructor.
+
+        Args:
+            recognizer (FaceRecognizer): Face recognizer to wrap.
+            runner (AsyncRunner): Runner of blocking calls.
+        """
+        self.recognizer = recognizer
+        self._runner = runner
+        self.db: Optional[AsyncReID_Database] = (
+            AsyncReID_Database(recognizer.db, runner)
+            if recognizer.db is not None
+            else None
+        )
+
+    async def predict_async(self, frame: Any) -> Any:
+        """
+        Recognize faces in a single image; see `FaceRecognizer.predict()`.
+        """
+        return await self._runner.run(self.recognizer.predict, frame)
+
+    def predict_batch_async(self, frames: Iterable) -> AsyncIterator:
+        """
+        Recognize faces in a batch of frames; see `FaceRecognizer.predict_batch()`.
+
+        Returns:
+            AsyncIterator: Async iterator over face recognition results.
+        """
+        return self._runner.iterate(self.recognizer.predict_batch, frames)
+
+    async def enroll_image_async(self, frame: Any, attributes: Any) -> Any:
+        """
+        Enroll a single image; see `FaceRecognizer.enroll_image()`.
+        """
+        return await self._runner.run(self.recognizer.enroll_image, frame, attributes)
+
+    async def enroll_batch_async(self, frames: Iterable, attributes: Iterable) -> List:
+        """
+        Enroll a batch of frames; see `FaceRecognizer.enroll_batch()`.
+        """
+        return await self._runner.run(self.recognizer.enroll_batch, frames, attributes)
+
+
+class AsyncFaceTracker:
+    """
+    Async wrapper of `FaceTracker` clip analysis and enrollment APIs.
+    """
+
+    def __init__(self, tracker: degirum_face.FaceTracker, runner: AsyncRunner):
+        """
+        Constructor.
+
+        Args:
+            tracker (FaceTracker): Face tracker to wrap.
+            runner (AsyncRunner): Runner of blocking calls.
+        """
+        self.tracker = tracker
+        self._runner = runner
+        self.db: Optional[AsyncReID_Database] = (
+            AsyncReID_Database(tracker.db, runner) if tracker.db is not None else None
+        )
+
+    def predict_batch_async(self, stream: Iterable) -> AsyncIterator:
+        """
+        Recognize faces in a video stream; see `FaceTracker.predict_batch()`.
+
+        Returns:
+            AsyncIterator: Async iterator over face recognition results.
+        """
+        return self._runner.iterate(self._predict_batch, stream)
+
+    def _predict_batch(self, stream: Iterable) -> Iterator:
+        """
+        Same as `FaceTracker.predict_batch()`, but stops the pipeline also when the consumer stops iterating.
+        """
+        sink = SinkGizmo()
+        composition, _ = self.tracker.start_face_tracking_pipeline(
+            frame_iterator=stream, sink=sink, sink_connection_point="recognizer"
+        )
+        try:
+            for data in sink():
+                yield data.meta.find_last(tag_inference)
+        finally:
+            composition.stop()
+
+    async def find_faces_in_file_async(self, file_path: str, **kwargs) -> dict:
+        """
+        Run the face analysis pipeline on a video clip local file; see `FaceTracker.find_faces_in_file()`.
+        """
+        return await self._runner.run(
+            self.tracker.find_faces_in_file, file_path, **kwargs
+        )
+
+    async def find_faces_in_clip_async(self, clip_object_name: str, **kwargs) -> dict:
+        """
+        Run the face analysis pipeline on a video clip object; see `FaceTracker.find_faces_in_clip()`.
+        """
+        return await self._runner.run(
+            self.tracker.find_faces_in_clip, clip_object_name, **kwargs
+        )
+
+    async def enroll_async(self, face_list: Any):
+        """
+        Enroll face attributes into the database; see `FaceTracker.enroll()`.
+        """
+        await self._runner.run(self.tracker.enroll, face_list)
@@ -0,0 +1,416 @@
+#
+# compiled_face_filter.py: Compiled Face Filter with Multiple Zones
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Implements drop-in replacement of `FaceFilter` which evaluates all filters over all faces of a frame
+# as one combined mask instead of face by face. Face filter configuration is compiled once per frame resolution:
+# - zone polygons are rasterized into one bitmap of zone labels, so zone membership of all faces in all zones
+#   is a single lookup instead of a mask lookup per zone;
+# - filter rules become arrays indexed by zone label, so each face is checked against the rules of its zone.
+# Small face, frontal, and shift checks are computed for all faces at once from bbox and landmarks arrays.
+#
+# Several zones with their own rules (`FaceZone`) are supported; when zones overlap, the first zone in the list
+# wins. Without zones, results are the same as the ones of the original `FaceFilter` with `ZoneCounter`.
+#
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import degirum_face
+import degirum_tools
+from degirum_face import FaceFilter, FaceFilterConfig
+from degirum_face.face_data import FaceStatus
+from degirum_face.logging_config import logger
+from analyzer_factory import add_analyzer_transform
+
+
+@dataclass
+class FaceZone:
+    """Face filter zone with its own filter rules.
+
+    Attributes:
+        polygon (List[List[int]]): Zone polygon as a list of [x, y] points; minimum 3 points required.
+            Faces whose bbox center is inside the polygon are checked against the zone rules.
+        name (str): Zone name shown on the overlay.
+        enable_small_face_filter (Optional[bool]): Small face filter flag; None to use `FaceFilterConfig` value.
+        min_face_size (Optional[int]): Minimum face size in pixels; None to use `FaceFilterConfig` value.
+        enable_frontal_filter (Optional[bool]): Frontal filter flag; None to use `FaceFilterConfig` value.
+        enable_shift_filter (Optional[bool]): Shift filter flag; None to use `FaceFilterConfig` value.
+    """
+
+    polygon: List[List[int]] = field(default_factory=list)
+    name: str = ""
+    enable_small_face_filter: Optional[bool] = None
+    min_face_size: Optional[int] = None
+    enable_frontal_filter: Optional[bool] = None
+    enable_shift_filter: Optional[bool] = None
+
+
+class _CompiledRules:
+    """
+    Face filter configuration compiled for one frame resolution.
+
+    Attributes:
+        labels (np.ndarray): (H + 1, W + 1) bitmap of zone labels: 0 outside of all zones, k + 1 inside zone k.
+        min_face_size (np.ndarray): Minimum face size per label; 0 when small face filter is disabled.
+        frontal (np.ndarray): Frontal filter flag per label.
+        shift (np.ndarray): Shift filter flag per label.
+        in_zone (np.ndarray): Whether faces with the label pass zone filter.
+    """
+
+    def __init__(
+        self,
+        config: FaceFilterConfig,
+        zones: List[FaceZone],
+        zone_filter: bool,
+        width: int,
+        height: int,
+    ):
+        self.labels = np.zeros(
+            (height + 1, width + 1), dtype=np.uint8 if len(zones) < 255 else np.uint16
+        )
+        # rasterize in reverse order, so the first of overlapping zones wins
+        for k in reversed(range(len(zones))):
+            cv2.fillPoly(
+                self.labels, [np.array(zones[k].polygon, dtype=np.int32)], k + 1
+            )
+
+        # label 0 (outside of all zones) uses global rules
+        rules = [
+            (
+                config.enable_small_face_filter,
+                config.min_face_size,
+                config.enable_frontal_filter,
+                config.enable_shift_filter,
+            )
+        ]
+        for zone in zones:
+            rules.append(
+                (
+                    _override(
+                        zone.enable_small_face_filter, config.enable_small_face_filter
+                    ),
+                    _override(zone.min_face_size, config.min_face_size),
+                    _override(zone.enable_frontal_filter, config.enable_frontal_filter),
+                    _override(zone.enable_shift_filter, config.enable_shift_filter),
+                )
+            )
+        self.min_face_size = np.array(
+            [size if small else 0 for small, size, _, _ in rules], dtype=np.float64
+        )
+        self.frontal = np.array([r[2] for r in rules], dtype=bool)
+        self.shift = np.array([r[3] for r in rules], dtype=bool)
+        self.in_zone = np.ones(len(rules), dtype=bool)
+        if zone_filter:
+            self.in_zone[0] = False
+
+
+def _override(value, default):
+    return default if value is None else value
+
+
+class CompiledFaceFilter(FaceFilter):
+    """
+    `FaceFilter` which evaluates all filters over all faces of the frame as one combined mask,
+    using configuration compiled once per frame resolution, and supports several zones with their own rules.
+    Zone membership is computed by this analyzer itself: it needs no `ZoneCounter` in upstream.
+    """
+
+    def __init__(
+        self,
+        config: FaceFilterConfig,
+        face_reid_map: Optional[degirum_face.face_data.FaceMap] = None,
+        *,
+        zones: Optional[List[FaceZone]] = None,
+        show_overlay: bool = True,
+    ):
+        """
+        Constructor.
+
+        Args:
+            config (FaceFilterConfig): Configuration for face filtering; its rules apply to faces
+                outside of all zones and to zone rules which are not specified.
+            face_reid_map (Optional[FaceMap]): The map of face IDs to face attributes.
+            zones (Optional[List[FaceZone]]): Zones with their own rules; faces outside of all zones are filtered out.
+                When None, `config.zone` is used as a single zone if zone filter is enabled.
+            show_overlay (bool): Whether to draw zone polygons on the overlay image.
+        """
+        super().__init__(config, face_reid_map)
+        if zones is None:
+            zones = [FaceZone(polygon=config.zone)] if config.enable_zone_filter else []
+        self._zones = zones
+        self._zone_filter = bool(zones)
+        self._show_overlay = show_overlay
+        self._compiled: Dict[Tuple[int, int], _CompiledRules] = {}
+
+    def analyze(self, result):
+        """Analyze inference result and mark faces for reID processing"""
+
+        frame_id = getattr(
+            result, degirum_face.FaceDetectorGizmo.key_face_tracking_frame_id, None
+        )
+        if frame_id is None:
+            raise Exception(
+                f"{self.__class__.__name__}: frame ID not found in result metadata: you need to have FaceDetectorGizmo in upstream"
+            )
+
+        faces, face_names = [], []
+        for i, face in enumerate(result.results):
+            track_id = face.get("track_id")
+            track_id_str = f"tid {track_id}" if track_id is not None else f"face #{i}"
+            landmarks = face.get("landmarks")
+            if not landmarks or len(landmarks) != 5:
+                logger.info(f"F {frame_id}, {track_id_str}: skip - invalid landmarks")
+                face[self.key_face_filter_applied] = "no-landmarks"
+            else:
+                face[self.key_face_tracking_keypoints] = [
+                    np.array(lm["landmark"]) for lm in landmarks
+                ]
+                faces.append(face)
+                face_names.append(track_id_str)
+        if not faces:
+            return
+
+        rules = self._rules(*degirum_tools.image_size(result.image))
+        points = np.array(
+            [[lm["landmark"][:2] for lm in face["landmarks"]] for face in faces],
+            dtype=np.float64,
+        )
+        # size, zone, and shift checks need bbox: faces without bbox are outside of all zones and skip other checks
+        has_bbox = np.array(["bbox" in face for face in faces])
+        bboxes = np.array(
+            [face["bbox"] if "bbox" in face else [0, 0, 0, 0] for face in faces],
+            dtype=np.float64,
+        )
+
+        # zone label of each face: bbox center clipped to the frame, the same way as `ZoneCounter` does
+        h, w = rules.labels.shape[0] - 1, rules.labels.shape[1] - 1
+        clipped = np.clip(bboxes, 0, [w, h, w, h])
+        labels = rules.labels[
+            np.ceil((clipped[:, 1] + clipped[:, 3]) * 0.5).astype(np.intp),
+            np.ceil((clipped[:, 0] + clipped[:, 2]) * 0.5).astype(np.intp),
+        ].astype(np.intp)
+        labels[~has_bbox] = 0
+
+        xc = (bboxes[:, 0] + bboxes[:, 2]) * 0.5
+        yc = (bboxes[:, 1] + bboxes[:, 3]) * 0.5
+
+        # all filters as masks over all faces, in the order of precedence of the original filter
+        face_size = np.minimum(
+            np.abs(bboxes[:, 2] - bboxes[:, 0]), np.abs(bboxes[:, 3] - bboxes[:, 1])
+        )
+        small = has_bbox & (face_size < rules.min_face_size[labels])
+        not_in_zone = ~rules.in_zone[labels]
+        not_frontal = rules.frontal[labels] & ~_is_frontal(points)
+        shifted = has_bbox & rules.shift[labels] & _is_shifted(xc, yc, points)
+        verdicts = np.select(
+            [small, not_in_zone, not_frontal, shifted],
+            ["small-face", "not-in-zone", "not-frontal", "face-shifted"],
+            default="",
+        )
+
+        if self._zone_filter:
+            key_in_zone = degirum_tools.ZoneCounter.key_in_zone
+            for face, label, bbox_found in zip(faces, labels, has_bbox):
+                if bbox_found:
+                    face[key_in_zone] = [
+                        label == k + 1 for k in range(len(self._zones))
+                    ]
+
+        for face, verdict, track_id_str in zip(faces, verdicts, face_names):
+            self._apply(face, str(verdict), frame_id, track_id_str)
+
+    def annotate(self, result, image: np.ndarray) -> np.ndarray:
+        """Draw zone polygons on the image"""
+
+        if not self._show_overlay or not self._zone_filter:
+            return image
+        color = degirum_tools.rgb_to_bgr(
+            degirum_tools.color_complement(result.overlay_color)
+        )
+        for zone in self._zones:
+            polygon = np.array(zone.polygon, dtype=np.int32)
+            cv2.polylines(image, [polygon], True, color, result.overlay_line_width)
+            if zone.name:
+                x, y = polygon.min(axis=0)
+                cv2.putText(
+                    image,
+                    zone.name,
+                    (int(x) + 2, int(y) + 14),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    0.5,
+                    color,
+                    1,
+                )
+        return image
+
+    def _rules(self, width: int, height: int) -> _CompiledRules:
+        """
+        Get filter configuration compiled for the frame resolution.
+        """
+        rules = self._compiled.get((width, height))
+        if rules is None:
+            rules = _CompiledRules(
+                self._config, self._zones, self._zone_filter, width, height
+            )
+            self._compiled[(width, height)] = rules
+        return rules
+
+    def _apply(self, face: dict, verdict: str, frame_id: int, track_id_str: str):
+        """
+        Mark the face with filter verdict and update face reID map.
+        """
+        track_id = face.get("track_id")
+        if verdict:
+            logger.info(f"F {frame_id}, {track_id_str}: skip - {_messages[verdict]}")
+        if verdict == "small-face":
+            face[self.key_face_filter_applied] = verdict
+            return
+
+        face_status = (
+            self._face_reid_map.get(track_id)
+            if self._face_reid_map and track_id is not None
+            else None
+        )
+
+        if verdict:
+            # delay next reID attempt to avoid premature object deletion from face map
+            if face_status is not None and self._face_reid_map is not None:
+                face_status.next_reid_frame = max(
+                    face_status.next_reid_frame, frame_id + 1
+                )
+                self._face_reid_map.put(track_id, face_status)
+            face[self.key_face_filter_applied] = verdict
+            return
+
+        # apply filtering based on the face reID map
+        if self._face_reid_map is not None:
+            if track_id is None:
+                face[self.key_face_filter_applied] = "no-track-id"
+                return
+
+            if face_status is None:
+                # new face
+                face_status = FaceStatus(
+                    attributes=None,
+                    track_id=track_id,
+                    initial_frame=frame_id,
+                    last_reid_frame=frame_id,
+                    next_reid_frame=frame_id + 1,
+                )
+            elif self._config.enable_reid_expiration_filter:
+                if frame_id < face_status.next_reid_frame:
+                    logger.info(
+                        f"F {frame_id}, {track_id_str}: skip - reID not expired"
+                    )
+                    face[self.key_face_filter_applied] = "reid-not-expired"
+                    return
+
+                delta = min(
+                    self._config.reid_expiration_frames,
+                    2 * (face_status.next_reid_frame - face_status.last_reid_frame),
+                )
+                face_status.last_reid_frame = frame_id
+                face_status.next_reid_frame = frame_id + delta
+            else:
+                # if no expiration filter, always do reID
+                face_status.last_reid_frame = frame_id
+                face_status.next_reid_frame = frame_id + 1
+
+            self._face_reid_map.put(track_id, face_status)
+
+        face[self.key_face_filter_applied] = ""  # mark for reID processing
+
+
+# log messages of filter verdicts, the same as the ones of the original filter
+_messages = {
+    "small-face": "too small face",
+    "not-in-zone": "not in zone",
+    "not-frontal": "not frontal",
+    "face-shifted": "face is shifted",
+}
+
+
+def _is_frontal(points: np.ndarray) -> np.ndarray:
+    """
+    Vectorized `face_is_frontal()`: check if nose keypoint is inside eyes-mouth quadrangle for all faces.
+
+    Args:
+        points (np.ndarray): (N, 5, 2) landmarks: left eye, right eye, nose, left mouth, right mouth.
+
+    Returns:
+        np.ndarray: (N,) boolean array.
+    """
+    # quadrangle vertices in the order of the original test: left eye, right eye, right mouth, left mouth
+    quad = points[:, [0, 1, 4, 3], :]
+    nose = points[:, 2:3, :]
+    a = quad
+    b = np.roll(quad, -1, axis=1)
+    # even-odd rule: count quadrangle edges crossed by horizontal ray from the nose to the right
+    spans = (a[..., 1] > nose[..., 1]) != (b[..., 1] > nose[..., 1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = a[..., 0] + (nose[..., 1] - a[..., 1]) * (b[..., 0] - a[..., 0]) / (
+            b[..., 1] - a[..., 1]
+        )
+    crossings = np.count_nonzero(spans & (nose[..., 0] < x_cross), axis=1)
+    return crossings % 2 == 1
+
+
+def _is_shifted(xc: np.ndarray, yc: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """
+    Vectorized `face_is_shifted()`: check if all keypoints are in one half of the face bbox for all faces.
+
+    Args:
+        xc (np.ndarray): (N,) bbox center x coordinates.
+        yc (np.ndarray): (N,) bbox center y coordinates.
+        points (np.ndarray): (N, K, 2) landmarks.
+
+    Returns:
+        np.ndarray: (N,) boolean array.
+    """
+    x, y = points[..., 0], points[..., 1]
+    xc, yc = xc[:, None], yc[:, None]
+    return np.logical_or.reduce(
+        [
+            (x < xc).all(axis=1),
+            (x >= xc).all(axis=1),
+            (y < yc).all(axis=1),
+            (y >= yc).all(axis=1),
+        ]
+    )
+
+
+def use_compiled_face_filter(
+    face_tracker: degirum_face.FaceTracker, *, zones: Optional[List[FaceZone]] = None
+):
+    """
+    Make face tracker pipelines use `CompiledFaceFilter`: `FaceFilter` is replaced by it,
+    and `ZoneCounter` of the zone filter is removed, since the compiled filter computes zone membership itself
+    (see `add_analyzer_transform()`). Call it before starting any pipeline of the face tracker.
+
+    Args:
+        face_tracker (FaceTracker): Face tracker to modify.
+        zones (Optional[List[FaceZone]]): Zones with their own rules; when None or empty,
+            the zone of face filter configuration is used.
+    """
+
+    def compile_filter(analyzers: list, config, face_map) -> list:
+        ret = []
+        for analyzer in analyzers:
+            if isinstance(analyzer, degirum_tools.ZoneCounter):
+                continue
+            if type(analyzer) is FaceFilter:
+                ret.append(
+                    CompiledFaceFilter(
+                        config.face_filters, face_map, zones=zones or None
+                    )
+                )
+            else:
+                ret.append(analyzer)
+        return ret
+
+    add_analyzer_transform(face_tracker, compile_filter)
@@ -6,41 +6,239 @@
 #
 # Implements NiceGUI web application for face tracking using DeGirum's face recognition package.
 # Provides a live stream of the camera feed, allows video clip annotation, and manages face reID database.
-# You can configure all the settings in the `config.yaml` file.
+# You can configure all the settings in the `config.yaml` file; set `FACE_TRACKING_CONFIG` environment
+# variable to use another configuration file, e.g. to run one application instance per camera.
 #
 # Pre-requisites:
 # - Install NiceGUI: `pip install nicegui`
 # - Install DeGirum Face SDK: `pip install degirum-face`
 #
 
-import os, io, asyncio, urllib.parse, uuid
+import asyncio, logging, os, io, urllib.parse, uuid
+from typing import Any
+import yaml
 
 import degirum_face
 from degirum_tools import MediaServer
-
-from nicegui import ui, app, context
-from fastapi.responses import StreamingResponse, JSONResponse, Response
+from degirum_tools.streams import SinkGizmo
+
+from nicegui import ui, app, context, background_tasks
+from fastapi.responses import (
+    StreamingResponse,
+    JSONResponse,
+    Response,
+    PlainTextResponse,
+)
 from fastapi import Request
 
+from annotation_cache import AnnotationCache
+from async_face import AsyncRunner, AsyncFaceTracker
+from notification_dispatcher import NotificationDispatcher
+from pipeline_metrics import PipelineMetrics, render_prometheus
+from frame_tracer import FrameTracer
+from track_match_cache import TrackMatchCache
+from vectorized_analyzers import use_vectorized_analyzers
+from compiled_face_filter import FaceZone, use_compiled_face_filter
+import live_preview
+import fast_start
+from reid_db_snapshots import ReID_DatabaseProxy, ReID_DatabaseSnapshots
+import reid_db_service
+
+# configuration file of this application instance
+CONFIG_FILE = os.environ.get("FACE_TRACKING_CONFIG", "config.yaml")
+
+# local directory to keep cached clip annotation results in
+ANNOTATION_CACHE_DIR = "temp/annotation_cache"
+
+# local file to keep times of cloud zoo syncs of local model copies in
+MODEL_SYNC_CACHE_FILE = "temp/model_sync_cache.json"
+
+# media server configuration file generated when media server viewers are counted
+MEDIA_SERVER_CONFIG_FILE = "temp/mediamtx.yml"
+
+# time in seconds for the media server to start reading the live stream after on-demand request
+MEDIA_SERVER_DEMAND_TIMEOUT_S = 15.0
+
+logger = logging.getLogger(__name__)
+
 
 @app.on_startup
 def startup():
     """Initialize the face tracking application on startup."""
 
     # load settings from YAML file
-    app.state.config, _ = degirum_face.FaceTrackerConfig.from_yaml(
-        yaml_file="config.yaml"
+    app.state.config, settings = degirum_face.FaceTrackerConfig.from_yaml(
+        yaml_file=CONFIG_FILE
     )
     app.state.config.live_stream_mode = "WEB"
 
-    # start face tracking pipeline
+    # optional fast start: models are loaded from local copies refreshed once per TTL period
+    fast_start_settings = dict(settings.get("fast_start", {}))
+    fast_start_enabled = fast_start_settings.pop("enabled", False)
+    preload = fast_start_settings.pop("preload", True)
+    if fast_start_enabled:
+        model_sync_cache = fast_start.ModelSyncCache(
+            MODEL_SYNC_CACHE_FILE,
+            ttl_s=fast_start_settings.pop("model_sync_ttl_s", 24 * 3600),
+        )
+        app.state.config = model_sync_cache.localize(app.state.config)
+
+    # optional ReID database service: database calls and searches of face trackers go to the server process,
+    # which is the only one writing the database; the client is attached to each face tracker
+    db_service = dict(settings.get("db_service", {}))
+    db_client = None
+    if db_service.pop("enabled", False) and app.state.config.db_path:
+        db_client = reid_db_service.connect(
+            app.state.config.db_path,
+            model_name=app.state.config.face_embedding_model_spec.model_name,
+            **db_service,
+        )
+
+    # optional periodic incremental database snapshots: without the database service, face trackers use
+    # the database through a proxy, which snapshots hold while reading table versions and reopen after restore
+    snapshot_settings = dict(settings.get("db_snapshots", {}))
+    snapshots_enabled = snapshot_settings.pop("enabled", False)
+    db: Any = db_client
+    if snapshots_enabled and db is None and app.state.config.db_path:
+        db = ReID_DatabaseProxy(
+            app.state.config.db_path,
+            app.state.config.face_embedding_model_spec.model_name,
+            app.state.config.read_consistency_interval,
+        )
+    # database attached to face trackers, if any
+    app.state.db = db
+
+    # bounded worker pool for blocking face tracking and database calls made from UI callbacks
+    app.state.async_runner = AsyncRunner(**settings.get("async_runner", {}))
+
+    # optional liveness detection; face trackers use vectorized head pose and liveness analyzers
+    liveness = dict(settings.get("liveness", {}))
+    app.state.liveness = liveness if liveness.pop("enabled", False) else None
+
+    # face filter zones with their own filter rules; face trackers use compiled face filter
+    app.state.face_zones = [FaceZone(**zone) for zone in settings.get("face_zones", [])]
+
+    # cache of clip annotation results: clip trackers use the face zones and liveness settings as well
+    app.state.annotation_cache = AnnotationCache(
+        ANNOTATION_CACHE_DIR,
+        app.state.config,
+        {
+            "face_zones": settings.get("face_zones", []),
+            "liveness": app.state.liveness,
+        },
+    )
+
+    # start notification dispatcher
+    app.state.notification_dispatcher = NotificationDispatcher(
+        notify_client,
+        lambda: list(app.clients("/")),
+        **settings.get("notification_dispatch", {}),
+    )
+    background_tasks.create(
+        app.state.notification_dispatcher.run(), name="notification_dispatcher"
+    )
+
+    # start face tracking pipeline with metrics collector attached to face detector output
     app.state.pipelines = []
-    app.state.pipelines.append(
-        degirum_face.FaceTracker(app.state.config).start_face_tracking_pipeline()
+    app.state.pipeline_metrics = []
+    app.state.frame_tracers = []
+    pipeline_name = str(len(app.state.pipelines))
+
+    # models and database are loaded in parallel before the video source is opened
+    pipeline_config = app.state.config
+    if fast_start_enabled and preload:
+        pipeline_config = fast_start.warm_up(pipeline_config, preload_db=db is None)
+
+    # optional per-frame tracing: tracing hooks are installed into pipeline config only when enabled
+    tracing = dict(settings.get("tracing", {}))
+    tracer = None
+    if tracing.pop("enabled", False):
+        tracer = FrameTracer(name=pipeline_name, **tracing)
+        pipeline_config = tracer.instrument(pipeline_config, db=db)
+        tracer.start()
+        app.state.frame_tracers.append(tracer)
+
+    # optional track match cache: identified tracks skip database search while their embeddings stay similar
+    match_cache_settings = dict(settings.get("match_cache", {}))
+    match_cache = None
+    if match_cache_settings.pop("enabled", False):
+        match_cache = TrackMatchCache(**match_cache_settings)
+        pipeline_config = match_cache.instrument(pipeline_config, db=db)
+
+    # live stream is annotated and encoded only while somebody watches it
+    live_preview_settings = dict(settings.get("live_preview", {}))
+    app.state.media_server_viewers = live_preview_settings.pop(
+        "count_media_server_viewers", False
     )
+    app.state.live_stream_viewers = live_preview.ViewerTracker()
+    face_tracker = live_preview.ViewerAwareFaceTracker(
+        pipeline_config,
+        app.state.live_stream_viewers,
+        tracer=tracer,
+        **live_preview_settings,
+    )
+    if db is not None:
+        db.attach(face_tracker)
+
+    # on snapshot restore, the database server reloads the database and track matches are forgotten
+    app.state.db_snapshots = None
+    if snapshots_enabled and app.state.config.db_path:
+        app.state.db_snapshots = ReID_DatabaseSnapshots(
+            app.state.config.db_path,
+            snapshot_settings.pop("store_dir"),
+            db=db,
+        )
+        if db_client is not None:
+            app.state.db_snapshots.add_restore_listener(
+                lambda record, method: db_client.reload()
+            )
+        if match_cache is not None:
+            app.state.db_snapshots.add_restore_listener(
+                lambda record, method: match_cache.clear()
+            )
+        background_tasks.create(
+            take_db_snapshots(app.state.db_snapshots, **snapshot_settings),
+            name="db_snapshots",
+        )
 
-    # start media server for RTSP streaming
-    app.state.media_server = MediaServer()
+    use_vectorized_analyzers(face_tracker, liveness=app.state.liveness)
+    use_compiled_face_filter(face_tracker, zones=app.state.face_zones)
+    if tracer is not None:
+        tracer.instrument_analyzers(face_tracker)
+    # metrics sink is a dropping side branch of face detector output, so it never slows down the pipeline;
+    # face recognizer is measured by its gizmo counters
+    metrics_sink = SinkGizmo(allow_drop=True)
+    composition, watchdog = face_tracker.start_face_tracking_pipeline(
+        sink=metrics_sink, sink_connection_point="detector"
+    )
+    metrics = PipelineMetrics(
+        composition,
+        watchdog,
+        metrics_sink,
+        db=face_tracker.db,
+        tracer=tracer,
+        match_cache=match_cache,
+        name=pipeline_name,
+    )
+    metrics.start()
+    app.state.pipelines.append((composition, watchdog))
+    app.state.pipeline_metrics.append(metrics)
+
+    # start media server for RTSP streaming; optionally it reports live stream readers to this application
+    if app.state.media_server_viewers:
+        port = settings.get("web_app", {}).get("port", 8080)
+        media_server_config = live_preview.media_server_config(
+            app.state.config.live_stream_rtsp_url,
+            f"http://localhost:{port}/live_stream/viewers",
+        )
+        os.makedirs(os.path.dirname(MEDIA_SERVER_CONFIG_FILE), exist_ok=True)
+        with open(MEDIA_SERVER_CONFIG_FILE, "w") as f:
+            yaml.safe_dump(media_server_config, f)
+        app.state.media_server = MediaServer(
+            config_path=os.path.abspath(MEDIA_SERVER_CONFIG_FILE)
+        )
+    else:
+        app.state.media_server = MediaServer()
 
 
 @app.on_shutdown
@@ -50,8 +248,34 @@ def cleanup():
     for composition, _ in app.state.pipelines:
         composition.stop()
 
+    for tracer in app.state.frame_tracers:
+        tracer.stop()  # write final trace file
+
     app.state.media_server.stop()  # stop the media server
 
+    app.state.async_runner.shutdown(wait=False)
+
+
+async def take_db_snapshots(
+    snapshots: ReID_DatabaseSnapshots, *, interval_h: float = 24.0, keep: int = 7
+):
+    """
+    Take incremental database snapshots periodically, keeping only the latest ones.
+
+    Args:
+        snapshots (ReID_DatabaseSnapshots): Snapshot store of the database.
+        interval_h (float): Snapshot period in hours.
+        keep (int): Number of latest snapshots to keep.
+    """
+    while True:
+        await asyncio.sleep(interval_h * 3600)
+        try:
+            await app.state.async_runner.run(snapshots.snapshot)
+            for record in snapshots.list_snapshots()[:-keep]:
+                await app.state.async_runner.run(snapshots.delete, record["id"])
+        except Exception:
+            logger.exception("Database snapshot failed")
+
 
 @ui.page("/health")
 def health_check():
@@ -80,43 +304,161 @@ def health_check():
 
     return JSONResponse(
         status_code=status_code,
-        content={"status": status, "pipelines": pipeline_states},
+        content={
+            "status": status,
+            "pipelines": pipeline_states,
+            "notifications": app.state.notification_dispatcher.get_stats(),
+        },
     )
 
 
+@app.get("/metrics")
+def metrics_endpoint():
+    """Metrics endpoint in Prometheus text exposition format."""
+
+    notification_stats = app.state.notification_dispatcher.get_stats()
+    return PlainTextResponse(
+        render_prometheus(
+            app.state.pipeline_metrics,
+            {
+                f"notifications_{k}_total": ("counter", notification_stats[k])
+                for k in ("received", "dropped", "delivered", "failed", "skipped")
+            }
+            | {
+                "notifications_queue_depth": (
+                    "gauge",
+                    notification_stats["queue_depth"],
+                ),
+                "live_stream_viewers": ("gauge", app.state.live_stream_viewers.count),
+            },
+        ),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+async def notify_client(client, message: str):
+    """Show notification message on the connected main page client."""
+
+    with client:
+        ui.notify(message, type="info", position="top", multi_line=True)
+
+
 @app.post("/notify")
 async def notify(request: Request):
     """Webhook endpoint to receive notifications from face recognition pipeline.
 
-    Broadcasts the notification to all connected main page clients.
+    Queues the notification for delivery to all connected main page clients
+    and returns immediately, so slow delivery never stalls the pipeline.
     """
 
     body = (await request.body()).decode("utf-8")
+    app.state.notification_dispatcher.submit(body)
+
+    return JSONResponse(
+        status_code=202, content={"status": "notification queued", "message": body}
+    )
+
+
+def is_local_request(request: Request) -> bool:
+    """Check if the request comes from this host."""
+
+    return request.client is not None and request.client.host in ("127.0.0.1", "::1")
+
+
+@app.post("/live_stream/viewers/{viewer_id}")
+def add_live_stream_viewer(request: Request, viewer_id: str):
+    """Register live stream viewer reported by the media server hooks (see `live_preview.media_server_config()`)."""
+
+    if not is_local_request(request):
+        return JSONResponse(status_code=403, content={"status": "forbidden"})
+
+    # on-demand request only has to start the encoder until the reader is registered by itself
+    app.state.live_stream_viewers.add(
+        viewer_id,
+        timeout_s=(
+            MEDIA_SERVER_DEMAND_TIMEOUT_S if viewer_id == "media_demand" else None
+        ),
+    )
+    return JSONResponse(content={"viewers": app.state.live_stream_viewers.count})
+
+
+@app.delete("/live_stream/viewers/{viewer_id}")
+def remove_live_stream_viewer(request: Request, viewer_id: str):
+    """Unregister live stream viewer reported by the media server hooks."""
+
+    if not is_local_request(request):
+        return JSONResponse(status_code=403, content={"status": "forbidden"})
 
-    # Broadcast notification to all connected clients on the main page
-    for client in app.clients("/"):
-        with client:
-            ui.notify(body, type="info", position="top")
+    app.state.live_stream_viewers.remove(viewer_id)
+    return JSONResponse(content={"viewers": app.state.live_stream_viewers.count})
 
-    return JSONResponse({"status": "notification sent", "message": body})
+
+@app.post("/db_snapshots/{snapshot_id}/restore")
+async def restore_db_snapshot(request: Request, snapshot_id: str):
+    """Restore the database from snapshot (see `reid_db_snapshots.py`); caches of database contents are refreshed."""
+
+    if not is_local_request(request):
+        return JSONResponse(status_code=403, content={"status": "forbidden"})
+    if app.state.db_snapshots is None:
+        return JSONResponse(
+            status_code=404, content={"status": "Database snapshots are disabled"}
+        )
+
+    try:
+        method = await app.state.async_runner.run(
+            app.state.db_snapshots.restore, snapshot_id
+        )
+    except KeyError:
+        return JSONResponse(status_code=404, content={"status": "Snapshot not found"})
+    return JSONResponse(content={"status": "ok", "method": method})
+
+
+def set_live_stream_viewer(client_id: str, viewing: bool):
+    """
+    Register or unregister web client as live stream viewer. When media server viewers are counted,
+    live stream frames of web pages are registered by the media server as any other reader.
+    """
+
+    if app.state.media_server_viewers:
+        return
+    if viewing:
+        app.state.live_stream_viewers.add(client_id)
+    else:
+        app.state.live_stream_viewers.remove(client_id)
 
 
 @ui.page("/")
-def main_page():
+async def main_page():
 
     # View names
     VIEW_CONFIGURATION = "Configuration"
     VIEW_LIVE_STREAM = "Live Stream"
 
-    face_tracker = degirum_face.FaceTracker(app.state.config)
+    clip_tracker = degirum_face.FaceTracker(app.state.config)
+    if app.state.db is not None:
+        app.state.db.attach(clip_tracker)
+    use_vectorized_analyzers(clip_tracker, liveness=app.state.liveness)
+    use_compiled_face_filter(clip_tracker, zones=app.state.face_zones)
+    face_tracker = AsyncFaceTracker(clip_tracker, app.state.async_runner)
     clip_manager = degirum_face.FaceClipManager(app.state.config.clip_storage_config)
     clips = clip_manager.list_clips()
-    known_objects = face_tracker.db.list_objects()
+    known_objects = await face_tracker.db.list_objects()
     face_map: dict = {}
+    face_map_clip = None  # original clip object face_map was obtained from
 
     # Track current view selection
     current_view = {"selection": VIEW_CONFIGURATION}
 
+    # live stream viewer registration of this client: it is dropped while the client is disconnected
+    # and restored on reconnection
+    client_id = context.client.id
+    context.client.on_connect(
+        lambda: set_live_stream_viewer(
+            client_id, current_view["selection"] == VIEW_LIVE_STREAM
+        )
+    )
+    context.client.on_disconnect(lambda: set_live_stream_viewer(client_id, False))
+
     def sorted_known_objects():
         """Return known objects sorted by their attributes."""
         return sorted([str(a) for a in known_objects.values() if a])
@@ -136,13 +478,17 @@ def main_page():
             else:
                 btn.classes(remove="bg-blue-100 text-blue-800", add="text-blue-400")
 
-        # Update content visibility
+        # Update content visibility; live stream is loaded only while its view is shown
         if view_name == VIEW_CONFIGURATION:
             config_container.visible = True
             stream_container.visible = False
+            set_live_stream_viewer(client_id, False)
+            stream_frame.props('src="about:blank"')
         elif view_name == VIEW_LIVE_STREAM:
             config_container.visible = False
             stream_container.visible = True
+            set_live_stream_viewer(client_id, True)
+            stream_frame.props(f'src="{stream_url}"')
 
     async def delete_selected():
         """Delete the selected video clips."""
@@ -154,6 +500,8 @@ def main_page():
         selected_filenames = {r["file_name"] for r in selected}
         for f in selected_filenames:
             clip = clips.get(f.replace(".mp4", ""), {})
+            if "original" in clip:
+                app.state.annotation_cache.remove(clip["original"])
             for v in clip.values():
                 clip_manager.remove_file(v.object_name)
 
@@ -222,14 +570,28 @@ def main_page():
         try:
             filename = selected[0]["file_name"]
             file_stem, file_ext = os.path.splitext(filename)
+            clip_collection = clips.get(file_stem, {})
+            annotation_cache = app.state.annotation_cache
 
             show_hide_ann_controls("annotation-in-progress")
             annotation_label.text = f"Annotating {filename}..."
 
-            nonlocal face_map
-            face_map = await asyncio.to_thread(
-                face_tracker.find_faces_in_clip, filename
+            # reuse cached results if the clip was annotated before with the same models and filters
+            nonlocal face_map, face_map_clip
+            face_map_clip = clip_collection.get("original")
+            cached = (
+                annotation_cache.load(face_map_clip)
+                if face_map_clip is not None and "annotated" in clip_collection
+                else None
             )
+            if cached is not None:
+                face_map = cached
+            else:
+                face_map = await face_tracker.find_faces_in_clip_async(filename)
+                if face_map_clip is not None:
+                    await app.state.async_runner.run(
+                        annotation_cache.save, face_map_clip, face_map
+                    )
 
             annotation_label.text = f"{filename}: {len(face_map)} face(s) detected"
 
@@ -274,7 +636,13 @@ def main_page():
             msg += f"{attr}: {len(face.embeddings)} embeddings\n"
 
         # enroll embeddings
-        face_tracker.enroll(face_map.values())
+        await face_tracker.enroll_async(list(face_map.values()))
+
+        # keep reviewed attributes in cached annotation results
+        if face_map_clip is not None:
+            await app.state.async_runner.run(
+                app.state.annotation_cache.save, face_map_clip, face_map
+            )
 
         ui.notify("Database updated:\n" + msg, multi_line=True)
 
@@ -287,7 +655,7 @@ def main_page():
             else:
                 obj_id = str(uuid.uuid4())
                 known_objects[obj_id] = attr
-                face_tracker.db.add_object(obj_id, attr)
+                await face_tracker.db.add_object(obj_id, attr)
                 ann_grid.options["columnDefs"][1]["cellEditorParams"] = {
                     "values": sorted_known_objects()
                 }
@@ -299,7 +667,8 @@ def main_page():
         """Open the dialog showing the embeddings DB info."""
 
         counts = sorted(
-            face_tracker.db.count_embeddings().values(), key=lambda x: str(x[1])
+            (await face_tracker.db.count_embeddings()).values(),
+            key=lambda x: str(x[1]),
         )
         rows = [
             {
@@ -561,7 +930,7 @@ def main_page():
                         assert context.client.request
                         host = context.client.request.headers.get("host", "localhost")
                         stream_url = f"http://{host.split(':')[0]}:8889/{app.state.config.live_stream_rtsp_url}"
-                        ui.element("iframe").props(f'src="{stream_url}"').classes(
+                        stream_frame = ui.element("iframe").classes(
                             "w-full h-[calc(100vh-12rem)]"
                         )
 
@@ -580,6 +949,12 @@ def stream_page():
     stream_url = (
         f"http://{host.split(':')[0]}:8889/{app.state.config.live_stream_rtsp_url}"
     )
+    # this page is a live stream viewer while it is connected
+    client_id = context.client.id
+    set_live_stream_viewer(client_id, True)
+    context.client.on_connect(lambda: set_live_stream_viewer(client_id, True))
+    context.client.on_disconnect(lambda: set_live_stream_viewer(client_id, False))
+
     ui.label("Live Stream").classes("text-xl font-bold mb-4")
     ui.element("iframe").props(f'src="{stream_url}"').classes(
         "w-[90%] mx-auto h-[calc(90vh)]"
@@ -636,8 +1011,19 @@ async def serve_video(request: Request, filename: str):
 
 
 # Run the NiceGUI application
-# Note: `workers=1` because lancedb is not multi-process-safe
+# Note: `workers=1` because pages, pipelines and viewers live in the memory of this process;
+# to scale out, run several application instances, each with its own configuration file
+# (see `CONFIG_FILE`) defining its own `web_app.port` and video source, and enable `db_service`
+# in all of them so they share one face reID database
+with open(CONFIG_FILE) as f:
+    web_app_settings = (yaml.safe_load(f) or {}).get("web_app", {})
 try:
-    ui.run(title="Face Tracking", workers=1, reload=False, show=False)
+    ui.run(
+        title="Face Tracking",
+        port=web_app_settings.get("port", 8080),
+        workers=1,
+        reload=False,
+        show=False,
+    )
 except KeyboardInterrupt:
     print("Shutting down the application...")
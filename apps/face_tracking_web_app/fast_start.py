@@ -0,0 +1,207 @@
+#
+# fast_start.py: Fast Cold Start of Face Tracking Pipelines
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Implements helpers which shorten the time from process start to the first processed frame:
+# - `ModelSyncCache`: TTL'd on-disk record of cloud zoo syncs of local model copies, so restarted processes
+#   load models from local copies without querying the cloud zoo again until the TTL period expires;
+# - `warm_up()`: loads face detection and face embedding models in parallel and opens the face database
+#   before the video source is opened; the pipeline then starts with already loaded models.
+#
+
+import copy, json, os, tempfile, threading, time
+import concurrent.futures
+from typing import Any, Callable, Dict, List, Optional
+
+import degirum_face
+from degirum_tools import ModelSpec
+
+
+class ModelSyncCache:
+    """
+    TTL'd on-disk record of cloud zoo syncs of local model copies (see `ModelSpec.ensure_local()`).
+    Cache entries older than `ttl_s` are refreshed on the next request.
+
+    Usage:
+        model_sync = ModelSyncCache("temp/model_sync_cache.json", ttl_s=24 * 3600)
+        config = model_sync.localize(config)
+    """
+
+    def __init__(self, cache_file: str, *, ttl_s: float = 24 * 3600):
+        """
+        Constructor.
+
+        Args:
+            cache_file (str): JSON file to keep cached results in; it is created when missing.
+            ttl_s (float): Time to live of cache entries in seconds: period of cloud zoo syncs.
+        """
+        self.cache_file = cache_file
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        try:
+            with open(cache_file) as f:
+                self._entries: Dict[str, dict] = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def local_model_spec(self, spec: ModelSpec) -> ModelSpec:
+        """
+        Get specification of the local copy of the model for local inference (see `ModelSpec.ensure_local()`):
+        the model is downloaded from its cloud zoo when missing and checked for updates once per TTL period,
+        so model loading does not query the cloud zoo every time.
+
+        Args:
+            spec (ModelSpec): Model specification.
+
+        Returns:
+            ModelSpec: Specification of the local model copy; `spec` itself when the model is not inferred
+                locally or already comes from a local zoo.
+        """
+        if (
+            not isinstance(spec, ModelSpec)
+            or spec.inference_host_address != "@local"
+            or os.path.isdir(spec.zoo_url)
+        ):
+            return spec
+
+        # cloud zoo is checked for model updates once per TTL period; in between, only the local copy is checked
+        # (and downloaded again when it was deleted)
+        synced: List[ModelSpec] = []
+
+        def sync() -> str:
+            synced.append(spec.ensure_local(cloud_sync=True))
+            return synced[0].zoo_url
+
+        self._get(f"model:{spec.zoo_url}/{spec.model_name}", sync)
+        return synced[0] if synced else spec.ensure_local(cloud_sync=False)
+
+    def localize(self, config: Any) -> Any:
+        """
+        Replace model specifications of face recognition configuration by specifications
+        of local model copies; see `local_model_spec()`.
+
+        Args:
+            config (FaceRecognizerConfig): Face recognition or face tracking configuration.
+
+        Returns:
+            FaceRecognizerConfig: Shallow copy of the configuration with local model specifications.
+        """
+        ret = copy.copy(config)
+        ret.face_detection_model_spec = self.local_model_spec(
+            config.face_detection_model_spec
+        )
+        ret.face_embedding_model_spec = self.local_model_spec(
+            config.face_embedding_model_spec
+        )
+        return ret
+
+    def _get(self, key: str, compute: Callable[[], Any], refresh: bool = False) -> Any:
+        """
+        Get cached value; compute and save it when missing, expired, or `refresh` is set.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if (
+                not refresh
+                and entry is not None
+                and time.time() - entry["time"] < self.ttl_s
+            ):
+                return entry["value"]
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = {"time": time.time(), "value": value}
+            self._save()
+        return value
+
+    def _save(self):
+        """
+        Save cache entries: write temporary file and rename it, so concurrent readers never see partial file.
+        """
+        cache_dir = os.path.dirname(os.path.abspath(self.cache_file))
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp_path, self.cache_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def warm_up(config: Any, *, preload_db: bool = True) -> Any:
+    """
+    Load models of face recognition configuration in parallel and open its face database,
+    so the pipeline started with the returned configuration does not wait for them.
+    Call it before the video source is opened.
+
+    Args:
+        config (FaceRecognizerConfig): Face recognition or face tracking configuration.
+        preload_db (bool): Whether to open the face database tables as well.
+
+    Returns:
+        FaceRecognizerConfig: Shallow copy of the configuration with warm model specifications:
+            the first `load_model()` call of each of them returns the preloaded model,
+            subsequent calls load new model instances. The original configuration is not modified.
+    """
+
+    def load(spec: Any) -> Any:
+        return spec.load_model(spec.zoo_connect())
+
+    def open_db():
+        db = degirum_face.ReID_DatabasePool.get(
+            config.db_path,
+            config.face_embedding_model_spec.model_name,
+            config.read_consistency_interval,
+        )
+        # opens embeddings and attributes tables
+        db.count_embeddings()
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=3, thread_name_prefix="warm_up"
+    ) as executor:
+        detector = executor.submit(load, config.face_detection_model_spec)
+        embedder = executor.submit(load, config.face_embedding_model_spec)
+        db = executor.submit(open_db) if preload_db and config.db_path else None
+
+        ret = copy.copy(config)
+        ret.face_detection_model_spec = _WarmModelSpec(
+            config.face_detection_model_spec, detector.result()
+        )
+        ret.face_embedding_model_spec = _WarmModelSpec(
+            config.face_embedding_model_spec, embedder.result()
+        )
+        if db is not None:
+            db.result()
+    return ret
+
+
+class _WarmModelSpec:
+    """
+    Model specification wrapper which hands out the preloaded model on the first `load_model()` call.
+    """
+
+    def __init__(self, spec: Any, model: Any):
+        self._spec = spec
+        self._model: Optional[Any] = model
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        return getattr(self._spec, name)
+
+    def zoo_connect(self):
+        # the preloaded model needs no zoo connection
+        return None if self._model is not None else self._spec.zoo_connect()
+
+    def load_model(self, zoo=None):
+        with self._lock:
+            model, self._model = self._model, None
+        if model is not None:
+            return model
+        return self._spec.load_model(zoo)
+
+    def __repr__(self):
+        return f"Warm{self._spec!r}"
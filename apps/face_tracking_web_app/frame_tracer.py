@@ -0,0 +1,512 @@
+#
+# frame_tracer.py: Sampled Per-Frame Pipeline Tracing
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Implements opt-in per-frame tracing of face tracking and face recognition pipelines.
+# One of every N frames is stamped at pipeline stage boundaries, each stage in its own span: frame capture,
+# face detection inference, face tracking, face filtering, face annotation, clip writing (and other result
+# analyzers), face crop, face embedding inference, database search, and live stream rendering and encoding.
+# Pipeline gizmos get spans as well. Traces are exported to a local file in Chrome trace-event JSON format
+# (open it in Perfetto UI or chrome://tracing) or as OpenTelemetry OTLP/JSON spans (one trace per frame).
+#
+# Tracing hooks are installed only when tracing is enabled, so disabled tracing has no overhead.
+#
+
+import copy, json, os, tempfile, threading, time, hashlib
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import degirum_face, degirum_tools
+from degirum_tools.streams import (
+    StreamData,
+    StreamMeta,
+    VideoSourceGizmo,
+    get_timing_info,
+    tag_video,
+)
+from analyzer_factory import add_analyzer_transform
+
+
+class FrameTracer:
+    """
+    Sampled per-frame pipeline tracer.
+
+    Usage:
+        tracer = FrameTracer("trace.json", sample_every=100)
+        face_tracker = degirum_face.FaceTracker(tracer.instrument(config))
+        tracer.instrument_analyzers(face_tracker)
+        sink = SinkGizmo(allow_drop=True)
+        composition, watchdog = face_tracker.start_face_tracking_pipeline(
+            sink=sink, sink_connection_point="detector"
+        )
+        tracer.start()
+        for data in sink():
+            tracer.on_frame(data)
+        ...
+        tracer.stop()
+
+    Live stream spans are recorded by `ViewerAwareStreamerGizmo` created with this tracer.
+
+    With `FaceRecognizer`, create it with instrumented configuration: model and database spans are recorded
+    by tracing hooks; `FaceRecognizer.predict_batch()` results carry no frame metadata, so `on_frame()` is not used.
+    """
+
+    # span names of pipeline stages
+    stage_frame = "frame"
+    stage_capture = "capture"
+    stage_detect = "detect"
+    stage_track = "track"
+    stage_filter = "filter"
+    stage_annotate = "annotate"
+    stage_clip_write = "clip_write"
+    stage_crop = "crop"
+    stage_embed = "embed"
+    stage_db_search = "db_search"
+    stage_stream = "stream"
+
+    formats = ("chrome", "otel")
+
+    # span names of result analyzers by analyzer type; other analyzers are traced under their class names
+    analyzer_stages = (
+        (degirum_tools.ObjectTracker, stage_track),
+        (degirum_face.FaceFilter, stage_filter),
+        (degirum_face.FaceAnnotator, stage_annotate),
+        (degirum_face.FaceEventNotifier, stage_clip_write),
+    )
+
+    def __init__(
+        self,
+        output: str,
+        *,
+        sample_every: int = 100,
+        format: str = "chrome",
+        flush_interval_s: float = 10.0,
+        max_spans: int = 100000,
+        name: str = "0",
+    ):
+        """
+        Constructor.
+
+        Args:
+            output (str): Trace file path; the file is rewritten on each flush.
+            sample_every (int): Trace one of every `sample_every` frames.
+            format (str): Trace file format: "chrome" for Chrome trace-event JSON,
+                or "otel" for OpenTelemetry OTLP/JSON spans.
+            flush_interval_s (float): Trace file update period in seconds (when started with `start()`).
+            max_spans (int): Maximum number of spans to keep; the oldest spans are discarded.
+            name (str): Pipeline name used as trace process name.
+        """
+        if format not in self.formats:
+            raise ValueError(
+                f"Not supported trace format: {format}, must be one of {self.formats}"
+            )
+        if sample_every < 1:
+            raise ValueError("sample_every must be positive")
+
+        self.output = output
+        self.sample_every = sample_every
+        self.format = format
+        self.flush_interval_s = flush_interval_s
+        self.name = name
+
+        # spans: (name, category, frame_id, start_s, end_s)
+        self._spans: Deque[Tuple[str, str, int, float, float]] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        # frame ID of the face crop being processed in current thread
+        self._local = threading.local()
+        self._session = os.urandom(8).hex()  # makes trace IDs unique across runs
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def instrument(self, config: Any, *, db: Optional[Any] = None) -> Any:
+        """
+        Install tracing hooks for the pipeline configuration: face detection and face embedding models
+        are wrapped to measure inference time, and database search is wrapped to measure search time.
+
+        Args:
+            config (FaceRecognizerConfig | FaceTrackerConfig): Pipeline configuration.
+            db (Optional[ReID_Database]): Database searched by the pipelines, e.g. ReID database client;
+                by default the `ReID_DatabasePool` instance of the configured database path.
+
+        Returns:
+            FaceRecognizerConfig | FaceTrackerConfig: Shallow copy of the configuration with instrumented model specs;
+                pass it to `FaceTracker` / `FaceRecognizer` constructor. The original configuration is not modified.
+        """
+        ret = copy.copy(config)
+        ret.face_detection_model_spec = _TracedModelSpec(
+            config.face_detection_model_spec, self, self.stage_detect
+        )
+        ret.face_embedding_model_spec = _TracedModelSpec(
+            config.face_embedding_model_spec, self, self.stage_embed
+        )
+        if db is None and config.db_path:
+            db = degirum_face.ReID_DatabasePool.get(
+                config.db_path,
+                config.face_embedding_model_spec.model_name,
+                config.read_consistency_interval,
+            )
+        if db is not None:
+            self._instrument_database(db)
+        return ret
+
+    def instrument_analyzers(self, face_tracker: degirum_face.FaceTracker):
+        """
+        Install tracing hooks into result analyzers of face tracker pipelines: each analyzer gets its own span
+        (face tracking, filtering, annotation, clip writing, and others). Annotation span covers face labeling;
+        overlay drawing is done on demand by overlay consumers, such as the live stream, and belongs to their spans.
+        Call it before starting any pipeline of the face tracker; analyzers replaced by transforms registered
+        later are not traced (see `add_analyzer_transform()`).
+
+        Args:
+            face_tracker (FaceTracker): Face tracker created with instrumented configuration.
+        """
+        add_analyzer_transform(face_tracker, self._instrument_analyzers)
+
+    def on_frame(self, data: StreamData):
+        """
+        Complete frame trace: add frame span, capture span, and spans of pipeline gizmos.
+        Call it for every pipeline output; non-sampled frames are ignored.
+
+        Args:
+            data (StreamData): Pipeline sink output.
+        """
+        frame_id = self.sampled_frame_id(data.meta)
+        if frame_id is None:
+            return
+
+        now = time.time()
+        timing = get_timing_info(data)
+        video_meta = data.meta.find_last(tag_video)
+        start = video_meta.get(
+            VideoSourceGizmo.key_timestamp, timing[0][1] if timing else now
+        )
+
+        spans = [(self.stage_frame, "frame", frame_id, start, now)]
+        # capture span: from frame capture to the frame leaving video source gizmo
+        if timing:
+            spans.append((self.stage_capture, "stage", frame_id, start, timing[0][1]))
+        # each gizmo span starts when the previous gizmo passes the frame on
+        for (_, t_prev), (gizmo, t) in zip(timing, timing[1:]):
+            spans.append((gizmo, "gizmo", frame_id, t_prev, t))
+        with self._lock:
+            self._spans.extend(spans)
+
+    def sampled_frame_id(self, meta: Any) -> Optional[int]:
+        """
+        Get frame ID if the frame is sampled for tracing.
+
+        Args:
+            meta (StreamMeta): Frame metadata.
+
+        Returns:
+            Optional[int]: Frame ID for sampled frames, None otherwise.
+        """
+        video_meta = meta.find_last(tag_video) if isinstance(meta, StreamMeta) else None
+        if video_meta is None:
+            return None
+        frame_id = video_meta.get(VideoSourceGizmo.key_frame_id)
+        if frame_id is None or frame_id % self.sample_every != 0:
+            return None
+        return frame_id
+
+    def start(self):
+        """
+        Start background thread periodically writing trace file.
+        """
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="FrameTracer-" + self.name, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop background thread and write trace file.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.export()
+
+    def export(self, path: Optional[str] = None):
+        """
+        Write collected spans to the trace file.
+
+        Args:
+            path (Optional[str]): File path; `output` path is used when not specified.
+        """
+        path = path or self.output
+        with self._lock:
+            spans = list(self._spans)
+
+        content = (
+            self._to_chrome(spans) if self.format == "chrome" else self._to_otel(spans)
+        )
+
+        # write to temporary file first, so readers never see partially written trace
+        dirname = os.path.dirname(os.path.abspath(path))
+        os.makedirs(dirname, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(content, f)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def _run(self):
+        """
+        Trace file flushing loop.
+        """
+        while not self._stop_event.wait(self.flush_interval_s):
+            self.export()
+
+    def add_span(
+        self,
+        name: str,
+        frame_id: int,
+        start: float,
+        end: float,
+        category: str = "stage",
+    ):
+        """
+        Add span of a sampled frame.
+
+        Args:
+            name (str): Span name, e.g. one of `stage_*` names.
+            frame_id (int): Frame ID as returned by `sampled_frame_id()`.
+            start (float): Span start time in seconds since the epoch.
+            end (float): Span end time in seconds since the epoch.
+            category (str): Span category.
+        """
+        with self._lock:
+            self._spans.append((name, category, frame_id, start, end))
+
+    def _instrument_analyzers(
+        self, analyzers: list, config: Any, face_map: Any
+    ) -> list:
+        """
+        Wrap `analyze()` method of each analyzer to measure its time for sampled frames.
+        """
+        key_frame_id = degirum_face.FaceDetectorGizmo.key_face_tracking_frame_id
+        for analyzer in analyzers:
+            name = next(
+                (
+                    stage
+                    for analyzer_type, stage in self.analyzer_stages
+                    if isinstance(analyzer, analyzer_type)
+                ),
+                type(analyzer).__name__,
+            )
+
+            def traced_analyze(result, analyze=analyzer.analyze, name=name):
+                frame_id = getattr(result, key_frame_id, None)
+                if frame_id is None or frame_id % self.sample_every != 0:
+                    return analyze(result)
+                t0 = time.time()
+                try:
+                    return analyze(result)
+                finally:
+                    self.add_span(name, frame_id, t0, time.time(), "analyzer")
+
+            analyzer.analyze = traced_analyze
+        return analyzers
+
+    def _instrument_database(self, db: Any):
+        """
+        Wrap database search method to measure its latency for sampled frames.
+        Database instances are shared between pipelines (see `ReID_DatabasePool`), so each instance is wrapped only once.
+        """
+        search = db.get_attributes_by_embedding
+        if getattr(search, "frame_tracer", None) is self:
+            return  # already instrumented
+
+        def traced_search(*args, **kwargs):
+            frame_id = getattr(self._local, "frame_id", None)
+            if frame_id is None:
+                return search(*args, **kwargs)
+            t0 = time.time()
+            try:
+                return search(*args, **kwargs)
+            finally:
+                self.add_span(self.stage_db_search, frame_id, t0, time.time())
+
+        traced_search.frame_tracer = self  # type: ignore[attr-defined]
+        db.get_attributes_by_embedding = traced_search
+
+    def _to_chrome(self, spans: list) -> dict:
+        """
+        Convert spans to Chrome trace-event format: one trace process per pipeline, one thread per span name.
+        """
+        pid = self.name
+        tids: Dict[str, int] = {}
+        events: list = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "args": {"name": f"pipeline {pid}"},
+            }
+        ]
+        for name, category, frame_id, start, end in spans:
+            tid = tids.get(name)
+            if tid is None:
+                tid = tids[name] = len(tids)
+                events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": pid,
+                        "tid": tid,
+                        "args": {"name": name},
+                    }
+                )
+            events.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": start * 1e6,
+                    "dur": max(end - start, 0.0) * 1e6,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"frame_id": frame_id},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def _to_otel(self, spans: list) -> dict:
+        """
+        Convert spans to OpenTelemetry OTLP/JSON format: one trace per frame, frame span is the root span.
+        """
+
+        def make_id(*parts, size: int) -> str:
+            key = "|".join(str(p) for p in (self._session, self.name) + parts)
+            return hashlib.sha1(key.encode()).hexdigest()[: size * 2]
+
+        otel_spans = []
+        for i, (name, category, frame_id, start, end) in enumerate(spans):
+            root_id = make_id(frame_id, self.stage_frame, size=8)
+            is_root = name == self.stage_frame
+            otel_spans.append(
+                {
+                    "traceId": make_id(frame_id, size=16),
+                    "spanId": (
+                        root_id if is_root else make_id(frame_id, name, i, size=8)
+                    ),
+                    "parentSpanId": "" if is_root else root_id,
+                    "name": name,
+                    "kind": 1,  # SPAN_KIND_INTERNAL
+                    "startTimeUnixNano": str(int(start * 1e9)),
+                    "endTimeUnixNano": str(int(end * 1e9)),
+                    "attributes": [
+                        {"key": "frame_id", "value": {"intValue": str(frame_id)}},
+                        {"key": "category", "value": {"stringValue": category}},
+                        {"key": "pipeline", "value": {"stringValue": self.name}},
+                    ],
+                }
+            )
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": "face_tracking"},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": "frame_tracer"}, "spans": otel_spans}
+                    ],
+                }
+            ]
+        }
+
+
+class _TracedModelSpec:
+    """
+    Model specification wrapper which loads models with tracing hooks.
+    """
+
+    def __init__(self, spec: Any, tracer: FrameTracer, stage: str):
+        self._spec = spec
+        self._tracer = tracer
+        self._stage = stage
+
+    def __getattr__(self, name: str):
+        return getattr(self._spec, name)
+
+    def load_model(self, zoo=None):
+        return _TracedModel(self._spec.load_model(zoo), self._tracer, self._stage)
+
+    def __repr__(self):
+        return f"Traced{self._spec!r}"
+
+
+class _TracedModel:
+    """
+    Model wrapper which measures inference time of sampled frames.
+    Inference time of a frame is the time from taking the frame from the input iterator to getting its result,
+    so for pipelined models it includes time spent in model queues.
+    """
+
+    def __init__(self, model: Any, tracer: FrameTracer, stage: str):
+        object.__setattr__(self, "_model", model)
+        object.__setattr__(self, "_tracer", tracer)
+        object.__setattr__(self, "_stage", stage)
+
+    def __getattr__(self, name: str):
+        return getattr(self._model, name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._model, name, value)
+
+    def predict_batch(self, data):
+        tracer = self._tracer
+        is_embedder = self._stage == FrameTracer.stage_embed
+        # frame meta ID -> (frame ID, input time)
+        pending: Dict[int, Tuple[int, float]] = {}
+
+        def source():
+            for item in data:
+                if isinstance(item, tuple):
+                    frame_id = tracer.sampled_frame_id(item[1])
+                    if frame_id is not None:
+                        t = time.time()
+                        pending[id(item[1])] = (frame_id, t)
+                        if is_embedder:
+                            # crop span: from face detector gizmo output to face crop being ready
+                            timing = get_timing_info(StreamData(None, item[1]))
+                            if timing:
+                                tracer.add_span(
+                                    FrameTracer.stage_crop, frame_id, timing[-1][1], t
+                                )
+                yield item
+
+        for result in self._model.predict_batch(source()):
+            entry = (
+                pending.pop(id(result.info), None)
+                if pending and result is not None
+                else None
+            )
+            if entry is None:
+                yield result
+                continue
+
+            frame_id, t_in = entry
+            tracer.add_span(self._stage, frame_id, t_in, time.time())
+            if is_embedder:
+                # database search for this crop follows in the consumer of this result
+                tracer._local.frame_id = frame_id
+                try:
+                    yield result
+                finally:
+                    tracer._local.frame_id = None
+            else:
+                yield result
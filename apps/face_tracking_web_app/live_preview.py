@@ -0,0 +1,385 @@
+#
+# live_preview.py: Viewer-Aware Live Stream Preview
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Implements on-demand live stream encoding for the face tracking web application.
+# Frames are annotated and encoded only while somebody watches the live stream: without viewers
+# the streamer gizmo just consumes frames, and the ffmpeg encoder is stopped after a grace period.
+# The streamer is a side branch of face detector output which drops frames instead of slowing down the pipeline.
+# While streaming, the preview is rendered at reduced resolution and frame rate to save CPU for detection.
+# Viewers are web pages showing the live stream and, optionally, media server readers reported by
+# media server hooks.
+#
+
+import copy, queue, threading, time
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+import cv2
+import numpy as np
+import degirum_face
+from degirum_tools import VideoStreamer
+from degirum_tools.streams import (
+    Composition,
+    Gizmo,
+    Stream,
+    StreamData,
+    VideoSourceGizmo,
+    VideoStreamerGizmo,
+    tag_inference,
+    tag_video,
+)
+
+
+class ViewerTracker:
+    """
+    Thread-safe registry of live stream viewers.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+        self._viewers: Set[str] = set()
+        # viewer ID -> expiration time of temporary registrations
+        self._expiration: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._last_viewer_time = 0.0  # time when the last viewer left
+
+    def add(self, viewer_id: str, *, timeout_s: Optional[float] = None):
+        """
+        Register viewer.
+
+        Args:
+            viewer_id (str): Unique viewer ID, e.g. web client ID.
+            timeout_s (Optional[float]): When specified, the viewer is removed automatically after that time
+                unless it is added again.
+        """
+        with self._lock:
+            self._viewers.add(viewer_id)
+            if timeout_s is not None:
+                self._expiration[viewer_id] = time.monotonic() + timeout_s
+            else:
+                self._expiration.pop(viewer_id, None)
+
+    def remove(self, viewer_id: str):
+        """
+        Unregister viewer; unknown viewer IDs are ignored.
+
+        Args:
+            viewer_id (str): Viewer ID passed to `add()`.
+        """
+        with self._lock:
+            self._remove(viewer_id)
+
+    @property
+    def count(self) -> int:
+        """
+        Number of viewers.
+        """
+        if self._expiration:
+            with self._lock:
+                now = time.monotonic()
+                for viewer_id, expiration in list(self._expiration.items()):
+                    if expiration <= now:
+                        self._remove(viewer_id)
+        return len(self._viewers)
+
+    def idle_time_s(self) -> float:
+        """
+        Get time since the last viewer left.
+
+        Returns:
+            float: Time in seconds; zero when there are viewers.
+        """
+        if self.count:
+            return 0.0
+        with self._lock:
+            return time.monotonic() - self._last_viewer_time
+
+    def _remove(self, viewer_id: str):
+        """
+        Unregister viewer (must be called under lock).
+        """
+        self._expiration.pop(viewer_id, None)
+        if viewer_id in self._viewers:
+            self._viewers.discard(viewer_id)
+            if not self._viewers:
+                self._last_viewer_time = time.monotonic()
+
+
+def media_server_config(stream_name: str, viewers_url: str) -> dict:
+    """
+    Make MediaMTX configuration which reports readers of the live stream to the application,
+    so viewers watching the stream directly on the media server are counted as well.
+    Each reader is registered when it starts reading and unregistered when it stops; a reader which comes
+    while the stream is not encoded triggers the on-demand hook, which registers a temporary viewer
+    to start the encoder.
+
+    Args:
+        stream_name (str): Live stream path name on the media server.
+        viewers_url (str): URL of the application viewer registration endpoint; readers are registered
+            by POST and unregistered by DELETE requests to `<viewers_url>/<reader ID>`.
+
+    Returns:
+        dict: MediaMTX configuration.
+    """
+    reader_url = f"{viewers_url}/media_$MTX_READER_ID"
+    return {
+        "paths": {
+            stream_name: {
+                "runOnDemand": f"curl -sf -X POST {viewers_url}/media_demand",
+                "runOnDemandStartTimeout": "15s",
+                "runOnRead": f"curl -sf -X POST {reader_url}",
+                "runOnUnread": f"curl -sf -X DELETE {reader_url}",
+            }
+        }
+    }
+
+
+class ViewerAwareStreamerGizmo(VideoStreamerGizmo):
+    """
+    Video streaming gizmo which renders and encodes frames only while the stream has viewers.
+    The ffmpeg encoder is started when the first viewer comes and stopped when there are no viewers
+    for `idle_timeout_s` seconds. Streamed frames are downscaled and decimated to preview size and rate.
+    """
+
+    def __init__(
+        self,
+        stream_url: str,
+        *,
+        viewers: ViewerTracker,
+        width: int = 0,
+        fps: float = 0,
+        idle_timeout_s: float = 5.0,
+        tracer: Optional[Any] = None,
+        **kwargs,
+    ):
+        """
+        Constructor.
+
+        Args:
+            stream_url (str): RTMP/RTSP URL to stream to.
+            viewers (ViewerTracker): Viewer registry.
+            width (int): Preview width in pixels; height is scaled proportionally. 0 to keep source resolution.
+            fps (float): Preview frame rate; 0 to keep source frame rate.
+            idle_timeout_s (float): Time in seconds without viewers after which the encoder is stopped.
+            tracer (Optional[FrameTracer]): Frame tracer; when provided, rendering and encoding of sampled frames
+                is recorded as stream spans.
+            **kwargs: Other `VideoStreamerGizmo` constructor arguments.
+        """
+        super().__init__(stream_url, **kwargs)
+        self._viewers = viewers
+        self._tracer = tracer
+        self._width = width
+        self._preview_fps = fps
+        self._idle_timeout_s = idle_timeout_s
+        self._pix_fmt = "bgr24"
+
+    def run(self):
+        """Run the video streaming loop."""
+
+        input_q = self.get_input(0)
+        streamer: Optional[VideoStreamer] = None
+        # last streamed image, repeated when the source is starving
+        last_img: Optional[np.ndarray] = None
+        fps = 0.0
+        next_frame_due_s = 0.0
+
+        try:
+            while not self._abort:
+                streaming = streamer is not None or self._viewers.count > 0
+                try:
+                    data = input_q.get(timeout=0.5 / fps if streaming and fps else 0.5)
+                except queue.Empty:
+                    data = None
+                if data == Stream._poison:
+                    break
+                if data is not None:
+                    self.send_result(data)
+                    if not fps:
+                        fps = self._stream_fps(data)
+
+                if self._viewers.count == 0:
+                    if (
+                        streamer is not None
+                        and self._viewers.idle_time_s() >= self._idle_timeout_s
+                    ):
+                        streamer.stop()
+                        streamer, last_img = None, None
+                    if streamer is None:
+                        continue  # nobody watches: skip rendering and encoding
+
+                now_s = time.monotonic()
+                if not fps or now_s < next_frame_due_s:
+                    continue  # frame decimation to preview frame rate
+                t_render = time.time()
+                if data is not None:
+                    last_img = self._render(data)
+                if last_img is None:
+                    continue
+
+                if streamer is None:
+                    h, w = last_img.shape[:2]
+                    streamer = VideoStreamer(
+                        self._stream_url,
+                        w,
+                        h,
+                        fps=fps,
+                        pix_fmt=self._pix_fmt,
+                        vcodec=self._vcodec,
+                    )
+                streamer.write(last_img)
+                if self._tracer is not None and data is not None:
+                    frame_id = self._tracer.sampled_frame_id(data.meta)
+                    if frame_id is not None:
+                        self._tracer.add_span(
+                            self._tracer.stage_stream, frame_id, t_render, time.time()
+                        )
+                # if we are badly behind, resync to current time instead of catching up
+                next_frame_due_s = max(next_frame_due_s + 1.0 / fps, now_s)
+        finally:
+            if streamer is not None:
+                streamer.stop()
+
+    def _stream_fps(self, data: StreamData) -> float:
+        """
+        Get preview frame rate: configured rate limited by source frame rate.
+        """
+        fps = self._fps
+        if fps <= 0:
+            video_meta = data.meta.find_last(tag_video)
+            fps = video_meta.get(VideoSourceGizmo.key_fps, 0) if video_meta else 0
+            if fps <= 0:
+                fps = 30.0
+        return min(fps, self._preview_fps) if self._preview_fps > 0 else fps
+
+    def _render(self, data: StreamData) -> np.ndarray:
+        """
+        Render preview image: AI overlay (when enabled) downscaled to preview width.
+        """
+        img = data.data
+        if self._show_ai_overlay:
+            inference_meta = data.meta.find_last(tag_inference)
+            if inference_meta:
+                img = inference_meta.image_overlay
+        # PIL images are RGB, OpenCV images are BGR
+        self._pix_fmt = "bgr24" if isinstance(img, np.ndarray) else "rgb24"
+        img = np.asarray(img)
+        h, w = img.shape[:2]
+        if 0 < self._width < w:
+            # even frame dimensions are required by yuv420p encoding
+            new_w = self._width // 2 * 2
+            new_h = max(round(h * new_w / w / 2) * 2, 2)
+            img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
+        return img
+
+
+class _StreamerConnector(Gizmo):
+    """
+    Placeholder passed to `FaceTracker.start_face_tracking_pipeline()` as the pipeline sink.
+    When the library connects it to the sink connection point, it connects the caller's sink there instead,
+    and connects the streamer to face detector output, the same way the library connects its own streamer.
+    The placeholder itself stays out of the pipeline.
+    """
+
+    def __init__(self, streamer: Gizmo, sink: Optional[Gizmo]):
+        """
+        Constructor.
+
+        Args:
+            streamer (Gizmo): Streamer gizmo to attach to face detector output.
+            sink (Optional[Gizmo]): Caller's sink gizmo to attach to the sink connection point.
+        """
+        super().__init__([])
+        self._streamer = streamer
+        self._sink = sink
+
+    def connect_to(self, other_gizmo, inp=0) -> Gizmo:
+        if self._sink is not None:
+            self._sink.connect_to(other_gizmo)
+        detector = next(
+            g
+            for g in other_gizmo.get_connected()
+            if isinstance(g, degirum_face.FaceDetectorGizmo)
+        )
+        self._streamer.connect_to(detector)
+        return self
+
+    def run(self):
+        pass
+
+
+class ViewerAwareFaceTracker(degirum_face.FaceTracker):
+    """
+    `FaceTracker` whose "WEB" live stream is rendered and encoded only while it has viewers.
+    The streamer gizmo of the library is disabled; instead, `ViewerAwareStreamerGizmo` is attached
+    to face detector output as a side branch which drops frames when it falls behind.
+    """
+
+    def __init__(
+        self,
+        config: degirum_face.FaceTrackerConfig,
+        viewers: ViewerTracker,
+        *,
+        width: int = 0,
+        fps: float = 0,
+        idle_timeout_s: float = 5.0,
+        tracer: Optional[Any] = None,
+    ):
+        """
+        Constructor.
+
+        Args:
+            config (FaceTrackerConfig): Face tracking configuration.
+            viewers (ViewerTracker): Viewer registry of the live stream.
+            width (int): Preview width in pixels; 0 to keep source resolution.
+            fps (float): Preview frame rate; 0 to keep source frame rate.
+            idle_timeout_s (float): Time in seconds without viewers after which the encoder is stopped.
+            tracer (Optional[FrameTracer]): Frame tracer recording live stream spans.
+        """
+        self._web_stream = config.live_stream_mode == "WEB"
+        if self._web_stream:
+            config = copy.copy(config)
+            config.live_stream_mode = "NONE"
+        super().__init__(config)
+        self.viewers = viewers
+        self._width = width
+        self._fps = fps
+        self._idle_timeout_s = idle_timeout_s
+        self._tracer = tracer
+
+    def start_face_tracking_pipeline(
+        self,
+        *,
+        frame_iterator: Optional[Iterable] = None,
+        sink: Optional[Gizmo] = None,
+        sink_connection_point: str = "detector",
+    ) -> Tuple[Composition, Any]:
+        """
+        Run the face tracking pipeline with viewer-aware live stream;
+        see `FaceTracker.start_face_tracking_pipeline()`.
+        """
+        if not self._web_stream:
+            return super().start_face_tracking_pipeline(
+                frame_iterator=frame_iterator,
+                sink=sink,
+                sink_connection_point=sink_connection_point,
+            )
+
+        streamer = ViewerAwareStreamerGizmo(
+            f"rtsp://localhost:8554/{self.config.live_stream_rtsp_url}",
+            viewers=self.viewers,
+            show_ai_overlay=True,
+            width=self._width,
+            fps=self._fps,
+            idle_timeout_s=self._idle_timeout_s,
+            tracer=self._tracer,
+            allow_drop=True,
+        )
+        return super().start_face_tracking_pipeline(
+            frame_iterator=frame_iterator,
+            sink=_StreamerConnector(streamer, sink),  # type: ignore[arg-type]
+            sink_connection_point=sink_connection_point,
+        )
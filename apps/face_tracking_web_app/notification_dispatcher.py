@@ -0,0 +1,215 @@
+#
+# notification_dispatcher.py: Non-blocking Notification Dispatcher
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Implements asyncio-based notification dispatcher for the face tracking web application.
+# Notifications received by the webhook endpoint are put into a bounded queue and delivered
+# by a background task, so the webhook returns immediately regardless of how many clients are connected.
+# Notifications arriving within the coalescing window are combined into one message,
+# and delivery rate is limited by a token bucket.
+# Each message is delivered to every destination (e.g. connected web client) by its own task: the number
+# of concurrent deliveries per destination is limited, so one slow destination never delays the others.
+#
+
+import asyncio, time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Set, Tuple
+
+
+class NotificationDispatcher:
+    """
+    Asynchronous notification dispatcher with bounded queue, coalescing, rate limiting,
+    and per-destination concurrency limits.
+    """
+
+    def __init__(
+        self,
+        deliver: Callable[[Any, str], Awaitable[None]],
+        destinations: Callable[[], Iterable[Hashable]],
+        *,
+        queue_size: int = 100,
+        coalesce_window_s: float = 2.0,
+        rate_limit_per_s: float = 0.5,
+        rate_limit_burst: int = 3,
+        max_concurrency_per_destination: int = 1,
+        delivery_timeout_s: float = 10.0,
+    ):
+        """
+        Constructor.
+
+        Args:
+            deliver (Callable[[Any, str], Awaitable[None]]): Coroutine function to deliver the message
+                to one destination; called as `deliver(destination, message)`.
+            destinations (Callable[[], Iterable[Hashable]]): Function returning current destinations of messages.
+            queue_size (int): Maximum number of pending notifications; the oldest ones are dropped on overflow.
+            coalesce_window_s (float): Notifications received within this time window are combined into one message.
+            rate_limit_per_s (float): Token bucket refill rate: maximum sustained number of delivered messages per second.
+            rate_limit_burst (int): Token bucket capacity: maximum number of messages delivered in a burst.
+            max_concurrency_per_destination (int): Maximum number of deliveries in progress per destination;
+                messages for a destination which has that many deliveries in progress are skipped.
+            delivery_timeout_s (float): Delivery to one destination taking longer than that is cancelled
+                and counted as failed; 0 to disable the timeout.
+        """
+        self._deliver = deliver
+        self._destinations = destinations
+        self._max_concurrency_per_destination = max(1, max_concurrency_per_destination)
+        self._delivery_timeout_s = delivery_timeout_s
+        self._in_flight: Dict[Hashable, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._coalesce_window_s = coalesce_window_s
+        self._rate_limit_per_s = rate_limit_per_s
+        self._rate_limit_burst = rate_limit_burst
+        self._tokens = float(rate_limit_burst)
+        self._last_refill = time.monotonic()
+
+        # statistics
+        self._received = 0
+        self._dropped = 0
+        self._messages = 0
+        self._delivered = 0
+        self._coalesced = 0
+        self._failed = 0
+        self._skipped = 0
+        self._latency_last_s = 0.0
+        self._latency_max_s = 0.0
+        self._latency_sum_s = 0.0
+
+    def submit(self, message: str):
+        """
+        Submit the message for delivery. Never blocks: when the queue is full, the oldest message is dropped.
+        Must be called from the event loop thread.
+
+        Args:
+            message (str): The notification message.
+        """
+        self._received += 1
+        item = (time.monotonic(), message)
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                break
+            except asyncio.QueueFull:
+                self._queue.get_nowait()
+                self._dropped += 1
+
+    async def run(self):
+        """
+        Dispatcher loop: run it as a background task.
+        """
+        while True:
+            batch = [await self._queue.get()]
+
+            # collect notifications arriving within the coalescing window
+            deadline = time.monotonic() + self._coalesce_window_s
+            while (timeout := deadline - time.monotonic()) > 0:
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # wait for rate limiter token; notifications arriving meanwhile join the batch
+            await self._acquire_token()
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            message = self._combine(batch)
+            self._messages += 1
+            self._coalesced += len(batch) - 1
+            for destination in self._destinations():
+                if (
+                    self._in_flight.get(destination, 0)
+                    >= self._max_concurrency_per_destination
+                ):
+                    # destination is still busy with previous messages
+                    self._skipped += 1
+                    continue
+                self._in_flight[destination] = self._in_flight.get(destination, 0) + 1
+                task = asyncio.create_task(
+                    self._deliver_to(destination, message, batch[0][0])
+                )
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _deliver_to(self, destination: Hashable, message: str, t0: float):
+        """
+        Deliver the message to one destination and update statistics.
+
+        Args:
+            destination (Hashable): Message destination.
+            message (str): Combined message.
+            t0 (float): Time when the first notification of the message was received.
+        """
+        try:
+            delivery = self._deliver(destination, message)
+            if self._delivery_timeout_s > 0:
+                await asyncio.wait_for(delivery, self._delivery_timeout_s)
+            else:
+                await delivery
+            self._delivered += 1
+        except Exception:
+            self._failed += 1
+        finally:
+            self._in_flight[destination] -= 1
+            if not self._in_flight[destination]:
+                del self._in_flight[destination]
+
+        latency = time.monotonic() - t0
+        self._latency_last_s = latency
+        self._latency_max_s = max(self._latency_max_s, latency)
+        self._latency_sum_s += latency
+
+    def get_stats(self) -> dict:
+        """
+        Get dispatcher statistics.
+
+        Returns:
+            dict: received/dropped/coalesced notification counts, number of combined messages,
+                delivered/failed/skipped per-destination delivery counts, current queue depth,
+                number of deliveries in progress, and delivery latency in seconds (last, average, and maximum).
+        """
+        sent = self._delivered + self._failed
+        return {
+            "received": self._received,
+            "dropped": self._dropped,
+            "coalesced": self._coalesced,
+            "messages": self._messages,
+            "delivered": self._delivered,
+            "failed": self._failed,
+            "skipped": self._skipped,
+            "queue_depth": self._queue.qsize(),
+            "in_flight": sum(self._in_flight.values()),
+            "latency_last_s": round(self._latency_last_s, 3),
+            "latency_avg_s": round(self._latency_sum_s / sent, 3) if sent else 0.0,
+            "latency_max_s": round(self._latency_max_s, 3),
+        }
+
+    async def _acquire_token(self):
+        """
+        Wait until token bucket has a token and take it.
+        """
+        if self._rate_limit_per_s <= 0:
+            return  # rate limiting is disabled
+
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                float(self._rate_limit_burst),
+                self._tokens + (now - self._last_refill) * self._rate_limit_per_s,
+            )
+            self._last_refill = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self._tokens) / self._rate_limit_per_s)
+
+    @staticmethod
+    def _combine(batch: List[Tuple[float, str]]) -> str:
+        """
+        Combine batch of notifications into one message, removing duplicates.
+        """
+        messages = list(dict.fromkeys(message for _, message in batch))
+        if len(batch) == 1:
+            return messages[0]
+        return f"{len(batch)} notifications:\n" + "\n".join(messages)
@@ -0,0 +1,406 @@
+#
+# pipeline_metrics.py: Face Tracking Pipeline Performance Metrics
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Implements performance instrumentation of face tracking pipelines for the face tracking web application.
+# Collects per-gizmo queue depths, input drops, result counts and stage latencies, faces per frame,
+# embeddings rate, database search latency, and track match cache hits and misses. Metrics are available as Python dictionary snapshot
+# and in Prometheus text exposition format.
+#
+
+import threading, time, bisect
+from typing import Any, Dict, List, Optional, Tuple
+
+from degirum_tools.streams import (
+    Composition,
+    SinkGizmo,
+    Watchdog,
+    get_timing_info,
+    tag_inference,
+)
+
+
+class Histogram:
+    """
+    Thread-safe cumulative histogram with fixed buckets (Prometheus-style).
+    """
+
+    latency_buckets = (
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+    )
+    count_buckets = (0, 1, 2, 3, 5, 8, 13, 21)
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        """
+        Constructor.
+
+        Args:
+            buckets (Tuple[float, ...]): Sorted bucket upper bounds; +Inf bucket is added implicitly.
+        """
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """
+        Add observation to the histogram.
+        """
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict:
+        """
+        Get histogram state.
+
+        Returns:
+            dict: "buckets": list of (upper bound, cumulative count) pairs including +Inf bucket,
+                "sum": sum of observations, "count": number of observations.
+        """
+        with self._lock:
+            cumulative, buckets = 0, []
+            for bound, cnt in zip(self.buckets + (float("inf"),), self._counts):
+                cumulative += cnt
+                buckets.append((bound, cumulative))
+            return {"buckets": buckets, "sum": self._sum, "count": cumulative}
+
+
+class PipelineMetrics:
+    """
+    Performance metrics collector for face tracking pipeline.
+
+    Usage:
+        sink = SinkGizmo(allow_drop=True)
+        composition, watchdog = face_tracker.start_face_tracking_pipeline(
+            sink=sink, sink_connection_point="detector"
+        )
+        metrics = PipelineMetrics(composition, watchdog, sink, db=face_tracker.db)
+        metrics.start()
+        ...
+        print(metrics.snapshot())
+
+    Attach the sink to face detector output: with `allow_drop=True` it is a side branch which drops frames
+    instead of blocking face detector, and no extra gizmos are added to the pipeline. Stage latencies are
+    collected from timing metadata of frames reaching the sink; face recognizer gizmo, which outputs one result
+    per face crop, is measured by its result count, queue depths and input drops.
+    """
+
+    # name of the gizmo which computes one embedding per result
+    embedder_gizmo = "FaceRecognizerGizmo"
+
+    def __init__(
+        self,
+        composition: Composition,
+        watchdog: Watchdog,
+        sink: SinkGizmo,
+        *,
+        db: Optional[Any] = None,
+        tracer: Optional[Any] = None,
+        match_cache: Optional[Any] = None,
+        name: str = "0",
+    ):
+        """
+        Constructor.
+
+        Args:
+            composition (Composition): Pipeline composition as returned by `FaceTracker.start_face_tracking_pipeline()`.
+            watchdog (Watchdog): Pipeline watchdog as returned by `FaceTracker.start_face_tracking_pipeline()`.
+            sink (SinkGizmo): Sink gizmo connected to the pipeline; metrics collector consumes all its results,
+                so create it with `allow_drop=True` to not slow down the pipeline.
+            db (Optional[ReID_Database]): Database used by the pipeline; when provided, its search latency is measured.
+            tracer (Optional[FrameTracer]): Frame tracer of the pipeline; when provided, all results are passed to it.
+            match_cache (Optional[TrackMatchCache]): Track match cache of the pipeline; when provided,
+                its hit and miss counters are reported.
+            name (str): Pipeline name used as a metric label.
+        """
+        self.name = name
+        self._composition = composition
+        self._watchdog = watchdog
+        self._sink = sink
+        self._tracer = tracer
+        self._match_cache = match_cache
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self._frames = 0
+        self._faces_per_frame = Histogram(Histogram.count_buckets)
+        self._stage_latency: Dict[str, Histogram] = {}
+        self.db_search_latency = instrument_database(db) if db is not None else None
+        self._last_rate_check: Tuple[float, int] = (time.time(), 0)
+        self._embeddings_per_second = 0.0
+
+    def start(self):
+        """
+        Start background thread consuming sink results.
+        """
+        self._thread = threading.Thread(
+            target=self._run, name="PipelineMetrics-" + self.name, daemon=True
+        )
+        self._thread.start()
+
+    def snapshot(self) -> dict:
+        """
+        Get current values of all metrics.
+
+        Returns:
+            dict: Dictionary of metric values.
+        """
+        running, fps = self._watchdog.check()
+        gizmos = {}
+        for entry in self._composition.get_current_queue_sizes():
+            for gizmo, (result_cnt, *queue_sizes) in entry.items():
+                gizmos[gizmo] = {
+                    "results": result_cnt,
+                    "queue_depths": queue_sizes,
+                    "dropped": 0,
+                }
+        for entry in self._composition.get_bottlenecks():
+            for gizmo, dropped in entry.items():
+                if gizmo in gizmos:
+                    gizmos[gizmo]["dropped"] = dropped
+
+        # embeddings rate since previous snapshot
+        embeddings = gizmos.get(self.embedder_gizmo, {}).get("results", 0)
+        now = time.time()
+        with self._lock:
+            prev_time, prev_embeddings = self._last_rate_check
+            if now > prev_time and embeddings >= prev_embeddings:
+                self._embeddings_per_second = (embeddings - prev_embeddings) / (
+                    now - prev_time
+                )
+            self._last_rate_check = (now, embeddings)
+            stage_latency = {k: v.snapshot() for k, v in self._stage_latency.items()}
+
+            return {
+                "running": running,
+                "fps": fps,
+                "frames": self._frames,
+                "embeddings": embeddings,
+                "embeddings_per_second": self._embeddings_per_second,
+                "faces_per_frame": self._faces_per_frame.snapshot(),
+                "stage_latency_s": stage_latency,
+                "db_search_latency_s": (
+                    self.db_search_latency.snapshot()
+                    if self.db_search_latency is not None
+                    else None
+                ),
+                "match_cache": (
+                    {
+                        "hits": self._match_cache.hits,
+                        "misses": self._match_cache.misses,
+                    }
+                    if self._match_cache is not None
+                    else None
+                ),
+                "gizmos": gizmos,
+            }
+
+    def _run(self):
+        """
+        Sink consuming loop: collect per-frame metrics.
+        """
+        for data in self._sink():
+            if self._tracer is not None:
+                self._tracer.on_frame(data)
+
+            result = data.meta.find_last(tag_inference)
+            if result is not None:
+                self._faces_per_frame.observe(len(result.results))
+
+            # stage latency is the time between consecutive gizmo timestamps
+            timing = get_timing_info(data)
+            with self._lock:
+                self._frames += 1
+                for (_, t_prev), (gizmo, t) in zip(timing, timing[1:]):
+                    hist = self._stage_latency.get(gizmo)
+                    if hist is None:
+                        hist = self._stage_latency[gizmo] = Histogram(
+                            Histogram.latency_buckets
+                        )
+                    hist.observe(t - t_prev)
+
+
+def instrument_database(db: Any) -> Histogram:
+    """
+    Wrap database search method to measure its latency.
+    Database instances are shared between pipelines (see `ReID_DatabasePool`), so each instance is wrapped only once.
+
+    Args:
+        db (ReID_Database): Database to instrument.
+
+    Returns:
+        Histogram: Search latency histogram of this database.
+    """
+    search = db.get_attributes_by_embedding
+    hist = getattr(search, "latency_histogram", None)
+    if hist is not None:
+        return hist  # already instrumented
+
+    hist = Histogram(Histogram.latency_buckets)
+
+    def timed_search(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return search(*args, **kwargs)
+        finally:
+            hist.observe(time.perf_counter() - t0)
+
+    timed_search.latency_histogram = hist  # type: ignore[attr-defined]
+    db.get_attributes_by_embedding = timed_search
+    return hist
+
+
+def render_prometheus(
+    metrics: List[PipelineMetrics],
+    extra: Optional[Dict[str, Tuple[str, float]]] = None,
+) -> str:
+    """
+    Render metrics in Prometheus text exposition format.
+
+    Args:
+        metrics (List[PipelineMetrics]): Metrics collectors of all pipelines.
+        extra (Optional[Dict[str, Tuple[str, float]]]): Additional metrics to include: metric name
+            to metric type ("gauge" or "counter") and value.
+
+    Returns:
+        str: Metrics text.
+    """
+
+    lines: List[str] = []
+
+    def header(name: str, kind: str, help: str):
+        lines.append(f"# HELP face_tracking_{name} {help}")
+        lines.append(f"# TYPE face_tracking_{name} {kind}")
+
+    def labels(**kwargs) -> str:
+        return "{" + ",".join(f'{k}="{v}"' for k, v in kwargs.items()) + "}"
+
+    def histogram(name: str, hist: dict, **kwargs):
+        for bound, cnt in hist["buckets"]:
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(f"face_tracking_{name}_bucket{labels(**kwargs, le=le)} {cnt}")
+        lines.append(f"face_tracking_{name}_sum{labels(**kwargs)} {hist['sum']:.6f}")
+        lines.append(f"face_tracking_{name}_count{labels(**kwargs)} {hist['count']}")
+
+    snapshots = [(m.name, m.snapshot()) for m in metrics]
+
+    header("running", "gauge", "Pipeline is running (1) or stalled (0).")
+    for p, s in snapshots:
+        lines.append(f"face_tracking_running{labels(pipeline=p)} {int(s['running'])}")
+
+    header("fps", "gauge", "Pipeline frame rate as measured by the watchdog.")
+    for p, s in snapshots:
+        lines.append(f"face_tracking_fps{labels(pipeline=p)} {s['fps']:.3f}")
+
+    header("frames_total", "counter", "Number of frames processed by the pipeline.")
+    for p, s in snapshots:
+        lines.append(f"face_tracking_frames_total{labels(pipeline=p)} {s['frames']}")
+
+    header("embeddings_total", "counter", "Number of face embeddings computed.")
+    for p, s in snapshots:
+        lines.append(
+            f"face_tracking_embeddings_total{labels(pipeline=p)} {s['embeddings']}"
+        )
+
+    header(
+        "embeddings_per_second", "gauge", "Face embeddings rate since previous scrape."
+    )
+    for p, s in snapshots:
+        lines.append(
+            f"face_tracking_embeddings_per_second{labels(pipeline=p)} {s['embeddings_per_second']:.3f}"
+        )
+
+    header("gizmo_results_total", "counter", "Number of results produced by the gizmo.")
+    for p, s in snapshots:
+        for g, v in s["gizmos"].items():
+            lines.append(
+                f"face_tracking_gizmo_results_total{labels(pipeline=p, gizmo=g)} {v['results']}"
+            )
+
+    header("gizmo_queue_depth", "gauge", "Current depth of the gizmo input queue.")
+    for p, s in snapshots:
+        for g, v in s["gizmos"].items():
+            for i, depth in enumerate(v["queue_depths"]):
+                lines.append(
+                    f"face_tracking_gizmo_queue_depth{labels(pipeline=p, gizmo=g, input=i)} {depth}"
+                )
+
+    header(
+        "gizmo_dropped_total",
+        "counter",
+        "Number of frames dropped on gizmo input overflow.",
+    )
+    for p, s in snapshots:
+        for g, v in s["gizmos"].items():
+            lines.append(
+                f"face_tracking_gizmo_dropped_total{labels(pipeline=p, gizmo=g)} {v['dropped']}"
+            )
+
+    header("faces_per_frame", "histogram", "Number of detected faces per frame.")
+    for p, s in snapshots:
+        histogram("faces_per_frame", s["faces_per_frame"], pipeline=p)
+
+    header(
+        "stage_latency_seconds",
+        "histogram",
+        "Time from previous pipeline stage output to gizmo output.",
+    )
+    for p, s in snapshots:
+        for g, h in s["stage_latency_s"].items():
+            histogram("stage_latency_seconds", h, pipeline=p, gizmo=g)
+
+    # databases may be shared between pipelines: report each one only once
+    header(
+        "db_search_latency_seconds",
+        "histogram",
+        "Face embedding database search latency.",
+    )
+    db_histograms: list = []
+    for m in metrics:
+        if m.db_search_latency is not None and all(
+            m.db_search_latency is not h for h in db_histograms
+        ):
+            db_histograms.append(m.db_search_latency)
+    for i, h in enumerate(db_histograms):
+        histogram("db_search_latency_seconds", h.snapshot(), db=i)
+
+    header(
+        "match_cache_hits_total",
+        "counter",
+        "Number of tracked face searches answered from the track match cache.",
+    )
+    for p, s in snapshots:
+        if s["match_cache"] is not None:
+            lines.append(
+                f"face_tracking_match_cache_hits_total{labels(pipeline=p)} {s['match_cache']['hits']}"
+            )
+
+    header(
+        "match_cache_misses_total",
+        "counter",
+        "Number of tracked face searches passed to the database by the track match cache.",
+    )
+    for p, s in snapshots:
+        if s["match_cache"] is not None:
+            lines.append(
+                f"face_tracking_match_cache_misses_total{labels(pipeline=p)} {s['match_cache']['misses']}"
+            )
+
+    for name, (kind, value) in (extra or {}).items():
+        header(name, kind, name.replace("_", " ").capitalize() + ".")
+        lines.append(f"face_tracking_{name} {value}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,843 @@
+#
+# reid_db_service.py: Multi-process ReID Database Service
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Implements local ReID database server, which lets several processes (web app workers, face tracking
+# pipelines, enrollment scripts) share one face embedding database without stale reads or lock errors.
+#
+# The server is the single process which opens the LanceDB database: it serves database calls over
+# a Unix domain socket and publishes all embeddings as a read-only matrix in shared memory.
+# Clients search that matrix locally (zero-copy, no socket round-trip per search); all other
+# database calls are forwarded to the server. Each database change publishes a new matrix segment
+# named after its generation, so readers never see partially updated data; only embeddings of objects
+# changed by the call are reloaded from the database.
+#
+# The server runs as a detached process (started by the first client or standalone), so it keeps serving
+# when the process which started it exits; clients reconnect when the server is restarted.
+#
+# `ReID_DatabaseClient.attach()` makes a face tracker use the client: its enrollment and database calls
+# go to the server, and database searches of its pipelines use the shared matrix (see `attach_database()`).
+#
+# Usage (standalone server):
+#   `python reid_db_service.py --db-path temp/face_reid_db.lance --socket temp/reid_db.sock`
+#
+
+import argparse, contextlib, functools, hashlib, json, os, signal, socket, struct, subprocess, sys, threading, time
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Client, Connection, Listener
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import lancedb
+import numpy as np
+import degirum_face
+
+# control segment layout: generation of current data segment; data segment name is derived from it
+_CONTROL_FORMAT = "<Q"
+# data segment header layout: generation, number of embeddings, embedding size, size of object IDs JSON
+_DATA_HEADER_FORMAT = "<QQII"
+# environment variable to pass authentication key to spawned server process
+_AUTHKEY_ENV = "REID_DB_SERVICE_AUTHKEY"
+
+
+def _control_segment_name(socket_path: str) -> str:
+    """
+    Get name of shared memory control segment for the server socket path.
+    """
+    return (
+        "reid_" + hashlib.sha1(os.path.abspath(socket_path).encode()).hexdigest()[:16]
+    )
+
+
+def _data_segment_name(control_name: str, generation: int) -> str:
+    """
+    Get name of shared memory data segment of the generation.
+    """
+    return f"{control_name}_{generation}"
+
+
+# Before Python 3.13, every process which opens shared memory segment registers it in the resource tracker,
+# which unlinks the segment when the process exits. Segments are unlinked by the server explicitly,
+# so they are kept out of the resource tracker.
+
+
+def _untrack_segment(shm: SharedMemory):
+    """
+    Remove shared memory segment from the resource tracker.
+    """
+    if sys.version_info < (3, 13):
+        resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+
+
+def _attach_segment(name: str) -> SharedMemory:
+    """
+    Attach to existing shared memory segment.
+    """
+    shm = SharedMemory(name)
+    _untrack_segment(shm)
+    return shm
+
+
+def _create_segment(name: str, size: int) -> SharedMemory:
+    """
+    Create shared memory segment, replacing leftover segment of terminated server (if any).
+    """
+    try:
+        shm = SharedMemory(name, create=True, size=size)
+    except FileExistsError:
+        _unlink_segment(_attach_segment(name))
+        shm = SharedMemory(name, create=True, size=size)
+    _untrack_segment(shm)
+    return shm
+
+
+def _unlink_segment(shm: SharedMemory):
+    """
+    Close and unlink shared memory segment.
+    """
+    shm.close()
+    if sys.version_info < (3, 13):
+        # `unlink()` unregisters the segment from the resource tracker
+        resource_tracker.register(shm._name, "shared_memory")  # type: ignore[attr-defined]
+    shm.unlink()
+
+
+def _buffer(shm: SharedMemory) -> memoryview:
+    """
+    Get memory buffer of open shared memory segment.
+    """
+    assert shm.buf is not None, "shared memory segment is closed"
+    return shm.buf
+
+
+class ReID_DatabaseServer:
+    """
+    ReID database server: owns the database, serves database calls over Unix socket,
+    and publishes embedding matrix in shared memory.
+    """
+
+    # database methods which modify embeddings or attributes: shared matrix is republished after them
+    mutating_methods = {
+        "add_object",
+        "add_embeddings",
+        "add_embeddings_for_attributes",
+        "remove_embeddings_by_id",
+        "remove_embeddings_by_attributes",
+        "remove_object_by_attributes",
+        "remove_object_by_id",
+        "clear_all_tables",
+        "restore",
+    }
+
+    def __init__(
+        self,
+        db_path: str,
+        socket_path: str,
+        *,
+        model_name: Optional[str] = None,
+        authkey: Optional[bytes] = None,
+    ):
+        """
+        Constructor.
+
+        Args:
+            db_path (str): Path to the database.
+            socket_path (str): Path of Unix socket to listen on.
+            model_name (Optional[str]): Name of the embedding model; validated against the database when provided.
+            authkey (Optional[bytes]): Authentication key clients must provide.
+        """
+        self.db_path = db_path
+        self.socket_path = socket_path
+        self.model_name = model_name
+        self._authkey = authkey
+        self._db = degirum_face.ReID_Database(db_path, model_name)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._data_segment: Optional[SharedMemory] = None
+        self._stop = False
+        self._connections: Set[Connection] = set()
+        # normalized embeddings of each object, in the order of the embeddings table
+        self._rows: Dict[str, np.ndarray] = {}
+
+        # binding fails if another server already listens on this socket
+        os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+        if os.path.exists(socket_path):
+            try:
+                Client(socket_path, family="AF_UNIX", authkey=authkey).close()
+                raise RuntimeError(
+                    f"ReID database server is already running at {socket_path}"
+                )
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.remove(socket_path)  # stale socket of terminated server
+        self._listener = Listener(socket_path, family="AF_UNIX", authkey=authkey)
+        os.chmod(socket_path, 0o600)
+
+        control_name = _control_segment_name(socket_path)
+        control_size = struct.calcsize(_CONTROL_FORMAT)
+        self._control = _create_segment(control_name, control_size)
+        self._load_all()
+        self._publish()
+
+    def serve_forever(self):
+        """
+        Accept client connections and serve them, each in its own thread, until `stop()` is called.
+        """
+        try:
+            while not self._stop:
+                try:
+                    conn = self._listener.accept()
+                except OSError:
+                    if self._stop:
+                        break
+                    continue  # failed handshake
+                if self._stop:
+                    conn.close()
+                    break
+                threading.Thread(
+                    target=self._serve_client, args=(conn,), daemon=True
+                ).start()
+        finally:
+            self.close()
+
+    def stop(self):
+        """
+        Stop serving.
+        """
+        self._stop = True
+        # wake up `serve_forever()` waiting for connections
+        with contextlib.suppress(OSError):
+            Client(self.socket_path, family="AF_UNIX", authkey=self._authkey).close()
+
+    def close(self):
+        """
+        Disconnect clients and release socket and shared memory segments.
+        """
+        self._listener.close()
+        for conn in list(self._connections):
+            # wake up the connection thread blocked in receive: it closes the connection
+            with contextlib.suppress(OSError):
+                sock = socket.socket(fileno=conn.fileno())
+                sock.shutdown(socket.SHUT_RDWR)
+                sock.detach()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        for shm in (self._data_segment, self._control):
+            if shm is not None:
+                _unlink_segment(shm)
+        self._data_segment = None
+
+    def _serve_client(self, conn: Connection):
+        """
+        Client connection loop: receive (method, args, kwargs) requests and send ("ok", result) or ("error", exception).
+        """
+        self._connections.add(conn)
+        with conn:
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    self._connections.discard(conn)
+                    return
+
+                try:
+                    result = self._call(method, args, kwargs)
+                    response: Tuple[str, Any] = ("ok", result)
+                except Exception as e:
+                    response = ("error", e)
+
+                try:
+                    conn.send(response)
+                except (EOFError, OSError):
+                    self._connections.discard(conn)
+                    return
+                except Exception as e:
+                    # exception or result is not picklable
+                    conn.send(("error", RuntimeError(repr(e))))
+
+    def _call(self, method: str, args: tuple, kwargs: dict) -> Any:
+        """
+        Execute database call.
+        """
+        if method == "hello":
+            return {
+                "model_name": self.model_name,
+                "control_segment": self._control.name,
+            }
+        if method == "reload":
+            # database was changed bypassing the server, e.g. restored from snapshot: reopen it
+            with self._lock:
+                self._db = degirum_face.ReID_Database(self.db_path, self.model_name)
+                self._load_all()
+                self._publish()
+                return None
+        if method.startswith("_") or not hasattr(self._db, method):
+            raise AttributeError(f"ReID database has no method {method}")
+
+        if method in self.mutating_methods:
+            # serialize writes with matrix publishing, so matrix always reflects all completed writes
+            with self._lock:
+                changed = self._objects_to_change(method, args, kwargs)
+                result = getattr(self._db, method)(*args, **kwargs)
+                if method == "add_embeddings_for_attributes":
+                    changed = {result[1]}
+                if changed is None:
+                    self._load_all()
+                else:
+                    for object_id in changed:
+                        self._load_object(object_id)
+                self._publish()
+                return result
+        return getattr(self._db, method)(*args, **kwargs)
+
+    def _objects_to_change(
+        self, method: str, args: tuple, kwargs: dict
+    ) -> Optional[Set[str]]:
+        """
+        Get IDs of objects whose embeddings the database call changes; None if it may change all of them.
+        """
+        if method == "add_object":
+            return set()  # only attributes change
+        if method in (
+            "add_embeddings",
+            "remove_embeddings_by_id",
+            "remove_object_by_id",
+        ):
+            return {args[0] if args else kwargs["object_id"]}
+        if method in ("remove_embeddings_by_attributes", "remove_object_by_attributes"):
+            object_id = self._db.get_id_by_attributes(
+                args[0] if args else kwargs["attributes"]
+            )
+            return set() if object_id is None else {object_id}
+        if method == "add_embeddings_for_attributes":
+            return set()  # object ID is returned by the call
+        return None
+
+    def _load_all(self):
+        """
+        Load embeddings of all objects with one query of the embeddings table.
+        """
+        self._rows = {}
+        connection = lancedb.connect(self.db_path)
+        if (
+            degirum_face.ReID_Database.tbl_embeddings
+            not in connection.list_tables().tables
+        ):
+            return
+        table = connection.open_table(
+            degirum_face.ReID_Database.tbl_embeddings
+        ).to_arrow()
+        if not table.num_rows:
+            return
+        object_ids = table.column(degirum_face.ReID_Database.key_object_id).to_pylist()
+        vectors = table.column(
+            degirum_face.ReID_Database.key_embedding
+        ).combine_chunks()
+        matrix = _normalized(vectors.flatten().to_numpy().reshape(len(object_ids), -1))
+        rows: Dict[str, List[int]] = {}
+        for i, object_id in enumerate(object_ids):
+            rows.setdefault(object_id, []).append(i)
+        self._rows = {object_id: matrix[idx] for object_id, idx in rows.items()}
+
+    def _load_object(self, object_id: str):
+        """
+        Reload embeddings of one object.
+        """
+        vectors, _ = self._db.get_embeddings(object_id, retrieve_images=False)
+        if vectors:
+            self._rows[object_id] = _normalized(np.asarray(vectors))
+        else:
+            self._rows.pop(object_id, None)
+
+    def _publish(self):
+        """
+        Publish embedding matrix as new shared memory data segment.
+        """
+        object_ids: List[str] = []
+        for object_id, rows in self._rows.items():
+            object_ids.extend([object_id] * len(rows))
+        matrix = (
+            np.concatenate(list(self._rows.values()))
+            if self._rows
+            else np.zeros((0, 0), dtype=np.float32)
+        )
+        ids = json.dumps(object_ids).encode()
+
+        header_size = struct.calcsize(_DATA_HEADER_FORMAT)
+        generation = self._generation + 1
+        # one extra byte keeps segment size positive for empty database
+        segment = _create_segment(
+            _data_segment_name(self._control.name, generation),
+            header_size + matrix.nbytes + len(ids) + 1,
+        )
+        struct.pack_into(
+            _DATA_HEADER_FORMAT,
+            _buffer(segment),
+            0,
+            generation,
+            matrix.shape[0],
+            matrix.shape[1] if matrix.ndim == 2 else 0,
+            len(ids),
+        )
+        _buffer(segment)[header_size : header_size + matrix.nbytes] = matrix.tobytes()
+        _buffer(segment)[
+            header_size + matrix.nbytes : header_size + matrix.nbytes + len(ids)
+        ] = ids
+
+        # switch readers to the new segment; readers which already mapped the old one keep their mapping
+        self._generation = generation
+        struct.pack_into(_CONTROL_FORMAT, _buffer(self._control), 0, generation)
+        if self._data_segment is not None:
+            _unlink_segment(self._data_segment)
+        self._data_segment = segment
+
+
+class ReID_DatabaseClient:
+    """
+    Client of ReID database server. Provides the same methods as `ReID_Database`:
+    `get_attributes_by_embedding()` searches shared embedding matrix locally, other calls are forwarded to the server.
+    When the server connection is lost (e.g. the server was restarted), the client reconnects and switches
+    to the shared matrix of the new server; searches use the last published matrix meanwhile.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        *,
+        model_name: Optional[str] = None,
+        authkey: Optional[bytes] = None,
+        spawn: Optional[Callable[[], Any]] = None,
+        reconnect_timeout_s: float = 30.0,
+        check_interval_s: float = 1.0,
+    ):
+        """
+        Constructor.
+
+        Args:
+            socket_path (str): Path of server Unix socket.
+            model_name (Optional[str]): Name of the embedding model; validated against the server when provided.
+            authkey (Optional[bytes]): Authentication key of the server.
+            spawn (Optional[Callable[[], Any]]): Function starting the server when it is not running; None to only
+                wait for the server started by somebody else.
+            reconnect_timeout_s (float): Time in seconds to wait for the server when connecting.
+            check_interval_s (float): Interval in seconds between checks of the server connection made by searches.
+
+        Raises:
+            ValueError: If model_name doesn't match the server's model name.
+        """
+        self.socket_path = socket_path
+        self.reconnect_timeout_s = reconnect_timeout_s
+        self.check_interval_s = check_interval_s
+        self._authkey = authkey
+        self._spawn = spawn
+        self._requested_model_name = model_name
+        self._conn: Optional[Connection] = None
+        self._conn_lock = threading.Lock()
+        self._matrix_lock = threading.Lock()
+        self._next_check_time = 0.0
+
+        # model name of the server database, validated by `attach()`
+        self._model_name = model_name
+        self._control: Optional[SharedMemory] = None
+        self._generation = 0
+        self._segment: Optional[SharedMemory] = None
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._object_ids: List[str] = []
+        self._attributes: Dict[str, Any] = {}  # attributes cache for current generation
+        with self._conn_lock:
+            self._connect(reconnect_timeout_s if spawn is not None else 0.0)
+
+    def attach(self, face_tracker: degirum_face.FaceTracker):
+        """
+        Make the face tracker use the server: its enrollment and database calls go to the server,
+        and database searches of its pipelines use the shared matrix; see `attach_database()`.
+
+        Args:
+            face_tracker (FaceTracker): Face tracker with the same database path as the server.
+
+        Raises:
+            ValueError: If the embedding model of the face tracker doesn't match the server's model name.
+        """
+        model_name = face_tracker.config.face_embedding_model_spec.model_name
+        if self._model_name not in (None, model_name):
+            raise ValueError(
+                f"Model name mismatch: ReID database server uses model '{self._model_name}', "
+                f"but trying to access with model '{model_name}'"
+            )
+        attach_database(face_tracker, self)
+
+    def get_attributes_by_embedding(
+        self, embedding: np.ndarray, cosine_similarity_threshold: float = 0.6
+    ) -> Tuple[Optional[str], Optional[Any], float]:
+        """
+        Get the object ID and its attributes by its embedding.
+
+        Args:
+            embedding (np.ndarray): The embedding vector.
+            cosine_similarity_threshold (float): Threshold for the cosine similarity metric.
+
+        Returns:
+            tuple: The tuple containing object ID, object attributes, and similarity score; (None, None, 0.0) if not found.
+        """
+        self._check_connection()
+        with self._matrix_lock:
+            self._refresh()
+            matrix, object_ids = self._matrix, self._object_ids
+            if not len(matrix) or matrix.shape[1] != embedding.size:
+                return None, None, 0.0
+
+            query = np.asarray(embedding, dtype=np.float32).ravel()
+            norm = np.linalg.norm(query)
+            if norm == 0:
+                return None, None, 0.0
+            scores = matrix @ (query / norm)
+            best = int(np.argmax(scores))
+            score = float(scores[best])
+            if score < cosine_similarity_threshold:
+                return None, None, 0.0
+
+            object_id = object_ids[best]
+            attributes_cache = self._attributes
+            if object_id in attributes_cache:
+                return object_id, attributes_cache[object_id], score
+
+        # server is called without holding the matrix lock: reconnection takes it
+        attributes = self._rpc("get_attributes_by_id", object_id)
+        attributes_cache[object_id] = attributes
+        return object_id, attributes, score
+
+    def reload(self):
+        """
+        Make the server reopen the database and republish the embedding matrix: call it after the database
+        was changed bypassing the server, e.g. restored from snapshot.
+        """
+        self._rpc("reload")
+
+    def close(self):
+        """
+        Close server connection and release shared memory mappings.
+        """
+        with self._conn_lock:
+            self._disconnect()
+        with self._matrix_lock:
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+            if self._control is not None:
+                self._control.close()
+                self._control = None
+
+    def __getattr__(self, name: str):
+        """
+        Forward all other `ReID_Database` methods to the server.
+        """
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._rpc(name, *args, **kwargs)
+
+    def _rpc(self, method: str, *args, **kwargs) -> Any:
+        """
+        Call database method on the server, reconnecting when the connection is lost.
+
+        Raises:
+            ConnectionError: If the connection is lost after the request was sent: the call may or may not
+                have been executed, so it is not repeated.
+        """
+        with self._conn_lock:
+            if self._conn is None:
+                self._connect(self.reconnect_timeout_s)
+            assert self._conn is not None
+            try:
+                self._conn.send((method, args, kwargs))
+            except OSError:
+                # the request was not sent: it is safe to repeat it
+                self._disconnect()
+                self._connect(self.reconnect_timeout_s)
+                assert self._conn is not None
+                self._conn.send((method, args, kwargs))
+            try:
+                status, result = self._conn.recv()
+            except (EOFError, OSError) as e:
+                self._disconnect()
+                raise ConnectionError(
+                    f"Connection to ReID database server at {self.socket_path} is lost while calling {method}"
+                ) from e
+        if status == "error":
+            raise result
+        return result
+
+    def _connect(self, timeout_s: float):
+        """
+        Connect to the server (starting it when needed) and map its control segment.
+        Must be called under connection lock.
+        """
+        deadline = time.monotonic() + timeout_s
+        spawned = False
+        while True:
+            try:
+                conn = Client(self.socket_path, family="AF_UNIX", authkey=self._authkey)
+                break
+            except (ConnectionRefusedError, FileNotFoundError):
+                if self._spawn is not None and not spawned:
+                    self._spawn()
+                    spawned = True
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.1)
+
+        try:
+            conn.send(("hello", (), {}))
+            status, info = conn.recv()
+        except (EOFError, OSError):
+            conn.close()
+            raise
+        model_name = self._requested_model_name
+        if model_name and info["model_name"] and model_name != info["model_name"]:
+            conn.close()
+            raise ValueError(
+                f"Model name mismatch: server uses '{info['model_name']}', but '{model_name}' is requested"
+            )
+        control = _attach_segment(info["control_segment"])
+
+        # the server may be a new one: switch to its control segment and remap the matrix on next search
+        with self._matrix_lock:
+            if self._control is not None:
+                self._control.close()
+            self._control = control
+            self._generation = 0
+        self._model_name = info["model_name"] or model_name
+        self._conn = conn
+
+    def _disconnect(self):
+        """
+        Close server connection. Must be called under connection lock.
+        """
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _check_connection(self):
+        """
+        Periodically check if the server has closed the connection (e.g. it was stopped or restarted)
+        and try to reconnect without waiting. Searches never wait for other server calls.
+        """
+        now = time.monotonic()
+        if now < self._next_check_time:
+            return
+        self._next_check_time = now + self.check_interval_s
+        if not self._conn_lock.acquire(blocking=False):
+            return
+        try:
+            # idle connection is readable only when the server has closed it
+            if self._conn is not None and not self._conn.poll(0):
+                return
+            self._disconnect()
+            self._connect(0.0)
+        except (OSError, EOFError):
+            pass  # server is not available yet: keep searching the last published matrix
+        finally:
+            self._conn_lock.release()
+
+    def _refresh(self):
+        """
+        Map the latest data segment if the server published a new one. Must be called under matrix lock.
+        """
+        if self._control is None:
+            return
+        for _ in range(100):
+            (generation,) = struct.unpack_from(
+                _CONTROL_FORMAT, _buffer(self._control), 0
+            )
+            if generation == self._generation:
+                return
+            try:
+                segment = _attach_segment(
+                    _data_segment_name(self._control.name, generation)
+                )
+            except FileNotFoundError:
+                continue  # segment was replaced after reading control segment: retry
+
+            # data segment header holds its own generation: retry if the segment belongs to other generation
+            segment_generation, count, dim, ids_size = struct.unpack_from(
+                _DATA_HEADER_FORMAT, _buffer(segment), 0
+            )
+            if segment_generation != generation:
+                segment.close()
+                continue
+            offset = struct.calcsize(_DATA_HEADER_FORMAT)
+            matrix = np.ndarray(
+                (count, dim), dtype=np.float32, buffer=_buffer(segment), offset=offset
+            )
+            ids_offset = offset + matrix.nbytes
+            object_ids = json.loads(
+                bytes(_buffer(segment)[ids_offset : ids_offset + ids_size])
+            )
+
+            # release previous segment: its matrix view must be dropped before closing
+            self._matrix = matrix
+            if self._segment is not None:
+                self._segment.close()
+            self._segment = segment
+            self._object_ids = object_ids
+            self._attributes = {}
+            self._generation = generation
+            return
+
+
+def attach_database(face_tracker: degirum_face.FaceTracker, db: Any):
+    """
+    Make the face tracker use the database object (e.g. ReID database client) instead of the database instance
+    it got from `ReID_DatabasePool`: `face_tracker.db` becomes that object, and searches of the pooled instance,
+    which face recognizer gizmos of its pipelines use, are redirected to it. Face trackers sharing the pooled
+    instance are redirected as well. Call it before starting any pipeline of the face tracker; database search
+    hooks (tracing, metrics, match cache) should be installed into the attached object rather than the pooled one.
+
+    Args:
+        face_tracker (FaceTracker): Face tracker.
+        db (Any): Object providing `ReID_Database` methods.
+    """
+    pooled = face_tracker.db
+    face_tracker.db = db
+    if pooled is None or pooled is db:
+        return
+    if getattr(pooled.get_attributes_by_embedding, "attached_database", None) is db:
+        return  # already redirected
+
+    def search(*args, **kwargs):
+        # hooks installed into the attached object later apply to redirected searches as well
+        return db.get_attributes_by_embedding(*args, **kwargs)
+
+    search.attached_database = db  # type: ignore[attr-defined]
+    pooled.get_attributes_by_embedding = search  # type: ignore[method-assign]
+
+
+def _normalized(matrix: np.ndarray) -> np.ndarray:
+    """
+    Get float32 copy of the matrix with rows scaled to unit length.
+    """
+    matrix = np.array(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+def connect(
+    db_path: str,
+    socket_path: str,
+    *,
+    model_name: Optional[str] = None,
+    authkey: Optional[bytes] = None,
+    spawn: bool = True,
+) -> ReID_DatabaseClient:
+    """
+    Connect to ReID database server; pass the client to `attach()` of face trackers using the database.
+    When no server is running and `spawn` is set, start it as a detached process: the server outlives
+    the process which started it and keeps serving other processes.
+
+    Args:
+        db_path (str): Path to the database.
+        socket_path (str): Path of server Unix socket.
+        model_name (Optional[str]): Name of the embedding model.
+        authkey (Optional[bytes]): Authentication key of the server.
+        spawn (bool): Whether to start the server when it is not running (also when it stops later).
+
+    Returns:
+        ReID_DatabaseClient: Connected client.
+    """
+    return ReID_DatabaseClient(
+        socket_path,
+        model_name=model_name,
+        authkey=authkey,
+        spawn=(
+            functools.partial(
+                spawn_server,
+                db_path,
+                socket_path,
+                model_name=model_name,
+                authkey=authkey,
+            )
+            if spawn
+            else None
+        ),
+    )
+
+
+def spawn_server(
+    db_path: str,
+    socket_path: str,
+    *,
+    model_name: Optional[str] = None,
+    authkey: Optional[bytes] = None,
+) -> subprocess.Popen:
+    """
+    Start ReID database server as a detached process, in its own session, so it is not terminated
+    together with the process which started it. Server output goes to `<socket_path>.log`.
+    When another server is already running at the socket, the new one exits.
+
+    Args:
+        db_path (str): Path to the database.
+        socket_path (str): Path of Unix socket to listen on.
+        model_name (Optional[str]): Name of the embedding model.
+        authkey (Optional[bytes]): Authentication key clients must provide; passed to the server in environment.
+
+    Returns:
+        subprocess.Popen: Server process.
+    """
+    socket_path = os.path.abspath(socket_path)
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    args = [
+        sys.executable,
+        os.path.abspath(__file__),
+        "--db-path",
+        os.path.abspath(db_path),
+        "--socket",
+        socket_path,
+    ]
+    if model_name:
+        args += ["--model-name", model_name]
+    env = dict(os.environ)
+    if authkey:
+        env[_AUTHKEY_ENV] = authkey.hex()
+    with open(socket_path + ".log", "ab") as log:
+        return subprocess.Popen(
+            args,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ReID database server")
+    parser.add_argument("--db-path", required=True, help="path to the database")
+    parser.add_argument(
+        "--socket", required=True, help="path of Unix socket to listen on"
+    )
+    parser.add_argument("--model-name", help="name of the embedding model")
+    args = parser.parse_args()
+
+    authkey = os.environ.get(_AUTHKEY_ENV)
+    try:
+        server = ReID_DatabaseServer(
+            args.db_path,
+            args.socket,
+            model_name=args.model_name,
+            authkey=bytes.fromhex(authkey) if authkey else None,
+        )
+    except RuntimeError as e:
+        print(e)  # server was started concurrently by another process
+        return
+    print(f"ReID database server for {args.db_path} is listening on {args.socket}")
+    sys.stdout.flush()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
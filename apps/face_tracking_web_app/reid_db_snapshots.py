@@ -0,0 +1,671 @@
+#
+# reid_db_snapshots.py: Incremental Versioned ReID Database Snapshots
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Implements online snapshots of ReID database built on LanceDB table versions, an alternative to
+# zip-based `ReID_Database.backup()` / `restore()` for large galleries.
+#
+# Lance tables never modify their files in place: each table version adds uniquely named manifest, data,
+# deletion, index, and transaction files. A snapshot records the current version of each table (`Table.version`)
+# and keeps a copy of the whole versioned table directory; files are kept in the snapshot store once and shared
+# by all snapshots, so each snapshot copies only files added since the previous one (or just hard-links them when
+# the store is on the same file system). The table manifest format is never parsed. Taking a snapshot does not
+# close the database and does not block recognition: calls of `ReID_DatabaseProxy` are held only while table
+# versions are read.
+#
+# Snapshots are restored either by restoring the recorded table versions (`Table.restore()`; when the database
+# still has them, no data is copied), or by assembling the snapshot in a staging directory, swapping it with the
+# database directory, and then restoring the recorded versions there; restore listeners are notified afterwards,
+# so caches of database contents (e.g. shared matrix of the database service) are refreshed. Snapshots are
+# distributed to other stores (e.g. from central gallery to edge nodes) by exporting only files which
+# the destination does not have yet.
+#
+# Store layout:
+#   objects/<table>.lance/...           files of all snapshots, same layout as in the table directory
+#   snapshots/<snapshot ID>/snapshot.json     snapshot record: table versions and their file lists
+#
+# Usage:
+#   `python reid_db_snapshots.py snapshot --db-path temp/face_reid_db.lance --store temp/face_reid_db_snapshots`
+#   `python reid_db_snapshots.py export --store central_store --dest delta_dir --since <snapshot ID>`
+#   `python reid_db_snapshots.py import --store edge_store --src delta_dir`
+#   `python reid_db_snapshots.py restore --db-path edge_db.lance --store edge_store --snapshot <snapshot ID>`
+#   (add `--socket temp/reid_db.sock` when the database is served by the ReID database service)
+#
+
+import argparse, contextlib, json, os, shutil, threading, time, uuid
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import lancedb
+import degirum_face
+
+import reid_db_service
+
+# directory of table manifests inside Lance table directory
+_VERSIONS_DIR = "_versions"
+# snapshot record file name
+_RECORD_FILE = "snapshot.json"
+
+
+class ReID_DatabaseProxy:
+    """
+    ReID database opened in this process, which snapshots can hold and reopen.
+    Provides the same methods as `ReID_Database`: calls are forwarded to the database instance under the proxy lock,
+    so snapshots read table versions between calls, never in the middle of multi-table changes.
+    After restore, the instance is replaced by a new one opened on the restored database.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        model_name: Optional[str] = None,
+        read_consistency_interval: Optional[float] = None,
+    ):
+        """
+        Constructor.
+
+        Args:
+            db_path (str): Path to the database.
+            model_name (Optional[str]): Name of the embedding model.
+            read_consistency_interval (Optional[float]): Read consistency interval in seconds; see `ReID_Database`.
+        """
+        self.db_path = db_path
+        self._args = (db_path, model_name, read_consistency_interval)
+        self._lock = threading.RLock()
+        self._db = degirum_face.ReID_Database(*self._args)
+
+    def attach(self, face_tracker: degirum_face.FaceTracker):
+        """
+        Make the face tracker use this proxy; see `reid_db_service.attach_database()`.
+
+        Args:
+            face_tracker (FaceTracker): Face tracker with the same database path.
+        """
+        reid_db_service.attach_database(face_tracker, self)
+
+    def hold(self) -> Any:
+        """
+        Get context manager holding database calls.
+        """
+        return self._lock
+
+    def reopen(self):
+        """
+        Open the database again, e.g. after it was restored.
+        """
+        with self._lock:
+            self._db = degirum_face.ReID_Database(*self._args)
+
+    def __getattr__(self, name: str):
+        """
+        Forward `ReID_Database` methods to the current database instance.
+        """
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            with self._lock:
+                return getattr(self._db, name)(*args, **kwargs)
+
+        return call
+
+
+class ReID_DatabaseSnapshots:
+    """
+    Store of incremental versioned snapshots of one ReID database.
+
+    Usage:
+        snapshots = ReID_DatabaseSnapshots("temp/face_reid_db.lance", "temp/face_reid_db_snapshots")
+        record = snapshots.snapshot(name="nightly")
+        ...
+        snapshots.restore(record["id"])
+    """
+
+    def __init__(self, db_path: str, store_dir: str, *, db: Any = None):
+        """
+        Constructor.
+
+        Args:
+            db_path (str): Path to the database.
+            store_dir (str): Snapshot store directory; it is created when missing.
+            db (Optional[ReID_DatabaseProxy]): Database used by this process: its calls are held while table versions
+                are read, and it is reopened after restore. Other database objects (e.g. ReID database client)
+                are not held; use restore listeners to refresh them.
+        """
+        self.db_path = db_path
+        self.store_dir = store_dir
+        self._db = db
+        self._lock = threading.Lock()
+        self._restore_listeners: List[Callable[[dict, str], Any]] = []
+        os.makedirs(os.path.join(store_dir, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(store_dir, "snapshots"), exist_ok=True)
+
+    def snapshot(self, name: Optional[str] = None) -> dict:
+        """
+        Take snapshot of the current database state. Only files added since previous snapshots are copied.
+
+        Args:
+            name (Optional[str]): Optional human-readable snapshot name.
+
+        Returns:
+            dict: Snapshot record: "id", "name", "time", "tables" (table name -> "version" and "files"),
+                and "copied_files" / "copied_bytes" statistics of this snapshot.
+
+        Raises:
+            ValueError: If a file of the database was changed since it was added to the store.
+        """
+        with self._lock:
+            # snapshot IDs sort by snapshot time
+            now = time.time()
+            snapshot_id = (
+                time.strftime("%Y%m%dT%H%M%S", time.localtime(now))
+                + f".{int(now % 1 * 1e6):06d}"
+                + f"-{uuid.uuid4().hex[:8]}"
+            )
+            snapshot_dir = os.path.join(self.store_dir, "snapshots", snapshot_id)
+            staging_dir = snapshot_dir + ".tmp"
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            os.makedirs(staging_dir)
+
+            # consistent set of table versions: database calls are held only while versions are read
+            connection = lancedb.connect(self.db_path)
+            with self._hold_db():
+                handles = {
+                    table: connection.open_table(table)
+                    for table in connection.list_tables().tables
+                }
+                versions = {table: handle.version for table, handle in handles.items()}
+
+            record: Dict[str, Any] = {
+                "id": snapshot_id,
+                "name": name,
+                "time": now,
+                "tables": {},
+                "copied_files": 0,
+                "copied_bytes": 0,
+            }
+            objects_dir = os.path.join(self.store_dir, "objects")
+            try:
+                for table, version in versions.items():
+                    table_dir = os.path.join(self.db_path, f"{table}.lance")
+                    files = _table_files(table_dir)
+                    for rel_path in files:
+                        src = os.path.join(table_dir, rel_path)
+                        dst = os.path.join(objects_dir, f"{table}.lance", rel_path)
+                        if not os.path.exists(dst):
+                            _link_or_copy(src, dst)
+                            record["copied_files"] += 1
+                            record["copied_bytes"] += os.path.getsize(dst)
+                        elif os.path.getsize(dst) != os.path.getsize(src):
+                            raise ValueError(
+                                f"File {rel_path} of table {table} was changed in place; it cannot be snapshotted"
+                            )
+
+                    record["tables"][table] = {
+                        "version": version,
+                        "timestamp": _version_timestamp(handles[table], version),
+                        "files": files,
+                    }
+
+                _write_json(os.path.join(staging_dir, _RECORD_FILE), record)
+                os.replace(staging_dir, snapshot_dir)
+            except BaseException:
+                # files already added to the store are removed by `delete()` of any snapshot
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                raise
+            return record
+
+    def list_snapshots(self) -> List[dict]:
+        """
+        List snapshots of the store.
+
+        Returns:
+            List[dict]: Snapshot records sorted by time, oldest first; file lists are omitted.
+        """
+        ret = []
+        for snapshot_id in self._snapshot_ids():
+            record = self.get_snapshot(snapshot_id)
+            record["tables"] = {
+                table: {"version": info["version"], "files": len(info["files"])}
+                for table, info in record["tables"].items()
+            }
+            ret.append(record)
+        return ret
+
+    def get_snapshot(self, snapshot_id: str) -> dict:
+        """
+        Get snapshot record.
+
+        Args:
+            snapshot_id (str): Snapshot ID.
+
+        Returns:
+            dict: Snapshot record.
+
+        Raises:
+            KeyError: If there is no such snapshot in the store.
+        """
+        return _read_record(self.store_dir, snapshot_id)
+
+    def delete(self, snapshot_id: str):
+        """
+        Delete snapshot and data files not used by other snapshots.
+
+        Args:
+            snapshot_id (str): Snapshot ID.
+        """
+        with self._lock:
+            self.get_snapshot(snapshot_id)  # raises KeyError when missing
+            shutil.rmtree(os.path.join(self.store_dir, "snapshots", snapshot_id))
+
+            used = set()
+            for other_id in self._snapshot_ids():
+                used |= _object_paths(_read_record(self.store_dir, other_id))
+            objects_dir = os.path.join(self.store_dir, "objects")
+            for root, _, files in os.walk(objects_dir):
+                for file in files:
+                    path = os.path.join(root, file)
+                    if os.path.relpath(path, objects_dir) not in used:
+                        os.unlink(path)
+
+    def export(
+        self,
+        dest_dir: str,
+        snapshot_id: Optional[str] = None,
+        *,
+        since: Optional[str] = None,
+    ) -> dict:
+        """
+        Export snapshot to another store directory, copying only files which the destination needs:
+        files which are already there are skipped, and when `since` is specified, files of that earlier snapshot
+        are skipped as well (the destination is assumed to have it). Use an empty directory as destination
+        to create a delta package, then import it into the destination store with `import_from()`.
+
+        Args:
+            dest_dir (str): Destination store directory; it is created when missing.
+            snapshot_id (Optional[str]): Snapshot to export; the latest snapshot when None.
+            since (Optional[str]): Snapshot which the destination already has.
+
+        Returns:
+            dict: Export statistics: "id" of exported snapshot, "copied_files", "copied_bytes".
+        """
+        if snapshot_id is None:
+            ids = self._snapshot_ids()
+            if not ids:
+                raise KeyError("There are no snapshots in the store")
+            snapshot_id = ids[-1]
+        record = self.get_snapshot(snapshot_id)
+        skip = _object_paths(self.get_snapshot(since)) if since else set()
+        return _copy_snapshot(self.store_dir, dest_dir, record, skip)
+
+    def import_from(self, src_dir: str) -> List[str]:
+        """
+        Import snapshots exported by another store, e.g. delta package made by `export()`.
+
+        Args:
+            src_dir (str): Source store directory.
+
+        Returns:
+            List[str]: IDs of imported snapshots.
+
+        Raises:
+            ValueError: If data files of imported snapshot are neither in the source nor in this store,
+                i.e. the delta is based on a snapshot which was not imported yet.
+        """
+        with self._lock:
+            existing = set(self._snapshot_ids())
+            ret = []
+            for snapshot_id in _list_snapshot_ids(src_dir):
+                if snapshot_id in existing:
+                    continue
+                _copy_snapshot(
+                    src_dir, self.store_dir, _read_record(src_dir, snapshot_id)
+                )
+                ret.append(snapshot_id)
+            return ret
+
+    def add_restore_listener(self, listener: Callable[[dict, str], Any]):
+        """
+        Subscribe to database restores, e.g. to drop caches of database contents.
+
+        Args:
+            listener (Callable[[dict, str], Any]): Function called after each successful `restore()`
+                with the restored snapshot record and the restore method ("checkout" or "copy").
+        """
+        self._restore_listeners.append(listener)
+
+    def remove_restore_listener(self, listener: Callable[[dict, str], Any]):
+        """
+        Undo `add_restore_listener()`.
+
+        Args:
+            listener (Callable[[dict, str], Any]): Listener passed to `add_restore_listener()`.
+        """
+        if listener in self._restore_listeners:
+            self._restore_listeners.remove(listener)
+
+    def restore(self, snapshot_id: str) -> str:
+        """
+        Restore the database to the snapshot state.
+
+        When the database still has all table versions of the snapshot, those versions are restored:
+        no data is copied and the database stays online. Otherwise the snapshot is assembled in a staging directory
+        (files are hard-linked from the store when possible) and swapped with the database directory,
+        and the snapshot versions are restored there; database calls of this process are held only during the swap.
+        Other processes using the database directly must be stopped for that; use the database service to share
+        the database between processes.
+        Restore listeners are called when the database is restored.
+
+        Args:
+            snapshot_id (str): Snapshot ID.
+
+        Returns:
+            str: Restore method used: "checkout" or "copy".
+        """
+        with self._lock:
+            record = self.get_snapshot(snapshot_id)
+            missing = [
+                path
+                for path in _object_paths(record)
+                if not os.path.exists(os.path.join(self.store_dir, "objects", path))
+            ]
+            if missing:
+                raise ValueError(
+                    f"Snapshot {snapshot_id} is incomplete: {len(missing)} data files are missing in the store"
+                )
+
+            if self._can_checkout(record):
+                with self._hold_db():
+                    self._restore_versions(record)
+                method = "checkout"
+            else:
+                self._restore_copy(record)
+                method = "copy"
+
+        for listener in list(self._restore_listeners):
+            listener(record, method)
+        return method
+
+    def _restore_copy(self, record: dict):
+        """
+        Assemble snapshot in staging directory, swap it with the database directory, and restore snapshot versions
+        (must be called under lock). Besides the snapshot versions, the directory may have newer versions
+        which were being written while the snapshot was taken.
+        """
+        staging_dir = self.db_path.rstrip("/\\") + ".restore"
+        old_dir = self.db_path.rstrip("/\\") + ".old"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        for table, info in record["tables"].items():
+            table_dir = os.path.join(staging_dir, f"{table}.lance")
+            for rel_path in info["files"]:
+                _link_or_copy(
+                    os.path.join(self.store_dir, "objects", f"{table}.lance", rel_path),
+                    os.path.join(table_dir, rel_path),
+                )
+
+        shutil.rmtree(old_dir, ignore_errors=True)
+        with self._hold_db():
+            if os.path.exists(self.db_path):
+                os.replace(self.db_path, old_dir)
+            os.replace(staging_dir, self.db_path)
+            self._restore_versions(record)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def _restore_versions(self, record: dict):
+        """
+        Make snapshot versions the latest versions of database tables and reopen the database of this process
+        (must be called while database calls are held).
+        """
+        connection = lancedb.connect(self.db_path)
+        for table, info in record["tables"].items():
+            handle = connection.open_table(table)
+            if handle.version != info["version"]:
+                handle.restore(info["version"])
+        if isinstance(self._db, ReID_DatabaseProxy):
+            self._db.reopen()
+
+    def _can_checkout(self, record: dict) -> bool:
+        """
+        Check if the database has the same set of tables as the snapshot and still has their snapshot versions.
+        """
+        if not os.path.isdir(self.db_path):
+            return False
+        connection = lancedb.connect(self.db_path)
+        if set(connection.list_tables().tables) != set(record["tables"]):
+            return False
+        for table, info in record["tables"].items():
+            # table may have been dropped and created again: its versions are numbered from scratch
+            if (
+                _version_timestamp(connection.open_table(table), info["version"])
+                != info["timestamp"]
+            ):
+                return False
+        return True
+
+    def _hold_db(self) -> Any:
+        """
+        Get context manager holding calls of the database of this process.
+        """
+        if isinstance(self._db, ReID_DatabaseProxy):
+            return self._db.hold()
+        return contextlib.nullcontext()
+
+    def _snapshot_ids(self) -> List[str]:
+        return _list_snapshot_ids(self.store_dir)
+
+
+def _list_snapshot_ids(store_dir: str) -> List[str]:
+    """
+    List IDs of complete snapshots of the store, oldest first.
+    """
+    snapshots_dir = os.path.join(store_dir, "snapshots")
+    if not os.path.isdir(snapshots_dir):
+        return []
+    return sorted(
+        entry
+        for entry in os.listdir(snapshots_dir)
+        if not entry.endswith(".tmp")
+        and os.path.isfile(os.path.join(snapshots_dir, entry, _RECORD_FILE))
+    )
+
+
+def _read_record(store_dir: str, snapshot_id: str) -> dict:
+    """
+    Read snapshot record of the store.
+    """
+    path = os.path.join(store_dir, "snapshots", snapshot_id, _RECORD_FILE)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise KeyError(f"Snapshot {snapshot_id} is not found in {store_dir}") from None
+
+
+def _object_paths(record: dict) -> Set[str]:
+    """
+    Get paths of snapshot data files relative to store objects directory.
+    """
+    return {
+        os.path.join(f"{table}.lance", rel_path)
+        for table, info in record["tables"].items()
+        for rel_path in info["files"]
+    }
+
+
+def _copy_snapshot(
+    src_dir: str, dest_dir: str, record: dict, skip: Optional[Set[str]] = None
+) -> dict:
+    """
+    Copy snapshot from one store to another: data files missing in the destination (except `skip` ones)
+    are copied first, then the snapshot record, so incomplete copies are never listed as snapshots.
+    """
+    ret = {"id": record["id"], "copied_files": 0, "copied_bytes": 0}
+    missing = 0
+    for path in sorted(_object_paths(record) - (skip or set())):
+        src = os.path.join(src_dir, "objects", path)
+        dst = os.path.join(dest_dir, "objects", path)
+        if os.path.exists(dst):
+            continue
+        if not os.path.exists(src):
+            missing += 1
+            continue
+        _link_or_copy(src, dst)
+        ret["copied_files"] += 1
+        ret["copied_bytes"] += os.path.getsize(dst)
+
+    # data files which the delta does not carry must already be in the destination
+    if missing:
+        absent = [
+            path
+            for path in _object_paths(record)
+            if not os.path.exists(os.path.join(dest_dir, "objects", path))
+        ]
+        if absent:
+            raise ValueError(
+                f"Snapshot {record['id']} cannot be imported: {len(absent)} data files are missing; "
+                "import the snapshot the delta is based on first"
+            )
+
+    snapshot_src = os.path.join(src_dir, "snapshots", record["id"])
+    snapshot_dst = os.path.join(dest_dir, "snapshots", record["id"])
+    staging_dir = snapshot_dst + ".tmp"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    shutil.copytree(snapshot_src, staging_dir)
+    os.makedirs(os.path.join(dest_dir, "objects"), exist_ok=True)
+    os.replace(staging_dir, snapshot_dst)
+    return ret
+
+
+def _table_files(table_dir: str) -> List[str]:
+    """
+    List files of the versioned table directory, relative to it. Manifests are listed first: files of a version
+    are written before its manifest, so every listed version is complete. Besides manifests, the versions directory
+    holds only the latest version hint, which Lance rewrites in place; it is skipped, since Lance finds the latest
+    version by listing manifests when the hint is missing.
+    """
+    versions_dir = os.path.join(table_dir, _VERSIONS_DIR)
+    ret = sorted(
+        f"{_VERSIONS_DIR}/{name}"
+        for name in os.listdir(versions_dir)
+        if name.endswith(".manifest")
+    )
+    for root, dirs, names in os.walk(table_dir):
+        if root == table_dir and _VERSIONS_DIR in dirs:
+            dirs.remove(_VERSIONS_DIR)
+        ret += sorted(
+            os.path.relpath(os.path.join(root, name), table_dir).replace(os.sep, "/")
+            for name in names
+        )
+    return ret
+
+
+def _version_timestamp(table: Any, version: int) -> Optional[str]:
+    """
+    Get commit time of the table version, which tells versions of recreated tables apart; None when the table
+    has no such version.
+    """
+    return next(
+        (
+            v["timestamp"].isoformat()
+            for v in table.list_versions()
+            if v["version"] == version
+        ),
+        None,
+    )
+
+
+def _link_or_copy(src: str, dst: str):
+    """
+    Hard-link file when source and destination are on the same file system, otherwise copy it.
+    Copy is written to temporary file first, so destination is never partial.
+    """
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        pass
+    except OSError:
+        tmp = f"{dst}.{uuid.uuid4().hex}.tmp"
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+
+
+def _write_json(path: str, data: Any):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def reload_server(socket_path: str):
+    """
+    Make running ReID database server reload the database, e.g. after restore done by another process.
+
+    Args:
+        socket_path (str): Path of server Unix socket.
+    """
+    client = reid_db_service.ReID_DatabaseClient(socket_path)
+    try:
+        client.reload()
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ReID database snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("snapshot", help="take database snapshot")
+    cmd.add_argument("--db-path", required=True, help="path to the database")
+    cmd.add_argument("--store", required=True, help="snapshot store directory")
+    cmd.add_argument("--name", help="snapshot name")
+
+    cmd = commands.add_parser("list", help="list snapshots")
+    cmd.add_argument("--store", required=True, help="snapshot store directory")
+
+    cmd = commands.add_parser("export", help="export snapshot to another store")
+    cmd.add_argument("--store", required=True, help="snapshot store directory")
+    cmd.add_argument("--dest", required=True, help="destination store directory")
+    cmd.add_argument("--snapshot", help="snapshot ID (default: latest)")
+    cmd.add_argument("--since", help="snapshot ID the destination already has")
+
+    cmd = commands.add_parser("import", help="import snapshots from another store")
+    cmd.add_argument("--store", required=True, help="snapshot store directory")
+    cmd.add_argument("--src", required=True, help="source store directory")
+
+    cmd = commands.add_parser("restore", help="restore database from snapshot")
+    cmd.add_argument("--db-path", required=True, help="path to the database")
+    cmd.add_argument("--store", required=True, help="snapshot store directory")
+    cmd.add_argument("--snapshot", required=True, help="snapshot ID")
+    cmd.add_argument(
+        "--socket", help="socket of ReID database server to reload the database"
+    )
+
+    cmd = commands.add_parser("delete", help="delete snapshot")
+    cmd.add_argument("--store", required=True, help="snapshot store directory")
+    cmd.add_argument("--snapshot", required=True, help="snapshot ID")
+    args = parser.parse_args()
+
+    snapshots = ReID_DatabaseSnapshots(getattr(args, "db_path", "") or "", args.store)
+    if args.command == "snapshot":
+        result: Any = snapshots.snapshot(args.name)
+        result.pop("tables")
+    elif args.command == "list":
+        result = snapshots.list_snapshots()
+    elif args.command == "export":
+        result = snapshots.export(args.dest, args.snapshot, since=args.since)
+    elif args.command == "import":
+        result = snapshots.import_from(args.src)
+    elif args.command == "restore":
+        if args.socket:
+            snapshots.add_restore_listener(
+                lambda record, method: reload_server(args.socket)
+            )
+        result = snapshots.restore(args.snapshot)
+    else:
+        snapshots.delete(args.snapshot)
+        result = args.snapshot
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+#
+# track_match_cache.py: Track-Level Face Match Cache
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Implements per-track cache of face database search results for face tracking pipelines.
+# When a new embedding is computed for a track which is already identified, it is compared with the
+# embedding of the track's last database match: if they are similar enough, the cached identity is used
+# and the database search is skipped. Full search is done when similarity drops below the threshold,
+# when the track has no match yet, or when the database was modified since the last match: database version
+# is the set of Lance table versions of its embeddings and attributes tables, so writes of all processes
+# and snapshot restores are detected.
+#
+# Cache hooks are installed only when the cache is enabled, so disabled cache has no overhead.
+#
+
+import copy, os, threading
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, Optional, Tuple
+
+import lancedb
+
+import numpy as np
+import degirum_face
+from degirum_face.face_tracking_gizmos import tag_face_search
+
+from pipeline_metrics import instrument_database
+
+
+class TrackMatchCache:
+    """
+    Per-track cache of face database matches of one face tracking pipeline.
+
+    Usage:
+        match_cache = TrackMatchCache(min_similarity=0.9)
+        face_tracker = degirum_face.FaceTracker(match_cache.instrument(config))
+        ...
+        print(match_cache.hits, match_cache.misses)
+    """
+
+    def __init__(self, *, min_similarity: float = 0.9, max_tracks: int = 1000):
+        """
+        Constructor.
+
+        Args:
+            min_similarity (float): Minimum cosine similarity between the new embedding of the track and the embedding
+                of its last database match to reuse that match; below it the database is searched again.
+            max_tracks (int): Maximum number of tracks to keep matches for; least recently seen tracks are discarded.
+        """
+        self.min_similarity = min_similarity
+        self.max_tracks = max_tracks
+        # number of searches of tracked faces answered from the cache and passed to the database
+        self.hits = 0
+        self.misses = 0
+
+        # track ID -> (embedding, database version, search result)
+        self._matches: "OrderedDict[int, Tuple[np.ndarray, tuple, tuple]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        # track ID of the face crop being processed in current thread
+        self._local = threading.local()
+
+    def instrument(
+        self, config: degirum_face.FaceTrackerConfig, *, db: Optional[Any] = None
+    ) -> Any:
+        """
+        Install cache hooks for the pipeline configuration: face embedding model is wrapped to get track IDs
+        of face crops, and database search is wrapped to look up the cache first.
+
+        Args:
+            config (FaceTrackerConfig): Face tracking pipeline configuration.
+            db (Optional[ReID_Database]): Database searched by the pipeline, e.g. ReID database client;
+                by default the `ReID_DatabasePool` instance of the configured database path.
+
+        Returns:
+            FaceTrackerConfig: Shallow copy of the configuration with wrapped face embedding model spec;
+                pass it to `FaceTracker` constructor. The original configuration is not modified.
+        """
+        ret = copy.copy(config)
+        ret.face_embedding_model_spec = _TrackedModelSpec(
+            config.face_embedding_model_spec, self
+        )
+        if config.db_path:
+            if db is None:
+                db = degirum_face.ReID_DatabasePool.get(
+                    config.db_path,
+                    config.face_embedding_model_spec.model_name,
+                    config.read_consistency_interval,
+                )
+            self._instrument_database(db, _TableVersions(config.db_path))
+        return ret
+
+    def clear(self):
+        """
+        Forget all cached matches.
+        """
+        with self._lock:
+            self._matches.clear()
+
+    def _instrument_database(self, db: Any, version: "_TableVersions"):
+        """
+        Wrap database search method to look up the cache for faces of tracks processed in current thread.
+        Database instances are shared between pipelines (see `ReID_DatabasePool`), so searches of other pipelines
+        pass through this wrapper unchanged.
+        """
+        # install search latency histogram first, so it measures only searches which miss the cache
+        latency_histogram = instrument_database(db)
+        search = db.get_attributes_by_embedding
+        if getattr(search, "track_match_cache", None) is self:
+            return  # already instrumented
+
+        def cached_search(embedding, *args, **kwargs):
+            track_id = getattr(self._local, "track_id", None)
+            if track_id is None:
+                return search(embedding, *args, **kwargs)
+
+            db_version = version()
+            if db_version is None:
+                # database version is unknown: nothing can be reused or cached
+                return search(embedding, *args, **kwargs)
+
+            with self._lock:
+                entry = self._matches.get(track_id)
+                if entry is not None:
+                    matched_embedding, matched_version, result = entry
+                    if (
+                        matched_version == db_version
+                        and float(np.dot(matched_embedding, embedding))
+                        >= self.min_similarity
+                    ):
+                        self._matches.move_to_end(track_id)
+                        self.hits += 1
+                        return result
+                self.misses += 1
+
+            result = search(embedding, *args, **kwargs)
+            with self._lock:
+                # only identified tracks are cached
+                if result[0] is None:
+                    self._matches.pop(track_id, None)
+                else:
+                    self._matches[track_id] = (embedding, db_version, result)
+                    self._matches.move_to_end(track_id)
+                    while len(self._matches) > self.max_tracks:
+                        self._matches.popitem(last=False)
+            return result
+
+        cached_search.track_match_cache = self  # type: ignore[attr-defined]
+        # keep `instrument_database()` from wrapping this wrapper once again
+        cached_search.latency_histogram = latency_histogram  # type: ignore[attr-defined]
+        db.get_attributes_by_embedding = cached_search
+
+
+class _TableVersions:
+    """
+    Database version reader: the version is the tuple of Lance table versions of the embeddings and attributes
+    tables. Every write of any process commits a new table version, and snapshot restores either commit a new
+    version or replace table directories, so table directory inodes are included as well.
+    """
+
+    tables = (
+        degirum_face.ReID_Database.tbl_embeddings,
+        degirum_face.ReID_Database.tbl_attributes,
+    )
+
+    def __init__(self, db_path: str):
+        """
+        Constructor.
+
+        Args:
+            db_path (str): Path to the database.
+        """
+        self._db_path = db_path
+        self._connection: Any = None
+        # table name -> (table directory inode, table handle)
+        self._handles: Dict[str, Tuple[int, Any]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self) -> Optional[tuple]:
+        """
+        Get current database version.
+
+        Returns:
+            Optional[tuple]: Database version; None when it cannot be read, e.g. when tables do not exist yet.
+        """
+        with self._lock:
+            try:
+                return tuple(self._table_version(table) for table in self.tables)
+            except Exception:
+                # table was dropped or replaced: reopen its handle next time
+                self._handles.clear()
+                return None
+
+    def _table_version(self, table: str) -> Tuple[int, int]:
+        """
+        Get (table directory inode, table version) of the table.
+        """
+        inode = os.stat(os.path.join(self._db_path, f"{table}.lance")).st_ino
+        entry = self._handles.get(table)
+        if entry is None or entry[0] != inode:
+            if self._connection is None:
+                # zero consistency interval: each version read checks the latest committed table version
+                self._connection = lancedb.connect(
+                    self._db_path, read_consistency_interval=timedelta(0)
+                )
+            entry = (inode, self._connection.open_table(table))
+            self._handles[table] = entry
+        return inode, entry[1].version
+
+
+class _TrackedModelSpec:
+    """
+    Model specification wrapper which loads face embedding models with track ID hooks.
+    """
+
+    def __init__(self, spec: Any, cache: TrackMatchCache):
+        self._spec = spec
+        self._cache = cache
+
+    def __getattr__(self, name: str):
+        return getattr(self._spec, name)
+
+    def load_model(self, zoo=None):
+        return _TrackedModel(self._spec.load_model(zoo), self._cache)
+
+    def __repr__(self):
+        return f"Tracked{self._spec!r}"
+
+
+class _TrackedModel:
+    """
+    Face embedding model wrapper which exposes the track ID of each face crop result to the database search
+    done by the consumer of that result.
+    """
+
+    def __init__(self, model: Any, cache: TrackMatchCache):
+        object.__setattr__(self, "_model", model)
+        object.__setattr__(self, "_cache", cache)
+
+    def __getattr__(self, name: str):
+        return getattr(self._model, name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._model, name, value)
+
+    def predict_batch(self, data):
+        local = self._cache._local
+        for result in self._model.predict_batch(data):
+            crop_meta = (
+                result.info.find_last(tag_face_search)
+                if result is not None and hasattr(result.info, "find_last")
+                else None
+            )
+            track_id: Optional[int] = (
+                crop_meta.get(degirum_face.FaceRecognizerGizmo.key_track_id)
+                if isinstance(crop_meta, dict)
+                else None
+            )
+            if track_id is None:
+                yield result
+                continue
+            local.track_id = track_id
+            try:
+                yield result
+            finally:
+                local.track_id = None
@@ -0,0 +1,388 @@
+#
+# vectorized_analyzers.py: Vectorized Temporal Face Analyzers
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Implements drop-in replacements of `HeadPoseAnalyzer` and `LivenessDetector` which process all faces
+# of a frame in one vectorized step instead of face by face:
+# - head pose scores are computed for all faces at once from the landmarks array
+# - liveness trails of all tracks are kept in one preallocated table of NumPy ring buffers
+#   indexed by track slot; slots of expired tracks are reused by new tracks, and threshold crossings
+#   are counted for all faces and features at once in preallocated work buffers reused across frames
+# Results are the same as the ones of the original analyzers (up to floating point rounding).
+#
+
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+import degirum_face
+from degirum_face import HeadPoseAnalyzer, FaceRecognitionResult
+from degirum_face.face_tracking_gizmos import LivenessDetector
+from analyzer_factory import add_analyzer_transform
+
+
+class VectorizedHeadPoseAnalyzer(HeadPoseAnalyzer):
+    """
+    `HeadPoseAnalyzer` which computes head pose scores of all faces of the frame in one vectorized step.
+    """
+
+    def analyze(self, result):
+        """Analyze inference result and compute head pose confidence scores"""
+
+        faces = [
+            face
+            for face in result.results
+            if face.get("landmarks") and len(face["landmarks"]) == 5
+        ]
+        if not faces:
+            return
+
+        # landmarks array: faces x (left eye, right eye, nose, left mouth, right mouth) x (x, y)
+        points = np.array(
+            [[lm["landmark"][:2] for lm in face["landmarks"]] for face in faces],
+            dtype=np.float64,
+        )
+        left_eye, right_eye, nose = points[:, 0], points[:, 1], points[:, 2]
+        left_mouth, right_mouth = points[:, 3], points[:, 4]
+
+        # head turned left/right: nose offset projected onto tilt-invariant horizontal axis
+        eye_midpoint = (left_eye + right_eye) / 2
+        mouth_midpoint = (left_mouth + right_mouth) / 2
+        face_midpoint = (eye_midpoint + mouth_midpoint) / 2
+        eye_vector = right_eye - left_eye
+        horiz_vector = eye_vector + (right_mouth - left_mouth)
+        horiz_unit = horiz_vector / (
+            np.linalg.norm(horiz_vector, axis=1, keepdims=True) + 1e-6
+        )
+        eye_distance = np.linalg.norm(eye_vector, axis=1)
+        nose_offset_projected = np.sum((nose - face_midpoint) * horiz_unit, axis=1)
+        nose_offset_ratio = 2.0 * nose_offset_projected / (eye_distance + 1e-6)
+        turned_left = np.clip(nose_offset_ratio, 0.0, 1.0)
+        turned_right = np.clip(-nose_offset_ratio, 0.0, 1.0)
+
+        # head tilted left/right: full tilt when eyes tilted by 30 degrees
+        tilt_angle = np.degrees(np.arctan2(eye_vector[:, 1], eye_vector[:, 0]))
+        tilted_left = np.clip(tilt_angle / 30.0, 0.0, 1.0)
+        tilted_right = np.clip(-tilt_angle / 30.0, 0.0, 1.0)
+
+        # head tilted up: relative nose position between eyes and mouth, normalized by 45 degrees
+        eye_y, mouth_y = eye_midpoint[:, 1], mouth_midpoint[:, 1]
+        eye_mouth_distance = np.abs(mouth_y - eye_y)
+        valid = eye_mouth_distance > 1e-6
+        nose_relative_pos = (nose[:, 1] - eye_y) / np.where(
+            valid, eye_mouth_distance, 1.0
+        )
+        tilt_ratio = np.clip(0.5 - nose_relative_pos, -0.5, 0.5)
+        tilted_up = np.where(
+            valid, np.clip(np.arcsin(2.0 * tilt_ratio) * 4.0 / np.pi, 0.0, 1.0), 0.0
+        )
+
+        scores = np.stack(
+            [turned_left, turned_right, tilted_left, tilted_right, tilted_up], axis=1
+        ).tolist()
+        keys = (
+            self.key_head_turned_left,
+            self.key_head_turned_right,
+            self.key_head_tilted_left,
+            self.key_head_tilted_right,
+            self.key_head_tilted_up,
+        )
+        for face, face_scores in zip(faces, scores):
+            pose_scores = dict(zip(keys, face_scores))
+            existing_props = face.get(FaceRecognitionResult.key_face_properties)
+            if existing_props is None:
+                face[FaceRecognitionResult.key_face_properties] = {
+                    self.key_facial_features: pose_scores
+                }
+            elif self.key_facial_features in existing_props:
+                existing_props[self.key_facial_features].update(pose_scores)
+            else:
+                existing_props[self.key_facial_features] = pose_scores
+
+
+class VectorizedLivenessDetector(LivenessDetector):
+    """
+    `LivenessDetector` which keeps facial feature trails in a struct-of-arrays table of ring buffers
+    (one row of ring buffers per track slot) and counts threshold crossings of all faces at once.
+    """
+
+    def __init__(
+        self,
+        *,
+        trail_length: int = 100,
+        sensitivity: float = 0.3,
+        confidence_threshold: float = 0.5,
+        feature_list: Optional[dict] = None,
+        report_trails: bool = True,
+        initial_slots: int = 16,
+    ):
+        """
+        Constructor.
+
+        Args:
+            trail_length (int): Maximum length of facial feature trails in frames. Defaults to 100.
+            sensitivity (float): Sensitivity parameter for liveness detection. Defaults to 0.3.
+            confidence_threshold (float): Confidence threshold for liveness detection. Defaults to 0.5.
+            feature_list (Optional[dict]): Optional dict mapping feature names to holdoff values;
+                see `LivenessDetector`.
+            report_trails (bool): Whether to add "liveness_trails" key with trail lists to face results;
+                disable it when trails are not used to avoid building trail lists on every frame.
+            initial_slots (int): Initial number of track slots; the table grows when more tracks are active.
+        """
+        super().__init__(
+            trail_length=trail_length,
+            sensitivity=sensitivity,
+            confidence_threshold=confidence_threshold,
+            feature_list=feature_list,
+        )
+        assert 0.0 < sensitivity <= 1.0, "sensitivity must be > 0 and <= 1.0"
+        self._report_trails = report_trails
+        self._features: List[str] = list(self._feature_whitelist)
+        self._feature_index = {name: i for i, name in enumerate(self._features)}
+        self._holdoffs = np.array(
+            [self._feature_whitelist[name] for name in self._features], dtype=np.int64
+        )
+        # same rounded ln(2) as `LivenessDetector._calculate_liveness_score()`, so scores match the original ones
+        self._alpha = -0.693147181 / math.log(1 + 1 / sensitivity)
+
+        # track slot table: ring buffers of feature scores, next write positions, and numbers of samples
+        num_features = len(self._features)
+        self._scores = np.zeros(
+            (initial_slots, num_features, trail_length), dtype=np.float64
+        )
+        self._heads = np.zeros((initial_slots, num_features), dtype=np.int64)
+        self._counts = np.zeros((initial_slots, num_features), dtype=np.int64)
+        self._slots: Dict[int, int] = {}  # track ID -> slot
+        self._free_slots: List[int] = list(range(initial_slots - 1, -1, -1))
+
+        # per-frame work buffers, reused across frames (see `_workspace()`)
+        self._positions = np.arange(trail_length)
+        self._feature_range = np.arange(num_features)
+        self._work: Dict[str, np.ndarray] = {}
+        self._work_faces = 0
+
+    def analyze(self, result):
+        """Analyze inference result and track facial feature changes over time.
+
+        Adds the following keys to each face detection result with active track ID:
+            "liveness_score": the computed liveness score based on feature changes
+            "liveness_trails": the history of facial feature scores for this face (when enabled)
+        """
+
+        # gather new samples of all faces
+        faces: list = []
+        face_slots: List[int] = []
+        sample_slots: List[int] = []
+        sample_features: List[int] = []
+        sample_values: List[float] = []
+        for face in result.results:
+            track_id = face.get("track_id")
+            if track_id is None:
+                continue
+            face_properties = face.get(FaceRecognitionResult.key_face_properties)
+            if face_properties is None:
+                continue
+            facial_features = face_properties.get(HeadPoseAnalyzer.key_facial_features)
+            if facial_features is None:
+                continue
+
+            slot = self._slots.get(track_id)
+            if slot is None:
+                slot = self._slots[track_id] = self._allocate_slot()
+            faces.append(face)
+            face_slots.append(slot)
+            for feature_name, score in facial_features.items():
+                feature = self._feature_index.get(feature_name)
+                if feature is not None:
+                    sample_slots.append(slot)
+                    sample_features.append(feature)
+                    sample_values.append(score)
+
+        if faces:
+            # append samples to ring buffers
+            if sample_slots:
+                s = np.array(sample_slots)
+                f = np.array(sample_features)
+                self._scores[s, f, self._heads[s, f]] = sample_values
+                self._heads[s, f] = (self._heads[s, f] + 1) % self._trail_length
+                self._counts[s, f] = np.minimum(
+                    self._counts[s, f] + 1, self._trail_length
+                )
+
+            slots = np.array(face_slots)
+            work = self._workspace(len(slots))
+            trails, counts = self._ordered_trails(slots, work)
+            crossings = self._count_crossings(trails, counts, work)
+            liveness_scores = 1.0 - np.exp(
+                self._alpha * np.log1p(crossings).sum(axis=1)
+            )
+
+            for i, face in enumerate(faces):
+                liveness_score = float(liveness_scores[i])
+                if self._report_trails:
+                    face[self.key_liveness_trails] = {
+                        name: trails[i, j, : counts[i, j]].tolist()
+                        for j, name in enumerate(self._features)
+                        if counts[i, j] > 0
+                    }
+                face[self.key_liveness_score] = liveness_score
+                face[FaceRecognitionResult.key_face_properties][
+                    HeadPoseAnalyzer.key_facial_features
+                ][self.key_liveness_score] = liveness_score
+
+        # reclaim slots of expired tracks
+        expired = [tid for tid in self._slots if tid not in result.trails]
+        for tid in expired:
+            slot = self._slots.pop(tid)
+            self._heads[slot] = 0
+            self._counts[slot] = 0
+            self._free_slots.append(slot)
+
+    def _allocate_slot(self) -> int:
+        """
+        Get free track slot, growing the table when all slots are taken.
+        """
+        if not self._free_slots:
+            size = len(self._scores)
+            self._scores = np.concatenate([self._scores, np.zeros_like(self._scores)])
+            self._heads = np.concatenate([self._heads, np.zeros_like(self._heads)])
+            self._counts = np.concatenate([self._counts, np.zeros_like(self._counts)])
+            self._free_slots = list(range(2 * size - 1, size - 1, -1))
+        return self._free_slots.pop()
+
+    def _workspace(self, num_faces: int) -> Dict[str, np.ndarray]:
+        """
+        Get preallocated per-frame work buffers for `num_faces` faces (faces x features x trail length),
+        growing them when the frame has more faces than any previous one.
+
+        Returns:
+            Dict[str, np.ndarray]: Buffers by name, sliced to `num_faces` faces.
+        """
+        if num_faces > self._work_faces:
+            self._work_faces = max(num_faces, 2 * self._work_faces)
+            shape = (self._work_faces, len(self._features), self._trail_length)
+            self._work = {
+                "index": np.empty(shape, dtype=np.intp),
+                "last": np.empty(shape, dtype=np.intp),
+                "trails": np.empty(shape, dtype=np.float64),
+                "states": np.empty(shape, dtype=np.int8),
+                "filled": np.empty(shape, dtype=np.int8),
+                "mask": np.empty(shape, dtype=bool),
+                "changes": np.empty(shape[:-1] + (shape[-1] - 1,), dtype=bool),
+                # flat index of the first sample of each trail in trail-shaped buffers
+                "rows": (np.arange(shape[0] * shape[1]) * shape[2]).reshape(
+                    shape[0], shape[1], 1
+                ),
+            }
+        return {name: buf[:num_faces] for name, buf in self._work.items()}
+
+    def _ordered_trails(self, slots: np.ndarray, work: Dict[str, np.ndarray]):
+        """
+        Get trails of given slots in chronological order.
+
+        Returns:
+            tuple: trails array (slots x features x trail length), with valid samples first,
+                and numbers of valid samples (slots x features). Trails array is a work buffer
+                valid until the next frame.
+        """
+        counts = self._counts[slots]
+        index = work["index"]
+        # flat index of each sample in the slot table: ring buffer row start + chronological position
+        np.add(
+            ((self._heads[slots] - counts) % self._trail_length)[..., None],
+            self._positions,
+            out=index,
+        )
+        np.remainder(index, self._trail_length, out=index)
+        rows = slots[:, None] * len(self._features) + self._feature_range
+        np.add(index, (rows * self._trail_length)[..., None], out=index)
+        trails = work["trails"]
+        # indices are always valid: "clip" mode writes to `out` directly, without intermediate buffer
+        np.take(self._scores.reshape(-1), index, out=trails, mode="clip")
+        return trails, counts
+
+    def _count_crossings(
+        self, trails: np.ndarray, counts: np.ndarray, work: Dict[str, np.ndarray]
+    ) -> np.ndarray:
+        """
+        Count threshold crossings with hysteresis and holdoff for all trails;
+        see `LivenessDetector._count_threshold_crossings()`.
+
+        Returns:
+            np.ndarray: Number of crossings (slots x features).
+        """
+        positions = self._positions
+        states, mask, last = work["states"], work["mask"], work["last"]
+
+        # sample states: 1 above the band, 0 below the band, -1 inside the band or missing;
+        # state inside the band is the last state outside it
+        states.fill(-1)
+        np.less_equal(trails, self._threshold - self._hysteresis, out=mask)
+        np.copyto(states, 0, where=mask)
+        np.greater_equal(trails, self._threshold + self._hysteresis, out=mask)
+        np.copyto(states, 1, where=mask)
+        np.greater_equal(positions, counts[..., None], out=mask)
+        np.copyto(states, -1, where=mask)
+
+        last.fill(-1)
+        np.greater_equal(states, 0, out=mask)
+        np.copyto(last, positions, where=mask)
+        np.maximum.accumulate(last, axis=-1, out=last)
+
+        # fill samples with the state at their last known position
+        index = work["index"]
+        np.maximum(last, 0, out=index)
+        np.add(index, work["rows"], out=index)
+        filled = work["filled"]
+        np.take(states.reshape(-1), index, out=filled, mode="clip")
+        np.less(last, 0, out=mask)
+        np.copyto(filled, -1, where=mask)
+
+        # crossing is a change between known states
+        changes = work["changes"]
+        np.not_equal(filled[..., 1:], filled[..., :-1], out=changes)
+        known = mask[..., :-1]
+        np.greater_equal(filled[..., :-1], 0, out=known)
+        np.logical_and(changes, known, out=changes)
+        crossings = changes.sum(axis=-1)
+
+        # holdoff: crossing is counted only when at least `holdoff` samples passed since the last counted one
+        for i, j in zip(*np.nonzero((crossings > 1) & (self._holdoffs > 1))):
+            holdoff = self._holdoffs[j]
+            count, last_t = 0, None
+            for t in np.flatnonzero(changes[i, j]):
+                if last_t is None or t - last_t >= holdoff:
+                    count += 1
+                    last_t = t
+            crossings[i, j] = count
+        return crossings
+
+
+def use_vectorized_analyzers(
+    face_tracker: degirum_face.FaceTracker, *, liveness: Optional[dict] = None
+):
+    """
+    Make face tracker pipelines use vectorized analyzers: `HeadPoseAnalyzer` is replaced by
+    `VectorizedHeadPoseAnalyzer`, and optionally `VectorizedLivenessDetector` is added after it
+    (see `add_analyzer_transform()`). Call it before starting any pipeline of the face tracker.
+
+    Args:
+        face_tracker (FaceTracker): Face tracker to modify.
+        liveness (Optional[dict]): `VectorizedLivenessDetector` constructor arguments;
+            when None, liveness detector is not added.
+    """
+
+    def vectorize(analyzers: list, config, face_map) -> list:
+        ret = []
+        for analyzer in analyzers:
+            if type(analyzer) is HeadPoseAnalyzer:
+                ret.append(VectorizedHeadPoseAnalyzer())
+                if liveness is not None:
+                    ret.append(VectorizedLivenessDetector(**liveness))
+            else:
+                ret.append(analyzer)
+        return ret
+
+    add_analyzer_transform(face_tracker, vectorize)
@@ -0,0 +1,430 @@
+#
+# mock_models.py: Deterministic Mock Inference Backend for Benchmarks
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Implements local stand-ins for face detection and face embedding models, which allow running
+# DeGirum Face pipelines offline without AI hardware or cloud connection.
+# The face detector replays canned face boxes and keypoints of a synthetic scene, the face embedder
+# computes embeddings by fixed random projection of face crops, so results are reproducible run to run.
+# Mock models are plugged into pipelines via `MockModelSpec` objects used in place of `degirum_tools.ModelSpec`.
+#
+
+import abc, time
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import degirum as dg
+from degirum_tools.streams import VideoSourceGizmo, tag_video
+
+
+@dataclass
+class SyntheticFace:
+    """
+    Face moving along a straight line in the synthetic scene.
+    """
+
+    # face color (BGR): it makes face crops (and embeddings) of different faces distinct
+    color: Tuple[int, int, int]
+    size: int  # face box size in pixels
+    start: Tuple[float, float]  # face box top-left corner position at frame 0
+    velocity: Tuple[float, float]  # face box displacement per frame
+
+
+class SyntheticScene:
+    """
+    Periodic synthetic scene with moving faces.
+    Frame content and face positions depend only on frame index, so the face detector can replay them.
+    """
+
+    def __init__(
+        self,
+        *,
+        width: int = 640,
+        height: int = 480,
+        num_faces: int = 3,
+        face_size: int = 96,
+        period: int = 150,
+        seed: int = 0,
+    ):
+        """
+        Constructor.
+
+        Args:
+            width (int): Frame width in pixels.
+            height (int): Frame height in pixels.
+            num_faces (int): Number of faces in the scene.
+            face_size (int): Face box size in pixels.
+            period (int): Scene period in frames: after that many frames the scene repeats.
+            seed (int): Random seed for face colors and trajectories.
+        """
+        self.width = width
+        self.height = height
+        self.period = period
+
+        rng = np.random.default_rng(seed)
+        self.faces: List[SyntheticFace] = []
+        for _ in range(num_faces):
+            start = (
+                float(rng.uniform(0, width - face_size)),
+                float(rng.uniform(0, height - face_size)),
+            )
+            # faces move to a random point and back within one period
+            end = (
+                float(rng.uniform(0, width - face_size)),
+                float(rng.uniform(0, height - face_size)),
+            )
+            half_period = max(period // 2, 1)
+            self.faces.append(
+                SyntheticFace(
+                    color=tuple(int(c) for c in rng.integers(64, 256, 3)),  # type: ignore[arg-type]
+                    size=face_size,
+                    start=start,
+                    velocity=(
+                        (end[0] - start[0]) / half_period,
+                        (end[1] - start[1]) / half_period,
+                    ),
+                )
+            )
+
+    def face_boxes(self, frame_index: int) -> List[List[float]]:
+        """
+        Get face boxes for the given frame.
+
+        Args:
+            frame_index (int): Frame index.
+
+        Returns:
+            List[List[float]]: List of face boxes in [x1, y1, x2, y2] format.
+        """
+        t = frame_index % self.period
+        half_period = max(self.period // 2, 1)
+        steps = t if t < half_period else self.period - t  # there and back again
+        ret = []
+        for face in self.faces:
+            x = float(round(face.start[0] + face.velocity[0] * steps))
+            y = float(round(face.start[1] + face.velocity[1] * steps))
+            ret.append([x, y, x + face.size, y + face.size])
+        return ret
+
+    @staticmethod
+    def face_keypoints(box: List[float]) -> List[List[float]]:
+        """
+        Get frontal face keypoints for the face box.
+
+        Args:
+            box (List[float]): Face box in [x1, y1, x2, y2] format.
+
+        Returns:
+            List[List[float]]: Five keypoints: left eye, right eye, nose, left mouth corner, right mouth corner.
+        """
+        x1, y1, x2, y2 = box
+        w, h = x2 - x1, y2 - y1
+        rel = [(0.3, 0.4), (0.7, 0.4), (0.5, 0.6), (0.35, 0.8), (0.65, 0.8)]
+        return [[x1 + rx * w, y1 + ry * h] for rx, ry in rel]
+
+    def frame(self, frame_index: int) -> np.ndarray:
+        """
+        Render the frame.
+
+        Args:
+            frame_index (int): Frame index.
+
+        Returns:
+            np.ndarray: BGR image.
+        """
+        img = np.full((self.height, self.width, 3), 32, dtype=np.uint8)
+        for face, box in zip(self.faces, self.face_boxes(frame_index)):
+            x1, y1, x2, y2 = (int(v) for v in box)
+            cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+            cv2.ellipse(
+                img,
+                (cx, cy),
+                ((x2 - x1) // 2, (y2 - y1) // 2),
+                0,
+                0,
+                360,
+                face.color,
+                -1,
+            )
+            for kx, ky in self.face_keypoints(box):
+                cv2.circle(
+                    img, (int(kx), int(ky)), max(face.size // 16, 1), (0, 0, 0), -1
+                )
+        return img
+
+    def frames(self, count: int) -> Iterator[np.ndarray]:
+        """
+        Generate frames.
+
+        Args:
+            count (int): Number of frames to generate.
+
+        Returns:
+            Iterator[np.ndarray]: Iterator over BGR images.
+        """
+        for i in range(count):
+            yield self.frame(i)
+
+    def write_video(self, path: str, count: int, fps: float = 30.0):
+        """
+        Write frames to the video file.
+
+        Args:
+            path (str): Video file path.
+            count (int): Number of frames to write.
+            fps (float): Video frame rate.
+        """
+        writer = cv2.VideoWriter(
+            path,
+            cv2.VideoWriter_fourcc(*"mp4v"),  # type: ignore[attr-defined]
+            fps,
+            (self.width, self.height),
+        )
+        try:
+            for img in self.frames(count):
+                writer.write(img)
+        finally:
+            writer.release()
+
+
+class MockModel(abc.ABC):
+    """
+    Base class for mock models: mimics the subset of `degirum.model.Model` interface used by DeGirum Face.
+    """
+
+    def __init__(self, name: str, *, latency_s: float = 0.0):
+        """
+        Constructor.
+
+        Args:
+            name (str): Model name.
+            latency_s (float): Simulated inference latency per input in seconds.
+        """
+        self.name = name
+        self.latency_s = latency_s
+        self.input_shape = [[1, 112, 112, 3]]
+        self.non_blocking_batch_predict = False
+        self.overlay_line_width = 3
+        self.overlay_show_labels = True
+        self.overlay_show_probabilities = False
+        self.inference_count = 0
+
+    def predict_batch(
+        self, data: Iterable
+    ) -> Iterator[Optional[dg.postprocessor.InferenceResults]]:
+        """
+        Run inference on the sequence of inputs.
+
+        Args:
+            data (Iterable): Iterator over inputs: images, (image, frame info) tuples, or None
+                (in non-blocking mode when there is no input available).
+
+        Returns:
+            Iterator[Optional[InferenceResults]]: Inference results; None for None inputs.
+        """
+        for item in data:
+            if item is None:
+                yield None
+                continue
+            image, frame_info = item if isinstance(item, tuple) else (item, None)
+            if self.latency_s > 0:
+                time.sleep(self.latency_s)
+            self.inference_count += 1
+            yield self._infer(image, frame_info)
+
+    def predict(self, image: Any) -> dg.postprocessor.InferenceResults:
+        """
+        Run inference on the single input.
+        """
+        return next(iter(self.predict_batch(iter([image]))))  # type: ignore[return-value]
+
+    @abc.abstractmethod
+    def _infer(
+        self, image: np.ndarray, frame_info: Any
+    ) -> dg.postprocessor.InferenceResults:
+        """
+        Run inference on the single input.
+
+        Args:
+            image (np.ndarray): Input image.
+            frame_info (Any): Frame info passed along with the image (stream metadata in pipelines), or None.
+
+        Returns:
+            InferenceResults: Inference results.
+        """
+
+    def _make_result(
+        self, postprocess_type: str, image: np.ndarray, frame_info: Any, results: list
+    ) -> dg.postprocessor.InferenceResults:
+        """
+        Wrap raw results into PySDK inference results object.
+        """
+        return dg.postprocessor.create_postprocessor(
+            postprocess_type,
+            inference_results=results,
+            conversion=lambda x, y: (x, y),
+            input_image=image,
+            frame_info=frame_info,
+            input_shape=[[1, *image.shape]],
+            line_width=self.overlay_line_width,
+            show_labels=self.overlay_show_labels,
+            show_probabilities=self.overlay_show_probabilities,
+        )
+
+
+class MockFaceDetector(MockModel):
+    """
+    Mock face detection model: replays face boxes and keypoints of the synthetic scene.
+    Scene frame index is taken from video source metadata of the frame, so dropped or skipped frames
+    do not shift detections. Frames without such metadata are assumed to come in scene order,
+    starting from frame 0 after each `load_model()`.
+    """
+
+    def __init__(self, scene: SyntheticScene, *, latency_s: float = 0.0):
+        """
+        Constructor.
+
+        Args:
+            scene (SyntheticScene): Scene to replay detections of.
+            latency_s (float): Simulated inference latency per frame in seconds.
+        """
+        super().__init__("mock_face_detector", latency_s=latency_s)
+        self._scene = scene
+        self.input_shape = [[1, scene.height, scene.width, 3]]
+
+    def _infer(self, image: np.ndarray, frame_info: Any):
+        results = []
+        for box in self._scene.face_boxes(self._frame_index(frame_info)):
+            results.append(
+                {
+                    "bbox": box,
+                    "score": 0.9,
+                    "category_id": 0,
+                    "label": "face",
+                    "landmarks": [
+                        {
+                            "landmark": kp,
+                            "score": 0.9,
+                            "category_id": i,
+                            "label": str(i),
+                        }
+                        for i, kp in enumerate(self._scene.face_keypoints(box))
+                    ],
+                }
+            )
+        return self._make_result("Detection", image, frame_info, results)
+
+    def _frame_index(self, frame_info: Any) -> int:
+        """
+        Get scene frame index of the input frame.
+        """
+        if hasattr(frame_info, "find_last"):
+            video_meta = frame_info.find_last(tag_video)
+            if video_meta and VideoSourceGizmo.key_frame_id in video_meta:
+                return video_meta[VideoSourceGizmo.key_frame_id]
+        return self.inference_count - 1
+
+
+class MockFaceEmbedder(MockModel):
+    """
+    Mock face embedding model: embedding is a fixed random projection of the downsampled face crop.
+    """
+
+    def __init__(self, *, dim: int = 512, latency_s: float = 0.0, seed: int = 0):
+        """
+        Constructor.
+
+        Args:
+            dim (int): Embedding vector size.
+            latency_s (float): Simulated inference latency per face crop in seconds.
+            seed (int): Random seed for projection matrix.
+        """
+        super().__init__("mock_face_embedder", latency_s=latency_s)
+        self._thumb_size = 16
+        self._projection = (
+            np.random.default_rng(seed)
+            .standard_normal((self._thumb_size * self._thumb_size * 3, dim))
+            .astype(np.float32)
+        )
+
+    def _infer(self, image: np.ndarray, frame_info: Any):
+        thumb = cv2.resize(
+            image, (self._thumb_size, self._thumb_size), interpolation=cv2.INTER_AREA
+        )
+        vec = (thumb.astype(np.float32).ravel() / 255.0 - 0.5) @ self._projection
+        return self._make_result("None", image, frame_info, [{"data": vec}])
+
+
+class MockModelSpec:
+    """
+    Model specification which loads mock model; use it in place of `degirum_tools.ModelSpec` in face configs.
+    Every `load_model()` call returns fresh model instance created by the factory.
+    """
+
+    zoo_url = "mock://local"
+
+    def __init__(self, model_name: str, factory, *, load_latency_s: float = 0.0):
+        """
+        Constructor.
+
+        Args:
+            model_name (str): Model name (it is stored in ReID database as embedding model name).
+            factory (Callable[[], MockModel]): Function creating model instance.
+            load_latency_s (float): Simulated model loading latency in seconds.
+        """
+        self.model_name = model_name
+        self._factory = factory
+        self.load_latency_s = load_latency_s
+        self.models: List[MockModel] = []  # all loaded model instances
+
+    def zoo_connect(self):
+        return None
+
+    def load_model(self, zoo=None) -> MockModel:
+        if self.load_latency_s > 0:
+            time.sleep(self.load_latency_s)
+        model = self._factory()
+        self.models.append(model)
+        return model
+
+    def __repr__(self):
+        return f"MockModelSpec(name={self.model_name!r})"
+
+
+def mock_model_specs(
+    scene: SyntheticScene,
+    *,
+    detector_latency_s: float = 0.0,
+    embedder_latency_s: float = 0.0,
+    embedding_dim: int = 512,
+    load_latency_s: float = 0.0,
+) -> Tuple[MockModelSpec, MockModelSpec]:
+    """
+    Create model specifications of mock face detection and face embedding models.
+
+    Args:
+        scene (SyntheticScene): Scene to replay detections of.
+        detector_latency_s (float): Simulated face detector latency per frame in seconds.
+        embedder_latency_s (float): Simulated face embedder latency per face crop in seconds.
+        embedding_dim (int): Embedding vector size.
+        load_latency_s (float): Simulated loading latency of each model in seconds.
+
+    Returns:
+        Tuple[MockModelSpec, MockModelSpec]: Face detection and face embedding model specifications.
+    """
+    return (
+        MockModelSpec(
+            "mock_face_detector",
+            lambda: MockFaceDetector(scene, latency_s=detector_latency_s),
+            load_latency_s=load_latency_s,
+        ),
+        MockModelSpec(
+            "mock_face_embedder",
+            lambda: MockFaceEmbedder(dim=embedding_dim, latency_s=embedder_latency_s),
+            load_latency_s=load_latency_s,
+        ),
+    )
@@ -0,0 +1,394 @@
+#
+# run_benchmarks.py: DeGirum Face Offline Benchmark Suite
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Implements reproducible offline benchmarks of DeGirum Face pipelines. Detection and embedding
+# models are replaced by deterministic mock models (see `mock_models.py`) running on synthetic frames,
+# so benchmarks measure the pipeline overhead (plus optional simulated model latency) and need neither
+# AI hardware nor cloud connection.
+#
+# Measured benchmarks:
+# - `FaceRecognizer.predict_batch()`: end-to-end FPS
+# - `FaceRecognizer.enroll_batch()`: enrollment rate
+# - `FaceTracker.predict_batch()`: end-to-end FPS
+# - face tracking pipeline: per-stage latency
+# - `FaceTracker.find_faces_in_file()`: end-to-end FPS
+# - `ReID_Database.get_attributes_by_embedding()`: search latency for several gallery sizes
+#
+# Results are printed and optionally saved as JSON, so they can be compared between releases.
+#
+# Usage: `python run_benchmarks.py [--output results.json] [--frames 300] ...`
+#
+# Pre-requisites:
+# - Install DeGirum Face SDK: `pip install degirum-face`
+#
+
+import argparse, json, os, platform, sys, tempfile, time
+from typing import Dict, List, Optional
+
+import numpy as np
+import degirum_face
+from degirum_tools.streams import SinkGizmo, get_timing_info
+
+from mock_models import SyntheticScene, mock_model_specs
+
+
+def latency_stats(samples: List[float]) -> Dict[str, float]:
+    """
+    Compute latency statistics.
+
+    Args:
+        samples (List[float]): Latency samples in seconds.
+
+    Returns:
+        Dict[str, float]: Sample count and mean/p50/p95/max latency in milliseconds.
+    """
+    if not samples:
+        return {"count": 0}
+    ms = np.array(samples) * 1000.0
+    return {
+        "count": len(samples),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def throughput_stats(timestamps: List[float], start: float, faces: int) -> dict:
+    """
+    Compute throughput statistics.
+
+    Args:
+        timestamps (List[float]): Result arrival times.
+        start (float): Benchmark start time.
+        faces (int): Total number of faces in all results.
+
+    Returns:
+        dict: Frame count, wall time, end-to-end FPS (including pipeline startup),
+            steady-state FPS (between first and last result), and faces per second.
+    """
+    frames = len(timestamps)
+    wall_time = (timestamps[-1] if timestamps else time.perf_counter()) - start
+    steady_time = timestamps[-1] - timestamps[0] if frames > 1 else 0.0
+    return {
+        "frames": frames,
+        "wall_time_s": round(wall_time, 3),
+        "fps": round(frames / wall_time, 2) if wall_time > 0 else 0.0,
+        "steady_fps": round((frames - 1) / steady_time, 2) if steady_time > 0 else 0.0,
+        "faces_per_s": round(faces / wall_time, 2) if wall_time > 0 else 0.0,
+    }
+
+
+class Benchmarks:
+    """
+    Benchmark suite runner.
+    """
+
+    def __init__(self, args: argparse.Namespace, work_dir: str):
+        """
+        Constructor.
+
+        Args:
+            args (argparse.Namespace): Command line arguments.
+            work_dir (str): Directory for temporary files (databases, video files).
+        """
+        self.args = args
+        self.work_dir = work_dir
+        self.scene = SyntheticScene(
+            width=args.width,
+            height=args.height,
+            num_faces=args.faces,
+            seed=args.seed,
+        )
+        self.detector_spec, self.embedder_spec = mock_model_specs(
+            self.scene,
+            detector_latency_s=args.detector_latency_ms / 1000.0,
+            embedder_latency_s=args.embedder_latency_ms / 1000.0,
+            embedding_dim=args.embedding_dim,
+        )
+        # database shared by recognition benchmarks; it is populated by enrollment benchmark
+        self.db_path = os.path.join(work_dir, "face_db")
+
+    def recognizer_config(self) -> degirum_face.FaceRecognizerConfig:
+        """
+        Face recognizer configuration with mock models.
+        """
+        return degirum_face.FaceRecognizerConfig(
+            face_detection_model_spec=self.detector_spec,  # type: ignore[arg-type]
+            face_embedding_model_spec=self.embedder_spec,  # type: ignore[arg-type]
+            db_path=self.db_path,
+        )
+
+    def tracker_config(self) -> degirum_face.FaceTrackerConfig:
+        """
+        Face tracker configuration with mock models, no live stream and no alerts.
+        """
+        config = degirum_face.FaceTrackerConfig(
+            face_detection_model_spec=self.detector_spec,  # type: ignore[arg-type]
+            face_embedding_model_spec=self.embedder_spec,  # type: ignore[arg-type]
+            db_path=self.db_path,
+            live_stream_mode="NONE",
+            alert_mode=degirum_face.AlertMode.NONE,
+        )
+        config.face_filters.enable_reid_expiration_filter = True
+        config.face_filters.reid_expiration_frames = self.args.reid_expiration_frames
+        return config
+
+    def bench_enroll(self) -> dict:
+        """
+        Benchmark `FaceRecognizer.enroll_batch()`: every frame is enrolled as a separate person.
+        """
+        count = self.args.enroll_frames
+        face_recognizer = degirum_face.FaceRecognizer(self.recognizer_config())
+        start = time.perf_counter()
+        results = face_recognizer.enroll_batch(
+            self.scene.frames(count), (f"person_{i}" for i in range(count))
+        )
+        elapsed = time.perf_counter() - start
+        return {
+            "frames": count,
+            "enrolled": len(results),
+            "wall_time_s": round(elapsed, 3),
+            "enrollments_per_s": round(len(results) / elapsed, 2),
+        }
+
+    def bench_recognizer_predict_batch(self) -> dict:
+        """
+        Benchmark `FaceRecognizer.predict_batch()`.
+        """
+        face_recognizer = degirum_face.FaceRecognizer(self.recognizer_config())
+        timestamps: List[float] = []
+        faces = 0
+        start = time.perf_counter()
+        for result in face_recognizer.predict_batch(
+            self.scene.frames(self.args.frames)
+        ):
+            timestamps.append(time.perf_counter())
+            faces += len(result.results)
+        return throughput_stats(timestamps, start, faces)
+
+    def bench_tracker_predict_batch(self) -> dict:
+        """
+        Benchmark `FaceTracker.predict_batch()`.
+        """
+        face_tracker = degirum_face.FaceTracker(self.tracker_config())
+        timestamps: List[float] = []
+        faces = 0
+        start = time.perf_counter()
+        for result in face_tracker.predict_batch(self.scene.frames(self.args.frames)):
+            timestamps.append(time.perf_counter())
+            faces += len(result.results)
+        return throughput_stats(timestamps, start, faces)
+
+    def bench_tracker_stages(self) -> dict:
+        """
+        Benchmark per-stage latency of the face tracking pipeline.
+        Stage latency is the time between consecutive gizmo timestamps of each frame.
+        """
+        face_tracker = degirum_face.FaceTracker(self.tracker_config())
+        sink = SinkGizmo()
+        composition, _ = face_tracker.start_face_tracking_pipeline(
+            frame_iterator=self.scene.frames(self.args.frames),
+            sink=sink,
+            sink_connection_point="recognizer",
+        )
+        stages: Dict[str, List[float]] = {}
+        end_to_end: List[float] = []
+        for data in sink():
+            timing = get_timing_info(data)
+            for (_, t_prev), (gizmo, t) in zip(timing, timing[1:]):
+                stages.setdefault(gizmo, []).append(t - t_prev)
+            if len(timing) > 1:
+                end_to_end.append(timing[-1][1] - timing[0][1])
+        composition.stop()
+        return {
+            "stages": {k: latency_stats(v) for k, v in stages.items()},
+            "end_to_end": latency_stats(end_to_end),
+        }
+
+    def bench_find_faces_in_file(self) -> dict:
+        """
+        Benchmark `FaceTracker.find_faces_in_file()` on synthetic video file.
+        """
+        video_path = os.path.join(self.work_dir, "synthetic.mp4")
+        self.scene.write_video(video_path, self.args.frames)
+        annotated_path = os.path.join(self.work_dir, "synthetic_annotated.mp4")
+
+        face_tracker = degirum_face.FaceTracker(self.tracker_config())
+        start = time.perf_counter()
+        face_map = face_tracker.find_faces_in_file(
+            video_path,
+            save_annotated=self.args.save_annotated,
+            output_video_path=annotated_path,
+        )
+        elapsed = time.perf_counter() - start
+        return {
+            "frames": self.args.frames,
+            "wall_time_s": round(elapsed, 3),
+            "fps": round(self.args.frames / elapsed, 2),
+            "tracks": len(face_map),
+        }
+
+    def bench_db_search(self) -> dict:
+        """
+        Benchmark database search latency for several gallery sizes.
+        Half of the queries are perturbed gallery embeddings (hits), another half are random vectors (misses).
+        """
+        rng = np.random.default_rng(self.args.seed)
+        dim = self.args.embedding_dim
+        embeddings_per_person = 10
+        ret = {}
+        for gallery_size in self.args.gallery_sizes:
+            db = degirum_face.ReID_Database(
+                os.path.join(self.work_dir, f"gallery_{gallery_size}"),
+                self.embedder_spec.model_name,
+            )
+
+            gallery = rng.standard_normal((gallery_size, dim)).astype(np.float32)
+            gallery /= np.linalg.norm(gallery, axis=1, keepdims=True)
+            start = time.perf_counter()
+            for person, first in enumerate(
+                range(0, gallery_size, embeddings_per_person)
+            ):
+                db.add_embeddings_for_attributes(
+                    f"person_{person}",
+                    list(gallery[first : first + embeddings_per_person]),
+                    dedup=False,
+                )
+            populate_time = time.perf_counter() - start
+
+            num_queries = self.args.queries
+            hits = gallery[rng.integers(0, gallery_size, num_queries // 2)]
+            hits = hits + 0.01 * rng.standard_normal(hits.shape).astype(np.float32)
+            misses = rng.standard_normal((num_queries - len(hits), dim)).astype(
+                np.float32
+            )
+            queries = np.concatenate([hits, misses])
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+            latencies = []
+            found = 0
+            for q in queries:
+                t0 = time.perf_counter()
+                db_id, _, _ = db.get_attributes_by_embedding(q, 0.6)
+                latencies.append(time.perf_counter() - t0)
+                found += db_id is not None
+
+            ret[str(gallery_size)] = {
+                "populate_time_s": round(populate_time, 3),
+                "found": found,
+                "search": latency_stats(latencies),
+            }
+        return ret
+
+    def run(self, selected: Optional[List[str]] = None) -> dict:
+        """
+        Run benchmarks.
+
+        Args:
+            selected (Optional[List[str]]): Names of benchmarks to run; all benchmarks are run if None.
+
+        Returns:
+            dict: Benchmark results keyed by benchmark name.
+        """
+        # enrollment goes first: it populates the database used by other recognition benchmarks
+        benchmarks = {
+            "enroll": self.bench_enroll,
+            "recognizer_predict_batch": self.bench_recognizer_predict_batch,
+            "tracker_predict_batch": self.bench_tracker_predict_batch,
+            "tracker_stages": self.bench_tracker_stages,
+            "find_faces_in_file": self.bench_find_faces_in_file,
+            "db_search": self.bench_db_search,
+        }
+        ret = {}
+        for name, bench in benchmarks.items():
+            if selected and name not in selected:
+                continue
+            print(f"Running {name}...", file=sys.stderr)
+            ret[name] = bench()
+        return ret
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DeGirum Face offline benchmarks")
+    parser.add_argument("--output", help="JSON file to save results into")
+    parser.add_argument(
+        "--benchmarks",
+        nargs="+",
+        help="benchmarks to run (default: all): enroll, recognizer_predict_batch, "
+        "tracker_predict_batch, tracker_stages, find_faces_in_file, db_search",
+    )
+    parser.add_argument("--frames", type=int, default=300, help="frames per run")
+    parser.add_argument("--faces", type=int, default=3, help="faces per frame")
+    parser.add_argument("--width", type=int, default=640, help="frame width")
+    parser.add_argument("--height", type=int, default=480, help="frame height")
+    parser.add_argument(
+        "--detector-latency-ms",
+        type=float,
+        default=0.0,
+        help="simulated face detector latency per frame",
+    )
+    parser.add_argument(
+        "--embedder-latency-ms",
+        type=float,
+        default=0.0,
+        help="simulated face embedder latency per face",
+    )
+    parser.add_argument(
+        "--embedding-dim", type=int, default=512, help="embedding vector size"
+    )
+    parser.add_argument(
+        "--reid-expiration-frames",
+        type=int,
+        default=10,
+        help="face tracker reID expiration period in frames",
+    )
+    parser.add_argument(
+        "--enroll-frames", type=int, default=20, help="frames to enroll"
+    )
+    parser.add_argument(
+        "--gallery-sizes",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 10000],
+        help="database gallery sizes (number of embeddings) for search benchmark",
+    )
+    parser.add_argument(
+        "--queries", type=int, default=200, help="database search queries per gallery"
+    )
+    parser.add_argument(
+        "--save-annotated",
+        action="store_true",
+        help="save annotated video in find_faces_in_file benchmark (requires ffmpeg)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = Benchmarks(args, work_dir).run(args.benchmarks)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "degirum_face": degirum_face.__version__,
+        },
+        "settings": {k: v for k, v in vars(args).items() if k != "output"},
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#
+# run_startup_benchmark.py: DeGirum Face Startup Time Benchmark
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Measures cold start latency of the face tracking pipeline: every run is a fresh Python process
+# which imports DeGirum Face, discovers inference hardware, loads models, opens the face database,
+# and runs the pipeline on a synthetic video file until the first frame is processed.
+# Models are deterministic mock models (see `mock_models.py`) with simulated loading latency.
+#
+# Measured startup modes:
+# - `cold`: plain startup; models are loaded sequentially when the pipeline starts
+# - `warm`: startup using fast start helpers of the face tracking web app (see `fast_start.py`): hardware is taken
+#   from the configuration, and models are preloaded in parallel with the database before the video source opens
+#
+# Measured phases (milliseconds):
+# - `import`: import of DeGirum Face package
+# - `discovery`: compatible hardware discovery on the inference host (cold mode only)
+# - `preload`: model preloading and database opening (warm mode only)
+# - `first_frame`: time from pipeline start to the first processed frame
+# - `total`: time from process start to the first processed frame, including interpreter startup
+#
+# Usage: `python run_startup_benchmark.py [--output results.json] [--runs 5] ...`
+#
+# Pre-requisites:
+# - Install DeGirum Face SDK: `pip install degirum-face`
+#
+
+# only light modules are imported here: heavy imports are measured in child processes
+import argparse, json, os, platform, subprocess, sys, tempfile, time
+
+# location of fast start helpers of the face tracking web app
+APP_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "apps", "face_tracking_web_app"
+)
+
+
+def run_child(args: argparse.Namespace) -> dict:
+    """
+    Run one startup in current process and measure its phases.
+
+    Args:
+        args (argparse.Namespace): Command line arguments.
+
+    Returns:
+        dict: Phase durations in seconds and wall clock time of the first processed frame.
+    """
+    timings = {}
+    t0 = time.perf_counter()
+    import degirum_face
+    from degirum_tools.streams import SinkGizmo
+
+    sys.path.insert(0, APP_DIR)
+    import fast_start
+    from mock_models import SyntheticScene, mock_model_specs
+
+    timings["import"] = time.perf_counter() - t0
+
+    warm = args.child == "warm"
+    if not warm:
+        t0 = time.perf_counter()
+        degirum_face.get_compatible_hw(args.inference_host)
+        timings["discovery"] = time.perf_counter() - t0
+
+    scene = SyntheticScene(
+        width=args.width, height=args.height, num_faces=args.faces, seed=args.seed
+    )
+    detector_spec, embedder_spec = mock_model_specs(
+        scene,
+        embedding_dim=args.embedding_dim,
+        load_latency_s=args.model_load_ms / 1000.0,
+    )
+    config = degirum_face.FaceTrackerConfig(
+        face_detection_model_spec=detector_spec,  # type: ignore[arg-type]
+        face_embedding_model_spec=embedder_spec,  # type: ignore[arg-type]
+        db_path=os.path.join(args.work_dir, "face_db"),
+        video_source=os.path.join(args.work_dir, "synthetic.mp4"),
+        live_stream_mode="NONE",
+        alert_mode=degirum_face.AlertMode.NONE,
+    )
+
+    if warm:
+        t0 = time.perf_counter()
+        config = fast_start.warm_up(config)
+        timings["preload"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    face_tracker = degirum_face.FaceTracker(config)
+    sink = SinkGizmo()
+    composition, _ = face_tracker.start_face_tracking_pipeline(
+        sink=sink, sink_connection_point="recognizer"
+    )
+    for _ in sink():
+        break
+    timings["first_frame"] = time.perf_counter() - t0
+    first_frame_time = time.time()
+    composition.stop()
+    return {"timings": timings, "first_frame_time": first_frame_time}
+
+
+def prepare(args: argparse.Namespace):
+    """
+    Create synthetic video file and populate face database in the work directory.
+
+    Args:
+        args (argparse.Namespace): Command line arguments.
+    """
+    import numpy as np
+    import degirum_face
+    from mock_models import SyntheticScene, mock_model_specs
+
+    scene = SyntheticScene(
+        width=args.width, height=args.height, num_faces=args.faces, seed=args.seed
+    )
+    scene.write_video(os.path.join(args.work_dir, "synthetic.mp4"), args.frames)
+
+    _, embedder_spec = mock_model_specs(scene, embedding_dim=args.embedding_dim)
+    db = degirum_face.ReID_Database(
+        os.path.join(args.work_dir, "face_db"), embedder_spec.model_name
+    )
+    rng = np.random.default_rng(args.seed)
+    gallery = rng.standard_normal((args.gallery_size, args.embedding_dim))
+    gallery /= np.linalg.norm(gallery, axis=1, keepdims=True)
+    embeddings_per_person = 10
+    for person, first in enumerate(range(0, args.gallery_size, embeddings_per_person)):
+        db.add_embeddings_for_attributes(
+            f"person_{person}",
+            list(gallery[first : first + embeddings_per_person].astype(np.float32)),
+            dedup=False,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DeGirum Face startup time benchmark")
+    parser.add_argument("--output", help="JSON file to save results into")
+    parser.add_argument(
+        "--runs", type=int, default=5, help="process starts per startup mode"
+    )
+    parser.add_argument(
+        "--model-load-ms",
+        type=float,
+        default=500.0,
+        help="simulated loading latency of each model",
+    )
+    parser.add_argument(
+        "--inference-host",
+        default="@local",
+        help="inference host address for hardware discovery",
+    )
+    parser.add_argument("--frames", type=int, default=30, help="synthetic video frames")
+    parser.add_argument("--faces", type=int, default=3, help="faces per frame")
+    parser.add_argument("--width", type=int, default=640, help="frame width")
+    parser.add_argument("--height", type=int, default=480, help="frame height")
+    parser.add_argument(
+        "--embedding-dim", type=int, default=512, help="embedding vector size"
+    )
+    parser.add_argument(
+        "--gallery-size",
+        type=int,
+        default=1000,
+        help="number of embeddings in the face database",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--child", choices=["cold", "warm"], help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args)))
+        return
+
+    from run_benchmarks import latency_stats
+    import degirum_face
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        args.work_dir = work_dir
+        prepare(args)
+
+        results = {}
+        for mode in ("cold", "warm"):
+            samples: dict = {}
+            for run in range(args.runs):
+                print(f"Running {mode} start {run + 1}/{args.runs}...", file=sys.stderr)
+                start_time = time.time()
+                out = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--child", mode]
+                    + sys.argv[1:]
+                    + ["--work-dir", work_dir],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                child = json.loads(out.strip().splitlines()[-1])
+                timings = child["timings"]
+                timings["total"] = child["first_frame_time"] - start_time
+                for phase, t in timings.items():
+                    samples.setdefault(phase, []).append(t)
+            results[mode] = {
+                phase: latency_stats(values) for phase, values in samples.items()
+            }
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "degirum_face": degirum_face.__version__,
+        },
+        "settings": {
+            k: v
+            for k, v in vars(args).items()
+            if k not in ("output", "child", "work_dir")
+        },
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
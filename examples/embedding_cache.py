@@ -0,0 +1,251 @@
+#
+# embedding_cache.py: Persistent Face Embedding Cache
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Implements persistent on-disk cache of face detection and face embedding results for photo libraries.
+# Used by `find_similar_faces.py` and `group_similar_faces.py` examples: only new or changed photos
+# are processed by `FaceRecognizer`, results for other photos are taken from the cache.
+#
+# Cache layout (one subdirectory per combination of models and face filter settings):
+# - `index.json`: per-photo entries keyed by file path: file size, modification time, content hash,
+#   face boxes, and the range of embedding matrix rows
+# - `embeddings.f32`: embedding matrix (float32, one row per face), memory-mapped for queries
+#
+
+import os, json, hashlib, dataclasses, tempfile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import degirum_face
+
+
+class EmbeddingCache:
+    """
+    Persistent cache of face embeddings of image files.
+    """
+
+    format_version = 1  # increment when cache layout changes
+
+    def __init__(self, cache_dir: str, config: degirum_face.FaceRecognizerConfig):
+        """
+        Constructor.
+
+        Args:
+            cache_dir (str): Cache directory.
+            config (FaceRecognizerConfig): Face recognition configuration; model names and face filter
+                settings are included into the cache key.
+        """
+        settings = {
+            "face_detector": config.face_detection_model_spec.model_name,
+            "face_embedder": config.face_embedding_model_spec.model_name,
+            "face_filters": dataclasses.asdict(config.face_filters),
+        }
+        settings_hash = hashlib.sha1(
+            json.dumps(settings, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        self.cache_dir = os.path.join(cache_dir, settings_hash[:16])
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index_path = os.path.join(self.cache_dir, "index.json")
+        self._matrix_path = os.path.join(self.cache_dir, "embeddings.f32")
+
+        self._files: Dict[str, dict] = {}
+        self._rows = (
+            0  # number of rows in the matrix file (including rows of stale entries)
+        )
+        self._dim = 0
+        if os.path.exists(self._index_path):
+            with open(self._index_path) as f:
+                index = json.load(f)
+            if index.get("version") == self.format_version:
+                self._files = index["files"]
+                self._rows = index["rows"]
+                self._dim = index["dim"]
+        matrix_size = (
+            os.path.getsize(self._matrix_path)
+            if os.path.exists(self._matrix_path)
+            else 0
+        )
+        if self._rows * self._dim * 4 > matrix_size:
+            # matrix file is shorter than index says: cache is inconsistent, start over
+            self._files, self._rows, self._dim = {}, 0, 0
+            if os.path.exists(self._matrix_path):
+                os.remove(self._matrix_path)
+        elif self._rows * self._dim * 4 < matrix_size:
+            # rows appended after the index was last saved (e.g. process was killed): drop them
+            os.truncate(self._matrix_path, self._rows * self._dim * 4)
+
+        # drop rows of outdated entries when they take more than half of the matrix
+        if self._rows > 2 * sum(len(e["bboxes"]) for e in self._files.values()) + 1000:
+            self.compact()
+
+    def predict_batch(
+        self, face_recognizer: degirum_face.FaceRecognizer, files: Iterable[str]
+    ) -> Iterator[Tuple[str, List[Tuple[list, int]]]]:
+        """
+        Get face embeddings for image files, running face recognition only for new or changed files.
+
+        Args:
+            face_recognizer (FaceRecognizer): Face recognizer to process new or changed files.
+            files (Iterable[str]): Image file paths.
+
+        Returns:
+            Iterator[Tuple[str, List[Tuple[list, int]]]]: Iterator over (file path, faces) tuples, where faces is
+                a list of (face bbox, embedding matrix row index) tuples; see `matrix()`.
+                Cached files go first, then newly processed ones.
+        """
+        stale: List[str] = []
+        for path in files:
+            entry = self._lookup(path)
+            if entry is None:
+                stale.append(path)
+            else:
+                yield path, self._faces(entry)
+
+        if not stale:
+            return
+
+        try:
+            with open(self._matrix_path, "ab") as matrix_file:
+                for result in face_recognizer.predict_batch(iter(stale)):
+                    path = result.info
+                    bboxes, embeddings = [], []
+                    for face in result.faces:
+                        if face.embeddings:
+                            bboxes.append([float(v) for v in face.bbox])
+                            embeddings.append(
+                                np.asarray(face.embeddings[0], dtype=np.float32).ravel()
+                            )
+                    stat = os.stat(path)
+                    entry = {
+                        "size": stat.st_size,
+                        "mtime_ns": stat.st_mtime_ns,
+                        "sha1": self._content_hash(path),
+                        "bboxes": bboxes,
+                        "first_row": self._rows,
+                    }
+                    if embeddings:
+                        if not self._dim:
+                            self._dim = embeddings[0].size
+                        # drop rows left over by an interrupted write, so rows are appended
+                        # exactly at the index position of the new entry
+                        matrix_file.truncate(self._rows * self._dim * 4)
+                        matrix_file.write(np.stack(embeddings).tobytes())
+                        matrix_file.flush()
+                        self._rows += len(embeddings)
+                    self._files[os.path.abspath(path)] = entry
+                    yield path, self._faces(entry)
+        finally:
+            self._save_index()
+
+    def matrix(self) -> np.ndarray:
+        """
+        Get embedding matrix.
+
+        Returns:
+            np.ndarray: Read-only memory-mapped matrix of face embeddings, one row per face.
+        """
+        if not self._rows:
+            return np.zeros((0, self._dim), dtype=np.float32)
+        return np.memmap(
+            self._matrix_path, dtype=np.float32, mode="r", shape=(self._rows, self._dim)
+        )
+
+    def row_files(self) -> List[Optional[str]]:
+        """
+        Get file paths of embedding matrix rows.
+
+        Returns:
+            List[Optional[str]]: File path for each matrix row; None for rows of outdated cache entries.
+        """
+        ret: List[Optional[str]] = [None] * self._rows
+        for path, entry in self._files.items():
+            first = entry["first_row"]
+            ret[first : first + len(entry["bboxes"])] = [path] * len(entry["bboxes"])
+        return ret
+
+    def compact(self):
+        """
+        Remove rows of outdated cache entries from the embedding matrix.
+        Matrix row indexes change, so previously returned row indexes and matrices become invalid.
+        """
+        if not self._rows:
+            return
+        matrix = self.matrix()
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            rows = 0
+            with os.fdopen(fd, "wb") as f:
+                for entry in self._files.values():
+                    first, count = entry["first_row"], len(entry["bboxes"])
+                    f.write(
+                        np.ascontiguousarray(matrix[first : first + count]).tobytes()
+                    )
+                    entry["first_row"] = rows
+                    rows += count
+            del matrix
+            os.replace(tmp_path, self._matrix_path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        self._rows = rows
+        self._save_index()
+
+    def _lookup(self, path: str) -> Optional[dict]:
+        """
+        Get valid cache entry for the file.
+        File is considered unchanged when its size and modification time match; when only modification time
+        differs, content hash is compared, so touched but unchanged files are not processed again.
+        """
+        entry = self._files.get(os.path.abspath(path))
+        if entry is None:
+            return None
+        stat = os.stat(path)
+        if stat.st_size != entry["size"]:
+            return None
+        if stat.st_mtime_ns != entry["mtime_ns"]:
+            if self._content_hash(path) != entry["sha1"]:
+                return None
+            entry["mtime_ns"] = stat.st_mtime_ns
+        return entry
+
+    @staticmethod
+    def _faces(entry: dict) -> List[Tuple[list, int]]:
+        """
+        Get list of (bbox, matrix row) tuples of the cache entry.
+        """
+        return [
+            (bbox, entry["first_row"] + i) for i, bbox in enumerate(entry["bboxes"])
+        ]
+
+    @staticmethod
+    def _content_hash(path: str) -> str:
+        """
+        Compute file content hash.
+        """
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def _save_index(self):
+        """
+        Save cache index.
+        """
+        index = {
+            "version": self.format_version,
+            "rows": self._rows,
+            "dim": self._dim,
+            "files": self._files,
+        }
+        # write to temporary file first, so the index is never partially written
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self._index_path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
@@ -6,6 +6,8 @@
 #
 # Implements a face similarity search example using DeGirum Face Tracking library.
 # This example demonstrates how to find all photos with similar faces to a given input image.
+# Face embeddings of photos are kept in the persistent cache (see `embedding_cache.py`), so only new
+# or changed photos are processed on subsequent runs.
 #
 # You can configure all the settings in the `face_recognition.yaml` file.
 #
@@ -14,6 +16,10 @@
 #
 
 import degirum_face, sys, os, glob
+import numpy as np
+from embedding_cache import EmbeddingCache
+
+cache_dir = "temp/embedding_cache"  # directory of persistent face embedding cache
 
 
 def main():
@@ -34,22 +40,37 @@ def main():
     reference_image_path = sys.argv[1]
     photos_directory = sys.argv[2]
 
-    # clear existing data in the database
-    face_recognizer.db.clear_all_tables()
-
-    # enroll a person from the reference image (biggest face in the image is used)
-    person_name = "Reference"  # can be any string
-    face_recognizer.enroll_image(reference_image_path, person_name)
+    cache = EmbeddingCache(cache_dir, config)
 
-    # iterate over all image files in the directory (supports wildcards, e.g., *.jpg)
+    # compute embeddings for all photos (supports wildcards, e.g., *.jpg); cached photos are not processed
     image_files = glob.glob(photos_directory)
+    for _ in cache.predict_batch(face_recognizer, [reference_image_path] + image_files):
+        pass
+
+    # reference embedding is taken from the biggest face in the reference image
+    _, reference_faces = next(
+        cache.predict_batch(face_recognizer, [reference_image_path])
+    )
+    if not reference_faces:
+        print(f"No faces found in {reference_image_path}")
+        return
+    _, reference_row = max(
+        reference_faces, key=lambda f: (f[0][2] - f[0][0]) * (f[0][3] - f[0][1])
+    )
+
+    # embeddings are L2-normalized, so cosine similarity is a dot product
+    matrix = cache.matrix()
+    similarities = matrix @ matrix[reference_row]
+    row_files = cache.row_files()
+    image_paths = set(os.path.abspath(f) for f in image_files)
 
     # find and print all photos with similar faces to the reference image
     print(f"Photos with faces similar to {reference_image_path}:")
-    for result in face_recognizer.predict_batch(image_files):
-        for face in result.faces:
-            if face.attributes == person_name:
-                print(f"{result.info}: similarity {face.similarity_score:.2f}")
+    for row in np.argsort(-similarities):
+        if similarities[row] < config.cosine_similarity_threshold:
+            break
+        if row_files[row] in image_paths:
+            print(f"{row_files[row]}: similarity {similarities[row]:.2f}")
 
 
 if __name__ == "__main__":
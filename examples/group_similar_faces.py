@@ -6,6 +6,8 @@
 #
 # Implements a face similarity grouping example using DeGirum Face Tracking library.
 # This example demonstrates how to find groups of photos featuring similar faces.
+# Face embeddings of photos are kept in the persistent cache (see `embedding_cache.py`), so only new
+# or changed photos are processed on subsequent runs.
 #
 # You can configure all the settings in the `face_recognition.yaml` file.
 #
@@ -14,6 +16,10 @@
 #
 
 import degirum_face, sys, os, glob, sklearn
+import numpy as np
+from embedding_cache import EmbeddingCache
+
+cache_dir = "temp/embedding_cache"  # directory of persistent face embedding cache
 
 
 def main():
@@ -31,28 +37,30 @@ def main():
     # create FaceRecognizer instance
     face_recognizer = degirum_face.FaceRecognizer(config)
 
-    # compute face embeddings for all photos and store them together with filenames
-    recognition_results: list = []
-    for result in face_recognizer.predict_batch(photos):
-        recognition_results.extend(
-            (face.embeddings[0], result.info)
-            for face in result.faces
-            if face.embeddings
-        )
+    cache = EmbeddingCache(cache_dir, config)
+
+    # compute face embeddings for all photos (cached photos are not processed) and collect matrix rows
+    rows: list = []
+    filenames: list = []
+    for path, faces in cache.predict_batch(face_recognizer, photos):
+        rows.extend(row for _, row in faces)
+        filenames.extend(path for _ in faces)
 
-    if len(recognition_results) == 0:
+    if len(rows) == 0:
         print("No faces found")
         return
 
-    # cluster embeddings using HDBSCAN
-    clusterer = sklearn.cluster.HDBSCAN(min_cluster_size=2, metric="cosine")
-    clusters = clusterer.fit_predict([e[0] for e in recognition_results])
+    # cluster embeddings using HDBSCAN; embeddings are L2-normalized, so euclidean distance is monotonic
+    # with cosine distance, and it allows fast tree-based neighbor search on large photo libraries
+    embeddings = np.asarray(cache.matrix()[np.asarray(rows)])
+    clusterer = sklearn.cluster.HDBSCAN(min_cluster_size=2, metric="euclidean")
+    clusters = clusterer.fit_predict(embeddings)
     cluster_indexes = clusters.argsort()
 
     # print file groups
     current_cluster = -1
     for cluster, filename in zip(
-        clusters[cluster_indexes], [recognition_results[i][1] for i in cluster_indexes]
+        clusters[cluster_indexes], [filenames[i] for i in cluster_indexes]
     ):
         if cluster != -1:
             if cluster != current_cluster:
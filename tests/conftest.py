@@ -0,0 +1,17 @@
+#
+# conftest.py: Test Configuration
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+# Makes modules of the web application, benchmarks, and examples importable by tests,
+# the same way they import their sibling modules when run as scripts.
+#
+
+import os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for subdir in ("apps/face_tracking_web_app", "benchmarks", "examples"):
+    path = os.path.join(ROOT, subdir)
+    if path not in sys.path:
+        sys.path.insert(0, path)
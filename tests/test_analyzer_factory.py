@@ -0,0 +1,63 @@
+#
+# test_analyzer_factory.py: Tests of Face Tracker Result Analyzers Customization
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+
+import degirum_face
+import degirum_tools
+from degirum_face.face_data import FaceMap
+from analyzer_factory import add_analyzer_transform, analyzer_transforms
+from compiled_face_filter import CompiledFaceFilter, use_compiled_face_filter
+from mock_models import SyntheticScene, mock_model_specs
+from vectorized_analyzers import (
+    VectorizedHeadPoseAnalyzer,
+    VectorizedLivenessDetector,
+    use_vectorized_analyzers,
+)
+
+
+def make_tracker(tmp_path) -> degirum_face.FaceTracker:
+    scene = SyntheticScene(width=320, height=240, num_faces=1, seed=0)
+    detector, embedder = mock_model_specs(scene, embedding_dim=16)
+    config = degirum_face.FaceTrackerConfig(
+        face_detection_model_spec=detector,
+        face_embedding_model_spec=embedder,
+        db_path=str(tmp_path / "db.lance"),
+        live_stream_mode="NONE",
+    )
+    config.face_filters.enable_zone_filter = True
+    config.face_filters.zone = [[0, 0], [200, 0], [200, 200], [0, 200]]
+    return degirum_face.FaceTracker(config)
+
+
+def test_transforms_are_applied_in_order(tmp_path):
+    tracker = make_tracker(tmp_path)
+    create_analyzers = tracker._create_analyzers
+    use_vectorized_analyzers(tracker, liveness={"trail_length": 10})
+    use_compiled_face_filter(tracker)
+    calls = []
+
+    def record(analyzers: list, config, face_map) -> list:
+        calls.append(analyzers)
+        return analyzers
+
+    add_analyzer_transform(tracker, record)
+    assert len(analyzer_transforms(tracker)) == 3
+
+    analyzers = tracker._create_analyzers(tracker.config, FaceMap())
+    types = [type(a) for a in analyzers]
+    assert types[-3:] == [
+        VectorizedHeadPoseAnalyzer,
+        VectorizedLivenessDetector,
+        CompiledFaceFilter,
+    ]
+    assert degirum_tools.ZoneCounter not in types
+    # the last transform gets the result of the previous ones
+    assert calls == [analyzers]
+
+    # other face trackers are not affected
+    assert analyzer_transforms(make_tracker(tmp_path)) == []
+    library = create_analyzers(tracker.config, FaceMap())
+    assert degirum_tools.ZoneCounter in [type(a) for a in library]
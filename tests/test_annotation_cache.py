@@ -0,0 +1,169 @@
+#
+# test_annotation_cache.py: Tests of Clip Annotation Results Cache
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+
+import os, shutil, types
+
+import numpy as np
+import degirum_face
+from degirum_face.face_data import FaceStatus
+from annotation_cache import AnnotationCache
+from mock_models import SyntheticScene, mock_model_specs
+
+
+def make_config(min_face_size: int = 50):
+    """Make minimal face tracking configuration with the fields used for the cache key."""
+    return types.SimpleNamespace(
+        face_detection_model_spec=types.SimpleNamespace(model_name="detector"),
+        face_embedding_model_spec=types.SimpleNamespace(model_name="embedder"),
+        face_filters=degirum_face.FaceFilterConfig(min_face_size=min_face_size),
+    )
+
+
+def make_clip(name: str = "clip_1", etag: str = "etag_1"):
+    """Make clip file object."""
+    return types.SimpleNamespace(
+        object_name=name, etag=etag, last_modified=None, size=0
+    )
+
+
+def make_face_map() -> dict:
+    """Make face map of two tracks."""
+    rng = np.random.default_rng(0)
+    return {
+        track_id: degirum_face.FaceAttributes(
+            attributes=f"person_{track_id}",
+            embeddings=list(rng.standard_normal((3, 8)).astype(np.float32)),
+        )
+        for track_id in (1, 2)
+    }
+
+
+def sidecars(cache_dir) -> list:
+    return sorted(f for f in os.listdir(cache_dir) if f.endswith(".npz"))
+
+
+def test_round_trip(tmp_path):
+    cache = AnnotationCache(str(tmp_path), make_config())
+    face_map = make_face_map()
+    cache.save(make_clip(), face_map)
+
+    loaded = cache.load(make_clip())
+    assert loaded is not None
+    assert sorted(loaded) == [1, 2]
+    for track_id, face in face_map.items():
+        assert loaded[track_id].attributes == face.attributes
+        np.testing.assert_array_equal(
+            np.stack(loaded[track_id].embeddings), np.stack(face.embeddings)
+        )
+
+
+def assert_same(actual, expected, name: str):
+    """Compare attribute values, including lists of arrays, exactly."""
+    if isinstance(expected, np.ndarray):
+        assert isinstance(actual, np.ndarray) and actual.dtype == expected.dtype, name
+        np.testing.assert_array_equal(actual, expected, err_msg=name)
+    elif isinstance(expected, list):
+        assert isinstance(actual, list) and len(actual) == len(expected), name
+        for a, e in zip(actual, expected):
+            assert_same(a, e, name)
+    else:
+        assert actual == expected, name
+
+
+def assert_same_faces(expected: dict, actual: dict):
+    """Compare face maps attribute by attribute."""
+    assert sorted(actual) == sorted(expected)
+    for track_id, face in expected.items():
+        loaded = actual[track_id]
+        assert type(loaded) is type(face)
+        assert vars(loaded).keys() == vars(face).keys()
+        for name, value in vars(face).items():
+            assert_same(vars(loaded)[name], value, name)
+
+
+def test_round_trip_matches_fresh_annotation(tmp_path):
+    scene = SyntheticScene(width=320, height=240, num_faces=2, seed=0)
+    detector, embedder = mock_model_specs(scene, embedding_dim=16)
+    clip_path = str(tmp_path / "clip.mp4")
+    scene.write_video(clip_path, 40)
+    config = degirum_face.FaceTrackerConfig(
+        face_detection_model_spec=detector,
+        face_embedding_model_spec=embedder,
+        db_path=str(tmp_path / "db.lance"),
+    )
+    face_map = degirum_face.FaceTracker(config).find_faces_in_file(
+        clip_path, save_annotated=False, collect_analytics=True
+    )
+    assert face_map and all(face.embeddings for face in face_map.values())
+
+    # tracks without embeddings, with missing face crops, and with extra state are kept as well
+    face_map[100] = FaceStatus(attributes=None, track_id=100, initial_frame=5)
+    first = face_map[min(face_map)]
+    first.images = [None] + first.images[1:]
+    first.keypoints = [np.arange(10, dtype=np.float64).reshape(5, 2)]
+
+    cache = AnnotationCache(str(tmp_path / "cache"), config)
+    cache.save(make_clip(), face_map)
+    loaded = cache.load(make_clip())
+    assert loaded is not None
+    assert_same_faces(face_map, loaded)
+
+
+def test_new_clip_version_replaces_sidecar(tmp_path):
+    cache = AnnotationCache(str(tmp_path), make_config())
+    cache.save(make_clip(etag="etag_1"), make_face_map())
+    cache.save(make_clip(name="clip_2"), make_face_map())
+    cache.save(make_clip(etag="etag_2"), make_face_map())
+
+    assert cache.load(make_clip(etag="etag_1")) is None
+    assert cache.load(make_clip(etag="etag_2")) is not None
+    assert cache.load(make_clip(name="clip_2")) is not None
+    assert len(sidecars(tmp_path)) == 2
+
+
+def test_settings_change_invalidates_and_replaces_sidecar(tmp_path):
+    AnnotationCache(str(tmp_path), make_config(50)).save(make_clip(), make_face_map())
+    cache = AnnotationCache(str(tmp_path), make_config(80))
+    assert cache.load(make_clip()) is None
+
+    cache.save(make_clip(), make_face_map())
+    assert len(sidecars(tmp_path)) == 1
+
+
+def test_remove_collects_all_sidecars_of_clip(tmp_path):
+    cache = AnnotationCache(str(tmp_path), make_config())
+    cache.save(make_clip(), make_face_map())
+    cache.save(make_clip(name="clip_2"), make_face_map())
+    # outdated sidecar of the clip left behind, e.g. by a process killed while saving
+    path = cache._sidecar_path(make_clip())
+    shutil.copy(path, path.replace(".npz", "0.npz"))
+    assert len(sidecars(tmp_path)) == 3
+
+    cache.remove(make_clip())
+    assert cache.load(make_clip()) is None
+    assert sidecars(tmp_path) == [
+        os.path.basename(cache._sidecar_path(make_clip("clip_2")))
+    ]
+
+
+def test_zones_and_liveness_settings_invalidate_sidecar(tmp_path):
+    zones = [{"polygon": [[0, 0], [100, 0], [100, 100]], "min_face_size": 30}]
+    settings = {"face_zones": zones, "liveness": None}
+    cache = AnnotationCache(str(tmp_path), make_config(), settings)
+    cache.save(make_clip(), make_face_map())
+    assert AnnotationCache(str(tmp_path), make_config(), settings).load(make_clip())
+
+    changed_zones = [dict(zones[0], min_face_size=60)]
+    for changed in (
+        {"face_zones": changed_zones, "liveness": None},
+        {"face_zones": zones, "liveness": {"trail_length": 30}},
+        None,
+    ):
+        assert (
+            AnnotationCache(str(tmp_path), make_config(), changed).load(make_clip())
+            is None
+        )
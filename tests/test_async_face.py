@@ -0,0 +1,85 @@
+#
+# test_async_face.py: Tests of Asyncio Wrappers of Face Recognition APIs
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+
+import asyncio, threading, time
+
+import degirum_face
+from async_face import AsyncRunner, AsyncFaceTracker
+from mock_models import SyntheticScene, mock_model_specs
+
+
+def make_tracker(tmp_path) -> degirum_face.FaceTracker:
+    scene = SyntheticScene(width=320, height=240, num_faces=2, seed=0)
+    detector, embedder = mock_model_specs(scene, embedding_dim=16)
+    return degirum_face.FaceTracker(
+        degirum_face.FaceTrackerConfig(
+            face_detection_model_spec=detector,
+            face_embedding_model_spec=embedder,
+            db_path=str(tmp_path / "db.lance"),
+        )
+    )
+
+
+async def wait_for_threads(threads: set, timeout_s: float = 10.0) -> set:
+    """
+    Wait until threads started after `threads` snapshot finish; returns the ones still alive.
+    The event loop keeps running meanwhile: it closes async generators abandoned by `break`.
+    """
+    deadline = time.monotonic() + timeout_s
+    while True:
+        alive = {t for t in threading.enumerate() if t not in threads and t.is_alive()}
+        if not alive or time.monotonic() > deadline:
+            return alive
+        await asyncio.sleep(0.05)
+
+
+def test_early_exit_stops_tracking_pipeline(tmp_path):
+    tracker = make_tracker(tmp_path)
+    scene = SyntheticScene(width=320, height=240, num_faces=2, seed=0)
+
+    async def main():
+        runner = AsyncRunner(max_concurrency=1, queue_size=2)
+        threads = set(threading.enumerate())
+        async for _ in AsyncFaceTracker(tracker, runner).predict_batch_async(
+            scene.frames(1000)
+        ):
+            # let the pipeline fill all its queues, so it blocks when the consumer is gone
+            await asyncio.sleep(1)
+            break
+        try:
+            return await wait_for_threads(threads)
+        finally:
+            runner.shutdown()
+
+    assert asyncio.run(main()) == set()
+
+
+def test_iterators_do_not_hold_pool_workers(tmp_path):
+    tracker = make_tracker(tmp_path)
+    scene = SyntheticScene(width=320, height=240, num_faces=2, seed=0)
+
+    async def main():
+        runner = AsyncRunner(max_concurrency=1, max_iterators=1, queue_size=2)
+        async_tracker = AsyncFaceTracker(tracker, runner)
+        order = []
+
+        async def analyze(name: str, frames: int):
+            async for _ in async_tracker.predict_batch_async(scene.frames(frames)):
+                pass
+            order.append(name)
+
+        first = asyncio.create_task(analyze("first", 30))
+        await asyncio.sleep(0.5)
+        second = asyncio.create_task(analyze("second", 1))
+        # blocking calls are served while the iterator is running
+        assert await asyncio.wait_for(runner.run(lambda: 42), timeout=5) == 42
+        await asyncio.gather(first, second)
+        runner.shutdown()
+        return order
+
+    # the second iterator waits for the first one to finish
+    assert asyncio.run(main()) == ["first", "second"]
@@ -0,0 +1,133 @@
+#
+# test_embedding_cache.py: Tests of Persistent Face Embedding Cache
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+
+import os, types
+from typing import List
+
+import numpy as np
+import pytest
+import degirum_face
+from embedding_cache import EmbeddingCache
+
+DIM = 8
+
+
+class FakeFaceRecognizer:
+    """Face recognizer stand-in returning one deterministic face per image file."""
+
+    def __init__(self, fail_after: int = -1):
+        self.processed: List[str] = []
+        self.fail_after = fail_after
+
+    def predict_batch(self, files):
+        for path in files:
+            if len(self.processed) == self.fail_after:
+                raise RuntimeError("inference failed")
+            self.processed.append(path)
+            yield types.SimpleNamespace(
+                info=path,
+                faces=[
+                    types.SimpleNamespace(
+                        bbox=[0, 0, 10, 10], embeddings=[embedding_of(path)]
+                    )
+                ],
+            )
+
+
+def embedding_of(path: str) -> np.ndarray:
+    """Embedding derived from file contents, so changed files get different embeddings."""
+    with open(path, "rb") as f:
+        seed = int.from_bytes(f.read()[:8].ljust(8, b"\0"), "little")
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+def make_config():
+    """Make minimal face recognition configuration with the fields used for the cache key."""
+    return types.SimpleNamespace(
+        face_detection_model_spec=types.SimpleNamespace(model_name="detector"),
+        face_embedding_model_spec=types.SimpleNamespace(model_name="embedder"),
+        face_filters=degirum_face.FaceFilterConfig(),
+    )
+
+
+@pytest.fixture
+def photos(tmp_path):
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"photo_{i}.jpg"
+        path.write_bytes(f"photo {i}".encode())
+        paths.append(str(path))
+    return paths
+
+
+def check_rows(cache: EmbeddingCache, results):
+    """Check that matrix rows returned for each file hold that file's embedding."""
+    matrix = cache.matrix()
+    for path, faces in results:
+        for _, row in faces:
+            np.testing.assert_array_equal(matrix[row], embedding_of(path))
+
+
+def test_cached_files_are_not_processed_again(tmp_path, photos):
+    cache = EmbeddingCache(str(tmp_path / "cache"), make_config())
+    check_rows(cache, list(cache.predict_batch(FakeFaceRecognizer(), photos)))
+
+    recognizer = FakeFaceRecognizer()
+    cache = EmbeddingCache(str(tmp_path / "cache"), make_config())
+    results = list(cache.predict_batch(recognizer, photos))
+    assert recognizer.processed == []
+    check_rows(cache, results)
+
+
+def test_changed_file_is_processed_again(tmp_path, photos):
+    cache = EmbeddingCache(str(tmp_path / "cache"), make_config())
+    list(cache.predict_batch(FakeFaceRecognizer(), photos))
+
+    # touched but unchanged file is taken from the cache
+    os.utime(photos[0], ns=(1, 1))
+    with open(photos[1], "wb") as f:
+        f.write(b"changed!")
+
+    recognizer = FakeFaceRecognizer()
+    results = list(cache.predict_batch(recognizer, photos))
+    assert recognizer.processed == [photos[1]]
+    check_rows(cache, results)
+
+
+def test_rows_written_after_index_save_are_dropped(tmp_path, photos):
+    cache_dir = str(tmp_path / "cache")
+    cache = EmbeddingCache(cache_dir, make_config())
+    list(cache.predict_batch(FakeFaceRecognizer(), photos[:2]))
+
+    # simulate process killed after appending rows but before saving the index
+    with open(cache._matrix_path, "ab") as f:
+        f.write(np.ones((3, DIM), dtype=np.float32).tobytes())
+
+    cache = EmbeddingCache(cache_dir, make_config())
+    assert os.path.getsize(cache._matrix_path) == 2 * DIM * 4
+    results = list(cache.predict_batch(FakeFaceRecognizer(), photos))
+    check_rows(cache, results)
+    assert os.path.getsize(cache._matrix_path) == len(photos) * DIM * 4
+
+
+def test_failed_batch_keeps_index_and_matrix_consistent(tmp_path, photos):
+    cache_dir = str(tmp_path / "cache")
+    cache = EmbeddingCache(cache_dir, make_config())
+    with pytest.raises(RuntimeError):
+        list(cache.predict_batch(FakeFaceRecognizer(fail_after=2), photos))
+
+    # leftover bytes of an interrupted write must not shift rows of the next batch
+    with open(cache._matrix_path, "ab") as f:
+        f.write(b"\0" * (DIM * 2))
+
+    recognizer = FakeFaceRecognizer()
+    results = list(cache.predict_batch(recognizer, photos))
+    assert recognizer.processed == photos[2:]
+    check_rows(cache, results)
+
+    cache = EmbeddingCache(cache_dir, make_config())
+    check_rows(cache, list(cache.predict_batch(FakeFaceRecognizer(), photos)))
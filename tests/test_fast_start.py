@@ -0,0 +1,57 @@
+#
+# test_fast_start.py: Tests of Fast Cold Start Helpers
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+
+from dataclasses import dataclass, field
+from typing import List
+
+from degirum_tools import ModelSpec
+from fast_start import ModelSyncCache
+
+
+@dataclass
+class RecordingModelSpec(ModelSpec):
+    """Model specification recording `ensure_local()` calls instead of downloading models."""
+
+    calls: List[bool] = field(default_factory=list)
+
+    def ensure_local(self, cloud_sync=False) -> ModelSpec:
+        self.calls.append(cloud_sync)
+        return ModelSpec(
+            model_name=self.model_name,
+            zoo_url=f"/models/{self.model_name}",
+            inference_host_address="@local",
+        )
+
+
+def make_spec(inference_host_address: str = "@local") -> RecordingModelSpec:
+    return RecordingModelSpec(
+        model_name="face_detector",
+        zoo_url="degirum/public",
+        inference_host_address=inference_host_address,
+    )
+
+
+def test_cloud_zoo_is_checked_once_per_ttl_period(tmp_path):
+    cache_file = str(tmp_path / "model_sync_cache.json")
+    spec = make_spec()
+    local = ModelSyncCache(cache_file).local_model_spec(spec)
+    assert (local.zoo_url, local.inference_host_address) == (
+        "/models/face_detector",
+        "@local",
+    )
+
+    # restarted process verifies the local copy only
+    ModelSyncCache(cache_file).local_model_spec(spec)
+    # expired entry makes the next request check the cloud zoo again
+    ModelSyncCache(cache_file, ttl_s=0).local_model_spec(spec)
+    assert spec.calls == [True, False, True]
+
+
+def test_cloud_inference_models_are_not_copied(tmp_path):
+    spec = make_spec("@cloud")
+    assert ModelSyncCache(str(tmp_path / "cache.json")).local_model_spec(spec) is spec
+    assert spec.calls == []
@@ -0,0 +1,209 @@
+#
+# test_frame_tracer.py: Tests of Sampled Per-Frame Pipeline Tracing
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+
+import json, types
+
+import degirum_face
+from degirum_tools.streams import SinkGizmo, StreamMeta, VideoSourceGizmo, tag_video
+from frame_tracer import FrameTracer, _TracedModel, _TracedModelSpec
+from mock_models import SyntheticScene, mock_model_specs
+
+
+def make_config(tmp_path, scene: SyntheticScene) -> degirum_face.FaceTrackerConfig:
+    detector, embedder = mock_model_specs(scene, embedding_dim=16)
+    return degirum_face.FaceTrackerConfig(
+        face_detection_model_spec=detector,
+        face_embedding_model_spec=embedder,
+        db_path=str(tmp_path / "db.lance"),
+        live_stream_mode="NONE",
+    )
+
+
+def frame_meta(frame_id: int) -> StreamMeta:
+    return StreamMeta({VideoSourceGizmo.key_frame_id: frame_id}, tag_video)
+
+
+class FakeModel:
+    """Model returning one result per input, in order."""
+
+    def predict_batch(self, data):
+        for frame, meta in data:
+            yield types.SimpleNamespace(image=frame, info=meta)
+
+
+class FakeDatabase:
+    def get_attributes_by_embedding(self, embedding, threshold):
+        return None, None
+
+
+def test_sampled_frames_get_stage_spans(tmp_path):
+    scene = SyntheticScene(width=320, height=240, num_faces=2, seed=0)
+    tracer = FrameTracer(str(tmp_path / "trace.json"), sample_every=5)
+    tracker = degirum_face.FaceTracker(tracer.instrument(make_config(tmp_path, scene)))
+    tracer.instrument_analyzers(tracker)
+    sink = SinkGizmo()
+    composition, _ = tracker.start_face_tracking_pipeline(
+        frame_iterator=scene.frames(20), sink=sink, sink_connection_point="detector"
+    )
+    for data in sink():
+        tracer.on_frame(data)
+    composition.wait()
+
+    spans = list(tracer._spans)
+    # one of every N frames is traced
+    assert {frame_id for _, _, frame_id, _, _ in spans} == {0, 5, 10, 15}
+    frames = [span for span in spans if span[0] == FrameTracer.stage_frame]
+    assert sorted(frame_id for _, _, frame_id, _, _ in frames) == [0, 5, 10, 15]
+
+    # each stage has its own span
+    names = {name for name, _, _, _, _ in spans}
+    assert {
+        FrameTracer.stage_capture,
+        FrameTracer.stage_detect,
+        FrameTracer.stage_track,
+        FrameTracer.stage_annotate,
+        FrameTracer.stage_filter,
+        FrameTracer.stage_crop,
+        FrameTracer.stage_embed,
+        FrameTracer.stage_db_search,
+        "HeadPoseAnalyzer",
+        "FaceDetectorGizmo",
+    } <= names
+    assert all(start <= end for _, _, _, start, end in spans)
+    assert {c for n, c, _, _, _ in spans if n == FrameTracer.stage_filter} == {
+        "analyzer"
+    }
+
+
+def test_traced_model_and_database_hooks():
+    tracer = FrameTracer("trace.json", sample_every=2)
+    db = FakeDatabase()
+    tracer._instrument_database(db)
+    wrapped = db.get_attributes_by_embedding
+    tracer._instrument_database(db)
+    # each database instance is wrapped only once
+    assert db.get_attributes_by_embedding is wrapped
+
+    model = _TracedModel(FakeModel(), tracer, FrameTracer.stage_embed)
+    inputs = [(f"crop{i}", frame_meta(i)) for i in range(5)]
+    outputs = []
+    for result in model.predict_batch(iter(inputs)):
+        outputs.append(result.image)
+        # database search by the consumer of embedder result is attributed to its frame
+        db.get_attributes_by_embedding(None, 0.5)
+    assert outputs == [frame for frame, _ in inputs]
+
+    spans = sorted((name, frame_id) for name, _, frame_id, _, _ in tracer._spans)
+    assert spans == [
+        (FrameTracer.stage_db_search, 0),
+        (FrameTracer.stage_db_search, 2),
+        (FrameTracer.stage_db_search, 4),
+        (FrameTracer.stage_embed, 0),
+        (FrameTracer.stage_embed, 2),
+        (FrameTracer.stage_embed, 4),
+    ]
+    # database search outside of embedder results is not traced
+    db.get_attributes_by_embedding(None, 0.5)
+    assert len(tracer._spans) == 6
+
+
+def test_disabled_tracing_installs_no_hooks(tmp_path):
+    scene = SyntheticScene(width=320, height=240, num_faces=1, seed=0)
+    config = make_config(tmp_path, scene)
+    tracer = FrameTracer("trace.json")
+    instrumented = tracer.instrument(config)
+    assert isinstance(instrumented.face_detection_model_spec, _TracedModelSpec)
+    # the original configuration is left intact
+    assert not isinstance(config.face_detection_model_spec, _TracedModelSpec)
+
+    # without tracing, models, analyzers and the database are not wrapped
+    tracker = degirum_face.FaceTracker(make_config(tmp_path / "plain", scene))
+    assert "_create_analyzers" not in vars(tracker)
+    assert not isinstance(tracker.config.face_embedding_model_spec, _TracedModelSpec)
+    assert not hasattr(tracker.db.get_attributes_by_embedding, "frame_tracer")
+
+    # with tracing, non-sampled frames are passed through without spans
+    tracer.on_frame(types.SimpleNamespace(meta=frame_meta(1)))  # type: ignore[arg-type]
+    model = _TracedModel(FakeModel(), tracer, FrameTracer.stage_detect)
+    assert len(list(model.predict_batch(iter([(None, frame_meta(1))])))) == 1
+    assert not tracer._spans
+
+
+def add_spans(tracer: FrameTracer):
+    tracer.add_span(FrameTracer.stage_frame, 0, 10.0, 10.5, "frame")
+    tracer.add_span(FrameTracer.stage_detect, 0, 10.1, 10.2)
+    tracer.add_span(FrameTracer.stage_filter, 0, 10.2, 10.25, "analyzer")
+    tracer.add_span(FrameTracer.stage_frame, 100, 20.0, 20.5, "frame")
+
+
+def test_chrome_export_schema(tmp_path):
+    path = tmp_path / "trace.json"
+    tracer = FrameTracer(str(path), name="cam")
+    add_spans(tracer)
+    tracer.export()
+    content = json.loads(path.read_text())
+
+    assert content["displayTimeUnit"] == "ms"
+    events = content["traceEvents"]
+    assert events[0] == {
+        "name": "process_name",
+        "ph": "M",
+        "pid": "cam",
+        "args": {"name": "pipeline cam"},
+    }
+    # one thread per span name
+    threads = {
+        e["args"]["name"]: e["tid"] for e in events if e["name"] == "thread_name"
+    }
+    assert sorted(threads) == ["detect", "filter", "frame"]
+    assert len(set(threads.values())) == 3
+
+    complete = [e for e in events if e["ph"] == "X"]
+    assert len(complete) == 4
+    detect = next(e for e in complete if e["name"] == "detect")
+    assert detect["cat"] == "stage"
+    assert detect["ts"] == 10.1e6
+    assert abs(detect["dur"] - 0.1e6) < 1e-3
+    assert (detect["pid"], detect["tid"]) == ("cam", threads["detect"])
+    assert detect["args"] == {"frame_id": 0}
+
+
+def test_otel_export_schema(tmp_path):
+    path = tmp_path / "trace.json"
+    tracer = FrameTracer(str(path), format="otel", name="cam")
+    add_spans(tracer)
+    tracer.export()
+    content = json.loads(path.read_text())
+
+    resource_spans = content["resourceSpans"]
+    assert len(resource_spans) == 1
+    assert resource_spans[0]["resource"]["attributes"] == [
+        {"key": "service.name", "value": {"stringValue": "face_tracking"}}
+    ]
+    scope_spans = resource_spans[0]["scopeSpans"][0]
+    assert scope_spans["scope"] == {"name": "frame_tracer"}
+    spans = scope_spans["spans"]
+    assert len(spans) == 4
+    for span in spans:
+        assert len(span["traceId"]) == 32 and int(span["traceId"], 16) >= 0
+        assert len(span["spanId"]) == 16 and int(span["spanId"], 16) >= 0
+        assert span["kind"] == 1
+
+    # one trace per frame, frame span is the root span
+    root, detect, analyzer, other_root = spans
+    assert root["parentSpanId"] == "" and other_root["parentSpanId"] == ""
+    assert detect["parentSpanId"] == analyzer["parentSpanId"] == root["spanId"]
+    assert detect["traceId"] == analyzer["traceId"] == root["traceId"]
+    assert other_root["traceId"] != root["traceId"]
+    assert len({span["spanId"] for span in spans}) == 4
+
+    assert detect["startTimeUnixNano"] == str(int(10.1 * 1e9))
+    assert detect["endTimeUnixNano"] == str(int(10.2 * 1e9))
+    assert {"key": "frame_id", "value": {"intValue": "0"}} in detect["attributes"]
+    assert {"key": "category", "value": {"stringValue": "analyzer"}} in analyzer[
+        "attributes"
+    ]
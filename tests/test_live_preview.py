@@ -0,0 +1,83 @@
+#
+# test_live_preview.py: Tests of Viewer-Aware Live Stream Preview
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+
+import time
+
+import degirum_face
+import pytest
+from degirum_tools.streams import SinkGizmo, VideoStreamerGizmo
+from live_preview import (
+    ViewerAwareFaceTracker,
+    ViewerAwareStreamerGizmo,
+    ViewerTracker,
+    media_server_config,
+)
+from mock_models import SyntheticScene, mock_model_specs
+
+
+@pytest.mark.parametrize("connection_point", ["detector", "recognizer"])
+def test_tracker_attaches_viewer_aware_streamer(tmp_path, connection_point):
+    scene = SyntheticScene(width=320, height=240, num_faces=2, seed=0)
+    detector, embedder = mock_model_specs(scene, embedding_dim=16)
+    config = degirum_face.FaceTrackerConfig(
+        face_detection_model_spec=detector,
+        face_embedding_model_spec=embedder,
+        db_path=str(tmp_path / "db.lance"),
+        live_stream_mode="WEB",
+    )
+    tracker = ViewerAwareFaceTracker(config, ViewerTracker(), width=160, fps=5)
+    sink = SinkGizmo()
+    composition, _ = tracker.start_face_tracking_pipeline(
+        frame_iterator=scene.frames(20),
+        sink=sink,
+        sink_connection_point=connection_point,
+    )
+    # the sink is connected to the requested connection point; without viewers nothing is encoded
+    results = list(sink())
+    composition.stop()
+
+    assert len(results) == 20
+    streamers = [g for g in composition._gizmos if isinstance(g, VideoStreamerGizmo)]
+    assert [type(g) for g in streamers] == [ViewerAwareStreamerGizmo]
+    # the streamer is a dropping side branch of face detector output
+    streamer = streamers[0]
+    assert streamer.get_input(0).allow_drop
+    assert streamer._connected_gizmos == {
+        g for g in composition._gizmos if isinstance(g, degirum_face.FaceDetectorGizmo)
+    }
+    assert sink.get_input(0) not in streamer._output_refs
+    # library module and the caller's configuration are left intact
+    assert degirum_face.face_tracking.VideoStreamerGizmo is VideoStreamerGizmo
+    assert config.live_stream_mode == "WEB"
+
+
+def test_viewer_tracker_counts_viewers():
+    viewers = ViewerTracker()
+    viewers.add("page")
+    viewers.add("page")
+    viewers.add("demand", timeout_s=0.05)
+    assert viewers.count == 2
+    assert viewers.idle_time_s() == 0.0
+
+    time.sleep(0.1)
+    assert viewers.count == 1
+    viewers.remove("page")
+    viewers.remove("unknown")
+    assert viewers.count == 0
+    assert viewers.idle_time_s() >= 0.0
+
+
+def test_media_server_config_reports_readers():
+    config = media_server_config("face_tracking", "http://localhost:8080/viewers")
+    hooks = config["paths"]["face_tracking"]
+    assert hooks["runOnRead"].endswith(
+        "-X POST http://localhost:8080/viewers/media_$MTX_READER_ID"
+    )
+    assert hooks["runOnUnread"].endswith(
+        "-X DELETE http://localhost:8080/viewers/media_$MTX_READER_ID"
+    )
+    assert "media_demand" in hooks["runOnDemand"]
@@ -0,0 +1,40 @@
+#
+# test_mock_models.py: Tests of Deterministic Mock Inference Backend
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+
+import pytest
+import numpy as np
+from degirum_tools.streams import StreamMeta, VideoSourceGizmo, tag_video
+from mock_models import MockFaceDetector, MockModel, SyntheticScene
+
+
+def test_mock_model_is_abstract():
+    with pytest.raises(TypeError):
+        MockModel("model")  # type: ignore[abstract]
+
+
+def test_detector_replays_frame_from_metadata():
+    scene = SyntheticScene(width=640, height=480, num_faces=3, seed=0)
+    detector = MockFaceDetector(scene)
+    frames = list(scene.frames(10))
+
+    # frames 0..4 are dropped upstream: frame 5 is the first one the detector sees
+    for frame_index in (5, 9):
+        meta = StreamMeta({VideoSourceGizmo.key_frame_id: frame_index}, [tag_video])
+        result = detector.predict((frames[frame_index], meta))
+        np.testing.assert_allclose(
+            [r["bbox"] for r in result.results], scene.face_boxes(frame_index)
+        )
+
+
+def test_detector_without_metadata_counts_frames():
+    scene = SyntheticScene(width=640, height=480, num_faces=3, seed=0)
+    detector = MockFaceDetector(scene)
+    for frame_index, frame in enumerate(scene.frames(3)):
+        result = detector.predict(frame)
+        np.testing.assert_allclose(
+            [r["bbox"] for r in result.results], scene.face_boxes(frame_index)
+        )
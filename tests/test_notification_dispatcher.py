@@ -0,0 +1,73 @@
+#
+# test_notification_dispatcher.py: Tests of Non-blocking Notification Dispatcher
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+
+import asyncio
+
+from notification_dispatcher import NotificationDispatcher
+
+
+def test_coalescing():
+    delivered: list = []
+
+    async def deliver(destination, message):
+        delivered.append((destination, message))
+
+    async def main():
+        dispatcher = NotificationDispatcher(
+            deliver, lambda: ["a", "b"], coalesce_window_s=0.1, rate_limit_per_s=0
+        )
+        task = asyncio.create_task(dispatcher.run())
+        for message in ("x", "y", "x"):
+            dispatcher.submit(message)
+        await asyncio.sleep(0.3)
+        task.cancel()
+        return dispatcher.get_stats()
+
+    stats = asyncio.run(main())
+    assert sorted(delivered) == [
+        ("a", "3 notifications:\nx\ny"),
+        ("b", "3 notifications:\nx\ny"),
+    ]
+    assert stats["messages"] == 1
+    assert stats["coalesced"] == 2
+    assert stats["delivered"] == 2
+
+
+def test_slow_destination_does_not_block_others():
+    delivered: list = []
+
+    async def deliver(destination, message):
+        if destination == "slow":
+            await asyncio.sleep(10)
+        delivered.append((destination, message))
+
+    async def main():
+        dispatcher = NotificationDispatcher(
+            deliver,
+            lambda: ["slow", "fast"],
+            coalesce_window_s=0,
+            rate_limit_per_s=0,
+            max_concurrency_per_destination=1,
+            delivery_timeout_s=0.5,
+        )
+        task = asyncio.create_task(dispatcher.run())
+        for message in ("1", "2", "3"):
+            dispatcher.submit(message)
+            await asyncio.sleep(0.05)
+        stats_busy = dispatcher.get_stats()
+        await asyncio.sleep(0.6)
+        task.cancel()
+        return stats_busy, dispatcher.get_stats()
+
+    stats_busy, stats = asyncio.run(main())
+    assert delivered == [("fast", "1"), ("fast", "2"), ("fast", "3")]
+    # the slow destination has one delivery in progress, the next messages for it are skipped
+    assert stats_busy["in_flight"] == 1
+    assert stats["skipped"] == 2
+    # the delivery in progress is cancelled on timeout
+    assert stats["failed"] == 1
+    assert stats["in_flight"] == 0
@@ -0,0 +1,116 @@
+#
+# test_pipeline_metrics.py: Tests of Face Tracking Pipeline Performance Metrics
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+
+import degirum_face
+from degirum_tools.streams import SinkGizmo
+from mock_models import SyntheticScene, mock_model_specs
+from pipeline_metrics import Histogram, PipelineMetrics, render_prometheus
+
+
+def test_histogram_buckets():
+    hist = Histogram((0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        hist.observe(value)
+    snapshot = hist.snapshot()
+    assert snapshot["buckets"] == [(0.1, 1), (1.0, 2), (float("inf"), 3)]
+    assert snapshot["count"] == 3
+
+
+def test_extra_metric_types():
+    text = render_prometheus(
+        [], {"events_total": ("counter", 7), "queue_depth": ("gauge", 2)}
+    )
+    lines = text.splitlines()
+    assert "# TYPE face_tracking_events_total counter" in lines
+    assert "face_tracking_events_total 7" in lines
+    assert "# TYPE face_tracking_queue_depth gauge" in lines
+    assert "face_tracking_queue_depth 2" in lines
+
+
+def test_no_extra_metrics():
+    assert "face_tracking_running" in render_prometheus([])
+
+
+class FakeComposition:
+    """Composition reporting fixed gizmo counters."""
+
+    def __init__(self, results: int):
+        self.results = results
+
+    def get_current_queue_sizes(self):
+        return [
+            {"FaceDetectorGizmo": [100, 1]},
+            {"FaceRecognizerGizmo": [self.results, 4]},
+        ]
+
+    def get_bottlenecks(self):
+        return [{"FaceRecognizerGizmo": 3}]
+
+
+class FakeWatchdog:
+    def check(self):
+        return True, 25.0
+
+
+class FakeMatchCache:
+    hits = 5
+    misses = 2
+
+
+def test_snapshot_of_gizmo_counters():
+    composition = FakeComposition(results=10)
+    metrics = PipelineMetrics(
+        composition, FakeWatchdog(), SinkGizmo(), match_cache=FakeMatchCache()
+    )
+    snapshot = metrics.snapshot()
+    assert snapshot["running"] and snapshot["fps"] == 25.0
+    assert snapshot["frames"] == 0 and snapshot["faces_per_frame"]["count"] == 0
+    assert snapshot["embeddings"] == 10
+    assert snapshot["db_search_latency_s"] is None
+    assert snapshot["match_cache"] == {"hits": 5, "misses": 2}
+    assert snapshot["gizmos"] == {
+        "FaceDetectorGizmo": {"results": 100, "queue_depths": [1], "dropped": 0},
+        "FaceRecognizerGizmo": {"results": 10, "queue_depths": [4], "dropped": 3},
+    }
+
+    # embeddings rate is measured between snapshots
+    metrics._last_rate_check = (metrics._last_rate_check[0] - 2.0, 10)
+    composition.results = 30
+    rate = metrics.snapshot()["embeddings_per_second"]
+    assert 9.0 < rate <= 10.0
+
+
+def test_snapshot_of_running_pipeline(tmp_path):
+    scene = SyntheticScene(width=320, height=240, num_faces=2, seed=0)
+    detector, embedder = mock_model_specs(scene, embedding_dim=16)
+    config = degirum_face.FaceTrackerConfig(
+        face_detection_model_spec=detector,
+        face_embedding_model_spec=embedder,
+        db_path=str(tmp_path / "db.lance"),
+        live_stream_mode="NONE",
+    )
+    tracker = degirum_face.FaceTracker(config)
+    sink = SinkGizmo(allow_drop=True)
+    composition, watchdog = tracker.start_face_tracking_pipeline(
+        frame_iterator=scene.frames(20), sink=sink, sink_connection_point="detector"
+    )
+    metrics = PipelineMetrics(composition, watchdog, sink, db=tracker.db)
+    metrics.start()
+    composition.wait()
+    assert metrics._thread is not None
+    metrics._thread.join(timeout=10)
+    snapshot = metrics.snapshot()
+
+    # every frame reaching the sink is counted
+    assert snapshot["frames"] == snapshot["faces_per_frame"]["count"] > 0
+    assert snapshot["faces_per_frame"]["sum"] == 2 * snapshot["frames"]
+    assert "FaceDetectorGizmo" in snapshot["stage_latency_s"]
+    # face recognizer is measured by its gizmo counters
+    gizmos = snapshot["gizmos"]
+    assert gizmos["FaceDetectorGizmo"]["results"] == 20
+    assert snapshot["embeddings"] == gizmos["FaceRecognizerGizmo"]["results"] > 0
+    assert snapshot["db_search_latency_s"]["count"] > 0
@@ -0,0 +1,271 @@
+#
+# test_reid_db_service.py: Tests of Multi-process ReID Database Service
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+
+import os, struct, threading, time
+from typing import List
+
+import pytest
+import numpy as np
+import degirum_face
+import reid_db_service
+from degirum_tools.streams import SinkGizmo
+from reid_db_service import ReID_DatabaseClient, ReID_DatabaseServer
+from reid_db_snapshots import ReID_DatabaseSnapshots
+from mock_models import SyntheticScene, mock_model_specs
+
+DIM = 16
+
+
+class RunningServer:
+    """ReID database server serving in a background thread."""
+
+    def __init__(self, db_path: str, socket_path: str, model_name: str = "model"):
+        self.server = ReID_DatabaseServer(db_path, socket_path, model_name=model_name)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.stop()
+        self.thread.join(timeout=10)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "db.lance"), str(tmp_path / "reid.sock")
+
+
+def gallery(seed: int, persons: int = 5, per_person: int = 4) -> dict:
+    rng = np.random.default_rng(seed)
+    return {
+        f"person_{seed}_{i}": list(
+            rng.standard_normal((per_person, DIM)).astype(np.float32)
+        )
+        for i in range(persons)
+    }
+
+
+def generation(client: ReID_DatabaseClient) -> int:
+    """Generation of the embedding matrix published by the server."""
+    assert client._control is not None and client._control.buf is not None
+    return struct.unpack_from("<Q", client._control.buf, 0)[0]
+
+
+def enroll(db, persons: dict):
+    for name, embeddings in persons.items():
+        db.add_embeddings_for_attributes(name, embeddings, dedup=False)
+
+
+def test_search_matches_database(paths):
+    db_path, socket_path = paths
+    persons = gallery(0)
+    enroll(degirum_face.ReID_Database(db_path, "model"), persons)
+
+    server = RunningServer(db_path, socket_path)
+    client = ReID_DatabaseClient(socket_path, model_name="model")
+    try:
+        db = degirum_face.ReID_Database(db_path, "model")
+        rng = np.random.default_rng(1)
+        queries = [
+            e + 0.1 * rng.standard_normal(DIM) for v in persons.values() for e in v
+        ]
+        for query in queries:
+            expected = db.get_attributes_by_embedding(query, 0.5)
+            result = client.get_attributes_by_embedding(query, 0.5)
+            assert result[:2] == expected[:2]
+            assert result[2] == pytest.approx(expected[2], abs=1e-4)
+    finally:
+        client.close()
+        server.stop()
+
+
+def test_writes_patch_only_changed_objects(paths):
+    db_path, socket_path = paths
+    enroll(degirum_face.ReID_Database(db_path, "model"), gallery(0))
+    server = RunningServer(db_path, socket_path)
+    client = ReID_DatabaseClient(socket_path, model_name="model")
+    try:
+        calls: List[str] = []
+        get_embeddings = server.server._db.get_embeddings
+
+        def counting_get_embeddings(object_id, **kwargs):
+            calls.append(object_id)
+            return get_embeddings(object_id, **kwargs)
+
+        server.server._db.get_embeddings = counting_get_embeddings
+        version = generation(client)
+
+        new_person = gallery(1, persons=1)
+        enroll(client, new_person)
+        assert len(calls) == 1
+        assert generation(client) == version + 1
+        name, embeddings = next(iter(new_person.items()))
+        assert client.get_attributes_by_embedding(embeddings[0], 0.9)[1] == name
+
+        client.remove_object_by_attributes(name)
+        assert client.get_attributes_by_embedding(embeddings[0], 0.9)[0] is None
+        assert len(calls) == 2
+    finally:
+        client.close()
+        server.stop()
+
+
+def test_stale_or_missing_segment_is_not_mapped(paths):
+    db_path, socket_path = paths
+    enroll(degirum_face.ReID_Database(db_path, "model"), gallery(0))
+    server = RunningServer(db_path, socket_path)
+    client = ReID_DatabaseClient(socket_path, model_name="model")
+    try:
+        query = gallery(0)["person_0_0"][0]
+        assert client.get_attributes_by_embedding(query, 0.9)[1] == "person_0_0"
+
+        # control segment points to generation which has no data segment (e.g. torn read): keep current matrix
+        assert client._control is not None and client._control.buf is not None
+        version = generation(client)
+        struct.pack_into("<Q", client._control.buf, 0, version + 100)
+        assert client.get_attributes_by_embedding(query, 0.9)[1] == "person_0_0"
+        struct.pack_into("<Q", client._control.buf, 0, version)
+    finally:
+        client.close()
+        server.stop()
+
+
+def test_client_reconnects_to_restarted_server(paths):
+    db_path, socket_path = paths
+    server = RunningServer(db_path, socket_path)
+    client = ReID_DatabaseClient(socket_path, model_name="model", check_interval_s=0.0)
+    try:
+        persons = gallery(0, persons=1)
+        enroll(client, persons)
+        server.stop()
+        enroll(degirum_face.ReID_Database(db_path, "model"), gallery(1, persons=1))
+        server = RunningServer(db_path, socket_path)
+
+        # searches reconnect and switch to the matrix of the new server
+        name, embeddings = next(iter(gallery(1, persons=1).items()))
+        deadline = time.time() + 10
+        while client.get_attributes_by_embedding(embeddings[0], 0.9)[1] != name:
+            assert time.time() < deadline
+            time.sleep(0.05)
+        # calls are forwarded to the new server
+        assert len(client.list_objects()) == 2
+    finally:
+        client.close()
+        server.stop()
+
+
+@pytest.mark.parametrize("method", ["checkout", "copy"])
+def test_server_reloads_restored_database(paths, tmp_path, method):
+    db_path, socket_path = paths
+    persons = gallery(0, persons=1)
+    enroll(degirum_face.ReID_Database(db_path, "model"), persons)
+    server = RunningServer(db_path, socket_path)
+    client = ReID_DatabaseClient(socket_path, model_name="model")
+    try:
+        # the database is restored by another process, which notifies the server
+        snapshots = ReID_DatabaseSnapshots(db_path, str(tmp_path / "store"))
+        snapshots.add_restore_listener(lambda record, method: client.reload())
+        snapshot_id = snapshots.snapshot()["id"]
+        if method == "copy":
+            snapshots._can_checkout = lambda record: False  # type: ignore[method-assign]
+
+        name, embeddings = next(iter(persons.items()))
+        client.remove_object_by_attributes(name)
+        assert client.get_attributes_by_embedding(embeddings[0], 0.9)[0] is None
+
+        version = generation(client)
+        assert snapshots.restore(snapshot_id) == method
+        assert generation(client) == version + 1
+        assert client.get_attributes_by_embedding(embeddings[0], 0.9)[1] == name
+        assert client.list_objects()
+    finally:
+        client.close()
+        server.stop()
+
+
+def test_attached_face_tracker_uses_client(paths):
+    db_path, socket_path = paths
+    scene = SyntheticScene(width=320, height=240, num_faces=2, seed=0)
+    detector, embedder = mock_model_specs(scene, embedding_dim=DIM)
+    config = degirum_face.FaceTrackerConfig(
+        face_detection_model_spec=detector,
+        face_embedding_model_spec=embedder,
+        db_path=db_path,
+        live_stream_mode="NONE",
+    )
+    server = RunningServer(db_path, socket_path, model_name=embedder.model_name)
+    client = ReID_DatabaseClient(socket_path, model_name=embedder.model_name)
+    try:
+        tracker = degirum_face.FaceTracker(config)
+        client.attach(tracker)
+        assert tracker.db is client
+
+        # pipeline searches go to the client, including hooks installed into it after attaching
+        searches = []
+        search = client.get_attributes_by_embedding
+
+        def counting_search(*args, **kwargs):
+            searches.append(args)
+            return search(*args, **kwargs)
+
+        client.get_attributes_by_embedding = counting_search  # type: ignore[method-assign]
+        sink = SinkGizmo()
+        composition, _ = tracker.start_face_tracking_pipeline(
+            frame_iterator=scene.frames(10), sink=sink, sink_connection_point="detector"
+        )
+        for _ in sink():
+            pass
+        composition.wait()
+        assert searches
+
+        # the pool is not affected: other face trackers use the client only when attached
+        other = degirum_face.FaceTracker(config)
+        assert other.db is not client
+        client.attach(other)
+        assert other.db is client
+
+        with pytest.raises(ValueError):
+            client.attach(
+                degirum_face.FaceTracker(
+                    degirum_face.FaceTrackerConfig(
+                        face_detection_model_spec=detector,
+                        face_embedding_model_spec=mock_model_specs(scene)[0],
+                        db_path="",
+                        live_stream_mode="NONE",
+                    )
+                )
+            )
+    finally:
+        client.close()
+        server.stop()
+
+
+def test_spawned_server_outlives_client(paths):
+    db_path, socket_path = paths
+    process = reid_db_service.spawn_server(db_path, socket_path, model_name="model")
+    try:
+        # the server is detached from the session of the process which started it
+        assert os.getsid(process.pid) != os.getsid(0)
+
+        deadline = time.time() + 60
+        while True:
+            try:
+                client = ReID_DatabaseClient(socket_path, model_name="model")
+                break
+            except (ConnectionRefusedError, FileNotFoundError):
+                assert process.poll() is None and time.time() < deadline
+                time.sleep(0.1)
+        enroll(client, gallery(0, persons=1))
+        client.close()
+
+        # another client finds the running server and its data
+        other = ReID_DatabaseClient(socket_path, model_name="model")
+        assert len(other.list_objects()) == 1
+        other.close()
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    assert not os.path.exists(socket_path)
@@ -0,0 +1,133 @@
+#
+# test_reid_db_snapshots.py: Tests of Incremental Versioned ReID Database Snapshots
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+
+import os
+
+import lancedb
+from lancedb.index import BTree
+import numpy as np
+import pytest
+from reid_db_snapshots import ReID_DatabaseProxy, ReID_DatabaseSnapshots
+from track_match_cache import TrackMatchCache
+
+DIM = 8
+
+
+def table_files(table_dir: str) -> set:
+    """List files of Lance table directory except the latest version hint."""
+    return {
+        os.path.relpath(os.path.join(root, name), table_dir)
+        for root, _, names in os.walk(table_dir)
+        for name in names
+        if name.endswith(".manifest") or os.path.basename(root) != "_versions"
+    }
+
+
+def make_table(db_dir: str) -> lancedb.table.Table:
+    """Table with deleted rows, scalar index, and two data files."""
+    rng = np.random.default_rng(0)
+    table = lancedb.connect(db_dir).create_table(
+        "items",
+        data=[
+            {"id": i, "vector": rng.standard_normal(DIM).astype(np.float32).tolist()}
+            for i in range(100)
+        ],
+    )
+    table.delete("id < 5")
+    table.create_index("id", config=BTree())
+    table.add([{"id": 1000, "vector": [0.0] * DIM}])
+    return table
+
+
+def test_snapshot_copies_only_new_files(tmp_path):
+    db_path = str(tmp_path / "db.lance")
+    table = make_table(db_path)
+    table_dir = os.path.join(db_path, "items.lance")
+    expected = table_files(table_dir)
+
+    snapshots = ReID_DatabaseSnapshots(db_path, str(tmp_path / "store"))
+    record = snapshots.snapshot()
+    assert record["tables"]["items"]["version"] == table.version
+    assert set(record["tables"]["items"]["files"]) == expected
+    assert record["copied_files"] == len(expected)
+
+    # the next snapshot copies only files of newer versions
+    table.add([{"id": 2000, "vector": [1.0] * DIM}])
+    newer = table_files(table_dir) - expected
+    assert snapshots.snapshot()["copied_files"] == len(newer) > 0
+
+    # snapshot assembled from the store has the recorded version as the latest one
+    table.delete("id >= 0")
+    snapshots._can_checkout = lambda record: False  # type: ignore[method-assign]
+    assert snapshots.restore(record["id"]) == "copy"
+    restored = lancedb.connect(db_path).open_table("items")
+    assert restored.count_rows() == 96
+    assert restored.list_indices()
+
+
+def test_recreated_table_is_restored_by_copy(tmp_path):
+    db_path = str(tmp_path / "db.lance")
+    make_table(db_path)
+    snapshots = ReID_DatabaseSnapshots(db_path, str(tmp_path / "store"))
+    snapshot_id = snapshots.snapshot()["id"]
+
+    # the recreated table has the same version numbers, but other versions
+    lancedb.connect(db_path).drop_table("items")
+    table = make_table(db_path)
+    table.delete("id >= 0")
+    assert snapshots.restore(snapshot_id) == "copy"
+    assert lancedb.connect(db_path).open_table("items").count_rows() == 96
+
+
+def test_snapshot_refuses_file_changed_in_place(tmp_path):
+    db_path = str(tmp_path / "db.lance")
+    make_table(db_path)
+    snapshots = ReID_DatabaseSnapshots(db_path, str(tmp_path / "store"))
+    snapshots.snapshot()
+
+    data_dir = os.path.join(db_path, "items.lance", "data")
+    path = os.path.join(data_dir, sorted(os.listdir(data_dir))[0])
+    # the store has a hard link of the file: replace it instead of writing through the link
+    with open(path, "rb") as f:
+        content = f.read()
+    os.remove(path)
+    with open(path, "wb") as f:
+        f.write(content + b"changed")
+    with pytest.raises(ValueError):
+        snapshots.snapshot()
+    assert len(snapshots.list_snapshots()) == 1
+
+
+@pytest.mark.parametrize("method", ["checkout", "copy"])
+def test_restore_notifies_listeners(tmp_path, method):
+    db_path = str(tmp_path / "db.lance")
+    rng = np.random.default_rng(0)
+    embedding = rng.standard_normal(DIM).astype(np.float32)
+    db = ReID_DatabaseProxy(db_path, "model")
+    db.add_embeddings_for_attributes("person", [embedding], dedup=False)
+
+    snapshots = ReID_DatabaseSnapshots(db_path, str(tmp_path / "store"), db=db)
+    snapshot_id = snapshots.snapshot()["id"]
+    if method == "copy":
+        snapshots._can_checkout = lambda record: False  # type: ignore[method-assign]
+
+    cache = TrackMatchCache()
+    cache._matches[1] = (embedding, (), ("id", "person", 1.0))
+    calls = []
+    snapshots.add_restore_listener(lambda record, method: cache.clear())
+    snapshots.add_restore_listener(
+        lambda record, method: calls.append((record["id"], method))
+    )
+    removed = calls.append
+    snapshots.add_restore_listener(removed)
+    snapshots.remove_restore_listener(removed)
+
+    db.remove_object_by_attributes("person")
+    assert snapshots.restore(snapshot_id) == method
+    assert calls == [(snapshot_id, method)]
+    assert not cache._matches
+    assert db.get_attributes_by_embedding(embedding, 0.5)[1] == "person"
@@ -0,0 +1,89 @@
+#
+# test_track_match_cache.py: Tests of Track-Level Face Match Cache
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+
+from datetime import timedelta
+
+import numpy as np
+import pytest
+import degirum_face
+from reid_db_snapshots import ReID_DatabaseSnapshots
+from track_match_cache import TrackMatchCache, _TableVersions
+
+DIM = 16
+
+
+def unit(v: np.ndarray) -> np.ndarray:
+    return (v / np.linalg.norm(v)).astype(np.float32)
+
+
+@pytest.fixture
+def setup(tmp_path):
+    """Database with one person, and cache instrumenting a separate database instance searched by track 1."""
+    db_path = str(tmp_path / "db.lance")
+    rng = np.random.default_rng(0)
+    embedding = unit(rng.standard_normal(DIM))
+    degirum_face.ReID_Database(db_path, "model").add_embeddings_for_attributes(
+        "person", [embedding], dedup=False
+    )
+
+    db = degirum_face.ReID_Database(
+        db_path, "model", read_consistency_interval=timedelta(0)
+    )
+    cache = TrackMatchCache(min_similarity=0.9)
+    cache._instrument_database(db, _TableVersions(db_path))
+    cache._local.track_id = 1
+    return db_path, db, cache, embedding
+
+
+def search(db, cache, embedding):
+    """Search the database for track 1; returns (attributes, cache hit)."""
+    hits = cache.hits
+    result = db.get_attributes_by_embedding(embedding, 0.5)
+    return result[1], cache.hits > hits
+
+
+def test_identified_track_reuses_match(setup):
+    _, db, cache, embedding = setup
+    assert search(db, cache, embedding) == ("person", False)
+    assert search(db, cache, embedding) == ("person", True)
+
+    # other tracks and faces outside of tracks are always searched
+    cache._local.track_id = 2
+    assert search(db, cache, embedding) == ("person", False)
+    cache._local.track_id = None
+    assert search(db, cache, embedding) == ("person", False)
+
+
+def test_write_of_other_database_instance_invalidates_matches(setup):
+    db_path, db, cache, embedding = setup
+    search(db, cache, embedding)
+    assert search(db, cache, embedding)[1]
+
+    # write done by another database instance, as by another process
+    other = degirum_face.ReID_Database(db_path, "model")
+    other.remove_object_by_attributes("person")
+    other.add_embeddings_for_attributes("renamed", [embedding], dedup=False)
+
+    assert search(db, cache, embedding) == ("renamed", False)
+    assert search(db, cache, embedding) == ("renamed", True)
+
+
+@pytest.mark.parametrize("method", ["checkout", "copy"])
+def test_snapshot_restore_invalidates_matches(setup, tmp_path, monkeypatch, method):
+    db_path, db, cache, embedding = setup
+    snapshots = ReID_DatabaseSnapshots(db_path, str(tmp_path / "store"), db=db)
+    snapshot_id = snapshots.snapshot()["id"]
+    if method == "copy":
+        monkeypatch.setattr(snapshots, "_can_checkout", lambda record: False)
+
+    db.remove_object_by_attributes("person")
+    db.add_embeddings_for_attributes("renamed", [embedding], dedup=False)
+    search(db, cache, embedding)
+    assert search(db, cache, embedding) == ("renamed", True)
+
+    assert snapshots.restore(snapshot_id) == method
+    assert search(db, cache, embedding) == ("person", False)
@@ -0,0 +1,116 @@
+#
+# test_vectorized_analyzers.py: Parity Tests of Vectorized Temporal Face Analyzers
+#
+# Copyright DeGirum Corporation 2025
+# All rights reserved
+#
+
+import copy, types
+
+import numpy as np
+from degirum_face import HeadPoseAnalyzer
+from degirum_face.face_tracking_gizmos import LivenessDetector
+from vectorized_analyzers import VectorizedHeadPoseAnalyzer, VectorizedLivenessDetector
+
+# max difference between results of vectorized and original analyzers
+TOLERANCE = 2e-10
+
+
+def make_faces(rng: np.random.Generator, track_ids: list) -> list:
+    """Make face results with random landmarks and facial features."""
+    faces = []
+    for track_id in track_ids:
+        center = rng.uniform(100, 500, 2)
+        offsets = ([-20, -10], [20, -10], [0, 5], [-15, 25], [15, 25])
+        face: dict = {
+            "track_id": track_id,
+            "landmarks": [
+                {"landmark": [float(v) for v in center + rng.normal(0, 15, 2) + o]}
+                for o in offsets
+            ],
+        }
+        if rng.random() < 0.8:
+            features = (
+                {"smile": float(rng.random()), "mouth_open": float(rng.random())}
+                if rng.random() < 0.9
+                else {"eyes_open": float(rng.random())}
+            )
+            face["face_properties"] = {"facial_features": features}
+        faces.append(face)
+    return faces
+
+
+def analyze(analyzers: list, faces: list, track_ids: list):
+    result = types.SimpleNamespace(
+        results=faces, trails={track_id: [] for track_id in track_ids}
+    )
+    for analyzer in analyzers:
+        analyzer.analyze(result)
+
+
+def max_difference(a: list, b: list) -> float:
+    return float(np.max(np.abs(np.subtract(a, b)), initial=0.0))
+
+
+def assert_same_faces(expected: list, actual: list) -> int:
+    """Compare analyzed faces; returns the number of faces with liveness scores."""
+    scored = 0
+    for e, a in zip(expected, actual):
+        assert e.keys() == a.keys()
+        if "face_properties" in e:
+            ef = e["face_properties"]["facial_features"]
+            af = a["face_properties"]["facial_features"]
+            assert ef.keys() == af.keys()
+            for key, value in ef.items():
+                assert abs(value - af[key]) <= TOLERANCE, key
+        if "liveness_trails" in e:
+            assert e["liveness_trails"].keys() == a["liveness_trails"].keys()
+            for key, trail in e["liveness_trails"].items():
+                assert len(a["liveness_trails"][key]) == len(trail)
+                assert max_difference(a["liveness_trails"][key], trail) <= TOLERANCE
+            assert abs(e["liveness_score"] - a["liveness_score"]) <= TOLERANCE
+            scored += 1
+    return scored
+
+
+def test_analyzers_match_library_with_track_churn():
+    rng = np.random.default_rng(1)
+    reference = [HeadPoseAnalyzer(), LivenessDetector(trail_length=30)]
+    # few initial slots, so slot table growth and slot reuse are exercised
+    vectorized = [
+        VectorizedHeadPoseAnalyzer(),
+        VectorizedLivenessDetector(trail_length=30, initial_slots=2),
+    ]
+    active, next_id, scored = set(range(5)), 5, 0
+    for _ in range(400):
+        if active and rng.random() < 0.1:
+            active.discard(int(rng.choice(sorted(active))))
+        if rng.random() < 0.15:
+            active.add(next_id)
+            next_id += 1
+        track_ids = sorted(active)
+        expected = make_faces(rng, track_ids)
+        actual = copy.deepcopy(expected)
+        analyze(reference, expected, track_ids)
+        analyze(vectorized, actual, track_ids)
+        scored += assert_same_faces(expected, actual)
+    assert scored > 0
+
+
+def test_liveness_matches_library_with_head_turns():
+    rng = np.random.default_rng(2)
+    reference = LivenessDetector(trail_length=50)
+    vectorized = VectorizedLivenessDetector(trail_length=50)
+    work = None
+    for _ in range(300):
+        turn = float(rng.random())
+        features = {"head_turned_left": turn, "head_turned_right": 1 - turn}
+        expected = [{"track_id": 1, "face_properties": {"facial_features": features}}]
+        actual = copy.deepcopy(expected)
+        analyze([reference], expected, [1])
+        analyze([vectorized], actual, [1])
+        assert_same_faces(expected, actual)
+        # work buffers are allocated once and reused
+        if work is None:
+            work = vectorized._work
+        assert vectorized._work is work